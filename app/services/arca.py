@@ -6,14 +6,13 @@ TIPO A o B, excluyendo cualquier otro tipo (p.ej. 'N').
 Integración esperada:
 - Modelos SQLAlchemy: Compra y Venta, con campos:
   fecha (date/datetime), tipo (str), nro_factura, cuit, proveedor/cliente,
-  pesos_sin_iva (Numeric), iva_21 (Numeric), iva_105 (Numeric), total_con_iva (Numeric),
+  pesos_sin_iva, iva_21, iva_105, total_con_iva (Integer, centavos),
   estado, origen/destino, nombre_socio.
 - Extensión: db (SQLAlchemy) en app.extensions
 
 Si tu proyecto usa otro path de import, ajustá las importaciones debajo.
 """
 from __future__ import annotations
-from decimal import Decimal
 from dataclasses import dataclass
 from typing import Iterable, List, Optional, Dict, Any
 
@@ -47,10 +46,10 @@ class ArcaRow:
     nro_factura: Optional[str]
     cuit: Optional[str]
     denominacion: Optional[str]
-    pesos_sin_iva: Decimal
-    iva_21: Decimal
-    iva_105: Decimal
-    total_con_iva: Decimal
+    pesos_sin_iva: int  # centavos
+    iva_21: int
+    iva_105: int
+    total_con_iva: int
     estado: Optional[str]
     origen_destino: Optional[str]
     nombre_socio: Optional[str]
@@ -63,10 +62,10 @@ class ArcaRow:
             'nro_factura': self.nro_factura,
             'cuit': self.cuit,
             'Denominación': self.denominacion,
-            'PESOS_SIN_IVA': float(self.pesos_sin_iva),
-            'IVA_21': float(self.iva_21),
-            'IVA_105': float(self.iva_105),
-            'TOTAL_CON_IVA': float(self.total_con_iva),
+            'PESOS_SIN_IVA': self.pesos_sin_iva / 100,
+            'IVA_21': self.iva_21 / 100,
+            'IVA_105': self.iva_105 / 100,
+            'TOTAL_CON_IVA': self.total_con_iva / 100,
             'estado': self.estado,
             'origen_destino': self.origen_destino,
             'nombre_socio': self.nombre_socio,
@@ -168,21 +167,22 @@ def _ym(d):
 def compute_totales_arca(rows: Iterable[ArcaRow]) -> List[Dict[str, Any]]:
     """Agrupa filas por YM y tipo_operacion, sumando montos y calculando
     Saldo_Tecnico_IVA por YM (se calcula a nivel de reporte final).
+    Las sumas son en centavos enteros (exactas); la salida va en pesos.
     """
     from collections import defaultdict
     agg = defaultdict(lambda: {
-        'PESOS_SIN_IVA': Decimal('0'),
-        'IVA_21': Decimal('0'),
-        'IVA_105': Decimal('0'),
-        'TOTAL_CON_IVA': Decimal('0'),
+        'PESOS_SIN_IVA': 0,
+        'IVA_21': 0,
+        'IVA_105': 0,
+        'TOTAL_CON_IVA': 0,
     })
     for r in rows:
         key = (_ym(r.fecha), r.tipo_operacion)
         a = agg[key]
-        a['PESOS_SIN_IVA'] += Decimal(r.pesos_sin_iva)
-        a['IVA_21']        += Decimal(r.iva_21)
-        a['IVA_105']       += Decimal(r.iva_105)
-        a['TOTAL_CON_IVA'] += Decimal(r.total_con_iva)
+        a['PESOS_SIN_IVA'] += r.pesos_sin_iva
+        a['IVA_21']        += r.iva_21
+        a['IVA_105']       += r.iva_105
+        a['TOTAL_CON_IVA'] += r.total_con_iva
 
     # Convertimos a lista y calculamos saldo técnico por YM
     by_ym = {}
@@ -191,15 +191,15 @@ def compute_totales_arca(rows: Iterable[ArcaRow]) -> List[Dict[str, Any]]:
         row = {
             'YM': ym,
             'tipo_operacion': tipo_op,
-            'PESOS_SIN_IVA': float(vals['PESOS_SIN_IVA']),
-            'IVA_21': float(vals['IVA_21']),
-            'IVA_105': float(vals['IVA_105']),
-            'TOTAL_CON_IVA': float(vals['TOTAL_CON_IVA']),
+            'PESOS_SIN_IVA': vals['PESOS_SIN_IVA'] / 100,
+            'IVA_21': vals['IVA_21'] / 100,
+            'IVA_105': vals['IVA_105'] / 100,
+            'TOTAL_CON_IVA': vals['TOTAL_CON_IVA'] / 100,
             'Saldo_Tecnico_IVA': None,  # se completa abajo
         }
         out.append(row)
-        s = by_ym.setdefault(ym, {'venta': 0.0, 'compra': 0.0})
-        total_iva = float(vals['IVA_21'] + vals['IVA_105'])
+        s = by_ym.setdefault(ym, {'venta': 0, 'compra': 0})
+        total_iva = vals['IVA_21'] + vals['IVA_105']
         if tipo_op.upper() == 'VENTA':
             s['venta'] += total_iva
         else:
@@ -208,7 +208,7 @@ def compute_totales_arca(rows: Iterable[ArcaRow]) -> List[Dict[str, Any]]:
     for row in out:
         ym = row['YM']
         saldo = by_ym[ym]['venta'] - by_ym[ym]['compra']
-        row['Saldo_Tecnico_IVA'] = float(saldo)
+        row['Saldo_Tecnico_IVA'] = saldo / 100
     return out
 
 
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Catálogo de opciones de los filtros (transacciones, YMs, socios).
+
+Cada lista se carga una vez y se reutiliza mientras no cambie la versión que
+devuelve `version()`: main.py la lee de CatalogoVersion, que suben la importación
+y el alta de socios en su misma transacción (así se enteran también los otros
+procesos).
+"""
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class Catalogo:
+    """Listas cacheadas por nombre, válidas mientras no cambie la versión."""
+
+    def __init__(self, version: Callable[[], Optional[int]]):
+        self._version = version
+        self._cargadores: Dict[str, Callable[[], Any]] = {}
+        self._datos: Dict[str, Any] = {}
+        self._de: Optional[int] = None  # versión de lo que hay en _datos
+        self._lock = threading.Lock()
+
+    def registrar(self, nombre: str, cargar: Callable[[], Any]) -> None:
+        """Registra el cargador de una lista (debe devolver algo inmutable: tuplas)."""
+        self._cargadores[nombre] = cargar
+
+    def obtener(self, nombre: str) -> Any:
+        """
+        Lista `nombre`, desde memoria si la versión no cambió.
+
+        Qué hace:
+        - Lee la versión antes de cargar: lo cargado es al menos tan nuevo como esa
+          versión; si entra otra importación en el medio, el request siguiente ve la
+          versión nueva y recarga.
+        - Sin versión (tabla vacía o sin migrar) carga siempre, sin cachear.
+
+        Errores:
+        - KeyError si `nombre` no está registrado.
+        """
+        cargar = self._cargadores[nombre]
+        v = self._version()
+        if v is None:
+            return cargar()
+        with self._lock:
+            if v != self._de:
+                self._datos, self._de = {}, v
+            elif nombre in self._datos:
+                return self._datos[nombre]
+        valor = cargar()
+        with self._lock:
+            if v == self._de:
+                self._datos[nombre] = valor
+        return valor
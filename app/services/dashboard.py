@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas del dashboard (index y /dashboard/export).
+
+fold_dashboard pliega las filas agrupadas del rollup mensual (operacion, socio_id,
+personal, estado) en los totales de la página; credito_iva es la única regla de
+IVA deducible (pct propio de la fila o default normal/personal, acotado a 0..1).
+Montos en centavos; el IVA deducible puede traer fracción de centavo.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Fila del rollup agrupado: (operacion, socio_id, personal, estado, filas, neto, iva, iva_pct, iva_sin_pct)
+MetricRow = Tuple[str, Optional[int], Any, Optional[str], Any, Any, Any, Any, Any]
+
+
+def credito_iva(iva_pct: float, iva_sin_pct: float, personal: bool, p_norm: float, p_pers_def: float) -> float:
+    """
+    IVA computable como crédito (centavos): el de las filas con pct propio (ya ponderado en
+    el rollup) más el IVA de las filas sin pct por el default normal o personal, acotado a 0..1.
+    """
+    eff = min(max(float(p_pers_def if personal else p_norm), 0.0), 1.0)
+    return float(iva_pct or 0.0) + (iva_sin_pct or 0) * eff
+
+
+@dataclass
+class DashboardMetrics:
+    # centavos
+    ventas_sin_iva: int = 0
+    iva_venta: int = 0
+    compras_sin_iva: int = 0
+    iva_compra_total: int = 0
+    iva_compra_creditable: float = 0.0
+    iva_personal_total: int = 0
+    iva_personal_credito_empresa: float = 0.0
+    adeudado_compras: int = 0
+    adeudado_ventas: int = 0
+    # socio_id -> {"ventas_sin_iva": ..., "compras_sin_iva": ...}
+    por_socio: Dict[Optional[int], Dict[str, int]] = field(default_factory=dict)
+
+    @property
+    def margen_sin_iva(self) -> int:
+        return self.ventas_sin_iva - self.compras_sin_iva
+
+    @property
+    def iva_a_pagar(self) -> float:
+        return self.iva_venta - self.iva_compra_creditable
+
+    @property
+    def iva_personal_credito_socios(self) -> float:
+        return max(self.iva_personal_total - self.iva_personal_credito_empresa, 0.0)
+
+
+def fold_dashboard(rows: Iterable[MetricRow], p_norm: float = 1.0, p_pers_def: float = 0.5) -> DashboardMetrics:
+    """
+    Pliega las filas agrupadas del rollup en las métricas del dashboard.
+
+    Parámetros:
+    - rows: (operacion, socio_id, personal, estado, filas, neto, iva, iva_pct, iva_sin_pct), montos en centavos.
+    - p_norm / p_pers_def: IVA deducible por defecto de compras normales / personales.
+
+    Devuelve:
+    - DashboardMetrics con totales, IVA deducible/personal, ADEUDADOS y montos por socio.
+    """
+    m = DashboardMetrics()
+    for operacion, socio_id, personal, estado, filas, neto, iva, iva_pct, iva_sin_pct in rows:
+        neto, iva = int(neto or 0), int(iva or 0)
+        socio = m.por_socio.setdefault(socio_id, {"ventas_sin_iva": 0, "compras_sin_iva": 0})
+        adeudado = int(filas or 0) if estado == "ADEUDADO" else 0
+        if operacion == "VENTA":
+            m.ventas_sin_iva += neto
+            m.iva_venta += iva
+            m.adeudado_ventas += adeudado
+            socio["ventas_sin_iva"] += neto
+            continue
+        m.compras_sin_iva += neto
+        m.iva_compra_total += iva
+        m.adeudado_compras += adeudado
+        socio["compras_sin_iva"] += neto
+        credito = credito_iva(iva_pct, iva_sin_pct, bool(personal), p_norm, p_pers_def)
+        m.iva_compra_creditable += credito
+        if personal:
+            m.iva_personal_total += iva
+            m.iva_personal_credito_empresa += credito
+    return m
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Descarga del XLSX exportado de Google Sheets.
+
+- Sesión HTTP compartida con reintentos y backoff ante conexión caída, 429 y 5xx.
+- Pedidos condicionales con el ETag / Last-Modified de la última Importacion:
+  un 304 no baja nada.
+- Escritura en streaming con tope de tamaño; el archivo final aparece sólo si la
+  descarga terminó completa.
+"""
+from __future__ import annotations
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except Exception:
+    requests = None
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_TIMEOUT = (10, 60)  # (conexión, lectura entre bloques)
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadError(RuntimeError):
+    """Falla de descarga (HTTP, red o archivo demasiado grande)."""
+
+
+class DownloadTooLarge(DownloadError):
+    """La respuesta supera el tope de bytes configurado."""
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    path: Optional[str]
+    not_modified: bool = False
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    size: int = 0
+
+
+def build_session(retries: int = 3, backoff: float = 0.5) -> "requests.Session":
+    """Sesión con pool de conexiones y reintentos (GET idempotente) para http/https."""
+    if requests is None:
+        raise DownloadError("Falta requests. Ejecutá: pip install requests")
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=4)
+    s = requests.Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """Sesión compartida del proceso (se crea la primera vez que se pide)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+
+def conditional_headers(etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict[str, str]:
+    """Encabezados If-None-Match / If-Modified-Since a partir de los validadores previos."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def download_to_file(
+    url: str,
+    dest: str,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    timeout=DEFAULT_TIMEOUT,
+    chunk_size: int = CHUNK_SIZE,
+    session=None,
+) -> DownloadResult:
+    """
+    Descarga `url` a `dest` en streaming, con pedido condicional y tope de tamaño.
+
+    Parámetros:
+    - etag / last_modified: validadores de la descarga anterior (None = incondicional).
+    - max_bytes: tope de tamaño; se corta apenas se supera (o antes, por Content-Length).
+    - session: sesión HTTP a usar (default: la compartida de get_session()).
+
+    Devuelve:
+    - DownloadResult con not_modified=True y path=None si el servidor respondió 304;
+      si no, el path escrito, su tamaño y los validadores nuevos de la respuesta.
+
+    Lanza DownloadError (o DownloadTooLarge) y no deja archivos a medio escribir.
+    """
+    s = session or get_session()
+    tmp = dest + ".part"
+    try:
+        with s.get(url, headers=conditional_headers(etag, last_modified), stream=True, timeout=timeout) as r:
+            if r.status_code == 304:
+                return DownloadResult(url, None, not_modified=True, etag=etag, last_modified=last_modified)
+            r.raise_for_status()
+            largo = r.headers.get("Content-Length")
+            if largo and largo.isdigit() and int(largo) > max_bytes:
+                raise DownloadTooLarge(f"El archivo pesa {int(largo)} bytes (tope {max_bytes})")
+            size = 0
+            with open(tmp, "wb") as fh:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise DownloadTooLarge(f"El archivo supera el tope de {max_bytes} bytes")
+                    fh.write(chunk)
+            os.replace(tmp, dest)
+            return DownloadResult(
+                url,
+                dest,
+                etag=r.headers.get("ETag"),
+                last_modified=r.headers.get("Last-Modified"),
+                size=size,
+            )
+    except DownloadError:
+        raise
+    except Exception as e:
+        raise DownloadError(str(e)) from e
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,790 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de importación: lectura de libros Excel/Google Sheets en una sola pasada.
+
+El libro se abre una única vez con openpyxl en modo *read-only* (streaming) y
+cada hoja se recorre una sola vez. Con esas filas se construyen los DataFrames
+que consume `do_import_excel_from_path` (main.py) para detectar YMs, hacer el
+upsert de Parametros/Socios y convertir FactCompras/FactVentas.
+
+Además del XLSX se aceptan, con las mismas hojas y columnas:
+- un .zip con un CSV por hoja (FactCompras.csv, ...), leído en streaming;
+- un directorio (o .zip) con un Parquet por hoja (FactCompras.parquet, ...),
+  leído columnar (requiere pyarrow).
+
+Este módulo no toca la base de datos: sólo lee, normaliza y compara huellas.
+"""
+from __future__ import annotations
+import csv
+import hashlib
+import io
+import os
+import zipfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import pandas as pd
+except Exception:  # pragma: no cover - pandas es requisito de la importación
+    pd = None
+
+try:
+    from openpyxl import load_workbook
+except Exception:  # pragma: no cover
+    load_workbook = None
+
+IMPORT_SHEETS = ("Parametros", "Socios", "FactCompras", "FactVentas")
+
+# Extensiones que openpyxl puede abrir en modo streaming
+OPENPYXL_EXTS = {".xlsx", ".xlsm"}
+# Archivos por hoja dentro de un .zip o directorio: <Hoja>.csv / <Hoja>.parquet
+TABLE_EXTS = (".csv", ".parquet")
+
+
+def _header_names(header: Sequence[Any]) -> List[str]:
+    """Normaliza la fila de encabezados igual que pandas (Unnamed: N / duplicados .1)."""
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for i, h in enumerate(header):
+        name = f"Unnamed: {i}" if h is None or str(h).strip() == "" else str(h)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_workbook_rows(
+    path: str, sheets: Optional[Iterable[str]] = None
+) -> Iterator[Tuple[str, List[str], Iterator[tuple]]]:
+    """
+    Abre el libro una sola vez (read-only) y rinde (hoja, encabezados, filas) por cada hoja.
+
+    - `filas` es un iterador de tuplas ya recortadas al ancho del encabezado.
+    - Las filas completamente vacías se omiten (como hace pandas.read_excel).
+    - Si `sheets` se indica, sólo se recorren esas hojas.
+    """
+    if load_workbook is None:
+        raise RuntimeError("openpyxl no instalado. Ejecutá: pip install openpyxl")
+    wanted = set(sheets) if sheets is not None else None
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            if wanted is not None and ws.title not in wanted:
+                continue
+            it = ws.iter_rows(values_only=True)
+            header = next(it, None)
+            if header is None:
+                yield ws.title, [], iter(())
+                continue
+            # recortar columnas vacías al final del encabezado
+            width = len(header)
+            while width and (header[width - 1] is None or str(header[width - 1]).strip() == ""):
+                width -= 1
+            names = _header_names(header[:width])
+
+            def _rows(it=it, width=width):
+                for row in it:
+                    row = tuple(row[:width])
+                    if len(row) < width:
+                        row = row + (None,) * (width - len(row))
+                    if all(v is None or (isinstance(v, str) and not v.strip()) for v in row):
+                        continue
+                    yield row
+
+            yield ws.title, names, _rows()
+    finally:
+        wb.close()
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Hash SHA-256 del contenido del archivo (leído por bloques, sin cargarlo entero).
+    Para un directorio de Parquet, hash de sus archivos por hoja (nombre + contenido).
+    """
+    h = hashlib.sha256()
+    files = [path]
+    if os.path.isdir(path):
+        files = [os.path.join(path, f) for f in sorted(_table_files(os.listdir(path)).values())]
+    for f in files:
+        if f != path:
+            h.update(os.path.basename(f).encode("utf-8"))
+        with open(f, "rb") as fh:
+            for block in iter(lambda: fh.read(chunk_size), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def _table_files(names: Iterable[str]) -> Dict[str, str]:
+    """{hoja: nombre} de los archivos <Hoja>.csv/.parquet (ignora carpetas y ocultos)."""
+    out: Dict[str, str] = {}
+    for name in names:
+        base = name.rsplit("/", 1)[-1]
+        stem, ext = os.path.splitext(base)
+        if ext.lower() in TABLE_EXTS and stem and not base.startswith((".", "__")):
+            out.setdefault(stem, name)
+    return out
+
+
+def _trim_unnamed(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Quita columnas sin encabezado al final y filas vacías (como la lectura de XLSX)."""
+    cols = list(df.columns)
+    while cols and str(cols[-1]).startswith("Unnamed:"):
+        cols.pop()
+    df = df.loc[:, cols]
+    return df.dropna(how="all").reset_index(drop=True)
+
+
+def _read_csv(fh) -> "pd.DataFrame":
+    """
+    CSV de una hoja, parseado en streaming desde el archivo (sin descomprimir a disco).
+    Todo se lee como texto (NRO_FACTURA '0012' no pierde ceros): la normalización
+    convierte fechas y montos igual que con las celdas de Excel. Separador ',' o ';'.
+    """
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    header = text.readline()
+    sep = ";" if header.count(";") > header.count(",") else ","
+    names = _header_names(next(csv.reader([header], delimiter=sep), []))
+    df = pd.read_csv(text, sep=sep, header=None, names=names, dtype=str, index_col=False)
+    return _trim_unnamed(df)
+
+
+def _read_parquet(src) -> "pd.DataFrame":
+    """Parquet de una hoja (lectura columnar)."""
+    try:
+        return _trim_unnamed(pd.read_parquet(src))
+    except ImportError:
+        raise RuntimeError("Falta pyarrow para leer Parquet. Ejecutá: pip install pyarrow")
+
+
+def _read_tables(names: Dict[str, str], sheets: Sequence[str], open_member) -> Dict[str, "pd.DataFrame"]:
+    """Lee los archivos por hoja pedidos; `open_member(nombre)` abre cada uno en binario."""
+    out: Dict[str, pd.DataFrame] = {}
+    for sheet in sheets:
+        name = names.get(sheet)
+        if name is None:
+            continue
+        with open_member(name) as fh:
+            if name.lower().endswith(".csv"):
+                out[sheet] = _read_csv(fh)
+            else:
+                # Parquet necesita acceso aleatorio: un miembro de zip se carga en memoria
+                src = fh if isinstance(fh, io.BufferedReader) else io.BytesIO(fh.read())
+                out[sheet] = _read_parquet(src)
+    return out
+
+
+def read_import_sheets(path: str, sheets: Sequence[str] = IMPORT_SHEETS) -> Dict[str, "pd.DataFrame"]:
+    """
+    Lee las hojas de importación en una única pasada y devuelve {hoja: DataFrame}.
+
+    Las hojas ausentes no aparecen en el dict. Para formatos que openpyxl no
+    abre (p.ej. .xls) se hace un único `pd.read_excel(sheet_name=None)`; un .zip
+    o un directorio se leen archivo por hoja (CSV en streaming, Parquet columnar).
+    """
+    if pd is None:
+        raise RuntimeError("Pandas no instalado. Ejecutá: pip install pandas openpyxl")
+    ext = os.path.splitext(path)[1].lower()
+    if os.path.isdir(path):
+        tablas = _table_files(os.listdir(path))
+        return _read_tables(tablas, sheets, lambda name: open(os.path.join(path, name), "rb"))
+    if ext == ".zip":
+        with zipfile.ZipFile(path) as zf:
+            return _read_tables(_table_files(zf.namelist()), sheets, zf.open)
+    if ext not in OPENPYXL_EXTS:
+        frames = pd.read_excel(path, sheet_name=None)
+        return {k: v for k, v in frames.items() if k in sheets}
+    out: Dict[str, pd.DataFrame] = {}
+    for name, header, rows in iter_workbook_rows(path, sheets):
+        out[name] = pd.DataFrame.from_records(list(rows), columns=header)
+    return out
+
+
+# ------------------- Normalización columnar -------------------
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%m/%d/%Y")
+SI_VALUES = {"si", "sí", "s", "yes", "y", "true", "1"}
+
+# Columnas del modelo que produce cada hoja (además de 'fecha', 'ym', 'nombre_socio')
+COMPRA_FIELDS = (
+    "fecha", "ym", "proveedor", "pesos_sin_iva", "iva_21", "iva_105", "total_con_iva",
+    "tipo", "nro_factura", "cuit", "origen", "estado", "descripcion", "personal",
+    "iva_deducible_pct", "transaccion_id",
+)
+VENTA_FIELDS = (
+    "fecha", "ym", "cliente", "pesos_sin_iva", "iva_21", "iva_105", "total_con_iva",
+    "nro_factura", "cuit_venta", "destino", "estado", "descripcion", "tipo",
+    "transaccion_id",
+)
+AMOUNT_COLUMNS = {
+    "PESOS_SIN_IVA": "pesos_sin_iva",
+    "IVA_21": "iva_21",
+    "IVA_105": "iva_105",
+    "TOTAL_CON_IVA": "total_con_iva",
+}
+
+
+@dataclass
+class ImportContext:
+    """
+    Datos de referencia de una importación, resueltos una sola vez.
+
+    main.py lo arma después del upsert de Parametros/Socios; las filas de
+    FactCompras/FactVentas leen de acá en memoria (sin consultas por fila).
+    """
+    socios: Dict[str, int] = field(default_factory=dict)  # nombre -> id
+    p_norm: float = 1.0  # iva_deducible_normal_pct
+    p_pers_def: float = 0.5  # iva_deducible_personal_default_pct
+    socio_oblig: bool = True  # nombre_socio_obligatorio
+
+
+def _col(df: "pd.DataFrame", name: str) -> "pd.Series":
+    """Columna `name` o una serie vacía (None) si la hoja no la trae."""
+    if name in df.columns:
+        return df[name]
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def _blank(s: "pd.Series") -> "pd.Series":
+    """Máscara de celdas vacías (None/NaN/'' o sólo espacios)."""
+    return s.isna() | s.astype(str).str.strip().eq("")
+
+
+def parse_dates(s: "pd.Series") -> "pd.Series":
+    """
+    Parsea una columna de fechas de forma vectorizada y devuelve datetime64 (NaT si falla).
+
+    - Valores no texto (datetime/Timestamp) se convierten directo.
+    - Textos: se prueban DATE_FORMATS en orden (como parse_date en main.py) y,
+      para lo que quede, la heurística de pandas.
+    """
+    out = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    es_txt = s.map(lambda v: isinstance(v, str)).astype(bool)
+    otros = s[~es_txt & s.notna()]
+    if len(otros):
+        out.loc[otros.index] = pd.to_datetime(otros, errors="coerce")
+    txt = s[es_txt].astype(str).str.strip()
+    for fmt in DATE_FORMATS:
+        if txt.empty:
+            break
+        parsed = pd.to_datetime(txt, format=fmt, errors="coerce")
+        ok = parsed.notna()
+        out.loc[parsed[ok].index] = parsed[ok]
+        txt = txt[~ok]
+    if not txt.empty:
+        parsed = pd.to_datetime(txt, format="mixed", errors="coerce")
+        out.loc[parsed.index] = parsed
+    return out
+
+
+def to_amounts(s: "pd.Series") -> Tuple["pd.Series", "pd.Series"]:
+    """
+    Convierte montos a centavos enteros (vacío -> 0). Devuelve (valores, máscara de inválidos).
+
+    Redondea al centavo con las mitades lejos de cero (0,285 -> 29 centavos); el redondeo
+    previo a 6 decimales descarta el error binario del float (0,285 * 100 = 28,4999...).
+    """
+    vacio = _blank(s)
+    txt = s.where(~s.map(lambda v: isinstance(v, str)).astype(bool), s.astype(str).str.strip())
+    num = pd.to_numeric(txt.where(~vacio), errors="coerce")
+    invalido = num.isna() & ~vacio
+    num = num.fillna(0.0).astype(float)
+    centavos = (num.abs() * 100).round(6).add(0.5).floordiv(1).astype("int64")
+    return centavos.where(num >= 0, -centavos), invalido
+
+
+def to_bool_si_no(s: "pd.Series") -> "pd.Series":
+    """'Si'/'Sí'/'yes'/'1'/... -> True; cualquier otro valor -> False."""
+    return s.astype(str).str.strip().str.lower().isin(SI_VALUES)
+
+
+def to_pct(s: "pd.Series") -> "pd.Series":
+    """
+    Porcentajes en [0, 1]: '50%' -> 0.5, '0,5' -> 0.5, 50 -> 0.5.
+    Vacíos o no numéricos quedan NaN (el llamador aplica el default).
+    """
+    txt = s.where(s.notna()).astype(str).str.strip().str.replace(",", ".", regex=False)
+    con_pct = txt.str.endswith("%").fillna(False)
+    num = pd.to_numeric(txt.where(~con_pct, txt.str[:-1]), errors="coerce")
+    num = num.where(~con_pct, num / 100.0)
+    num = num.where(con_pct | ~(num > 1.0), num / 100.0)
+    return num.clip(lower=0.0, upper=1.0)
+
+
+def to_text(s: "pd.Series", default: str = "") -> "pd.Series":
+    """
+    Texto normalizado: vacíos -> `default`; números enteros sin '.0'
+    (Excel entrega NRO_FACTURA/CUIT como float: 165.0 -> '165').
+    """
+    def _fmt(v):
+        if isinstance(v, float) and v.is_integer():
+            return str(int(v))
+        return str(v)
+    out = s.astype(object).map(_fmt, na_action="ignore").astype(object).str.strip()
+    return out.where(~_blank(s), default)
+
+
+def _normalize_common(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Pasos compartidos por FactCompras/FactVentas: fecha, ym, montos, tipo, estado, motivo."""
+    raw_fecha = _col(df, "FECHA")
+    keep = ~_blank(raw_fecha)  # filas sin FECHA se ignoran (no son rechazo)
+    df = df[keep]
+    raw_fecha = raw_fecha[keep]
+
+    fechas = parse_dates(raw_fecha)
+    out = pd.DataFrame(index=df.index)
+    out["fecha"] = fechas.dt.date.where(fechas.notna(), None)
+    out["ym"] = fechas.dt.strftime("%Y-%m").where(fechas.notna(), None)
+    motivo = pd.Series(None, index=df.index, dtype=object)
+    motivo = motivo.where(fechas.notna(), "Fecha inválida: " + raw_fecha.astype(str))
+
+    for src, dst in AMOUNT_COLUMNS.items():
+        valores, invalido = to_amounts(_col(df, src))
+        out[dst] = valores
+        motivo = motivo.where(motivo.notna() | ~invalido, f"{src} no numérico: " + _col(df, src).astype(str))
+
+    out["tipo"] = to_text(_col(df, "TIPO")).str.upper()
+    out["nro_factura"] = to_text(_col(df, "NRO_FACTURA"))
+    out["estado"] = to_text(_col(df, "ESTADO"), "PAGADO")
+    out["descripcion"] = to_text(_col(df, "DETALLE"))
+    out["transaccion_id"] = to_text(_col(df, "transaccion_id"))
+    out["nombre_socio"] = to_text(_col(df, "nombre_socio"))
+    out["motivo"] = motivo
+    return out
+
+
+def _apply_socios(out: "pd.DataFrame", ctx: ImportContext) -> "pd.DataFrame":
+    """Resuelve socio_id desde ctx.socios y rechaza filas sin socio si es obligatorio."""
+    out["socio_id"] = out["nombre_socio"].map(ctx.socios).astype("Int64")
+    if ctx.socio_oblig:
+        # la validación de fecha tiene prioridad; el socio se evalúa antes que los montos
+        sin_socio = out["fecha"].notna() & out["socio_id"].isna()
+        out.loc[sin_socio, "motivo"] = "nombre_socio inválido/ausente"
+    return out
+
+
+def normalize_compras(df: "pd.DataFrame", ctx: ImportContext) -> "pd.DataFrame":
+    """
+    Normaliza la hoja FactCompras columna por columna.
+
+    Devuelve un DataFrame (mismo índice que la hoja, sin filas sin FECHA) con las
+    columnas de COMPRA_FIELDS + 'socio_id' + 'nombre_socio' + 'motivo'. `motivo`
+    es None en filas válidas; `rejected_mask(out)` da la máscara de rechazos.
+    """
+    out = _apply_socios(_normalize_common(df), ctx)
+    df = df.loc[out.index]
+    out["proveedor"] = to_text(_col(df, "PROVEEDOR"))
+    out["cuit"] = to_text(_col(df, "CUIT"))
+    out["origen"] = to_text(_col(df, "ORIGEN"))
+    out["personal"] = to_bool_si_no(_col(df, "personal"))
+    default_pct = out["personal"].map({True: ctx.p_pers_def, False: ctx.p_norm}).astype(float)
+    out["iva_deducible_pct"] = to_pct(_col(df, "iva_deducible_pct")).fillna(default_pct).clip(0.0, 1.0)
+    return out
+
+
+def normalize_ventas(df: "pd.DataFrame", ctx: ImportContext) -> "pd.DataFrame":
+    """Normaliza la hoja FactVentas columna por columna (ver normalize_compras)."""
+    out = _apply_socios(_normalize_common(df), ctx)
+    df = df.loc[out.index]
+    out["cliente"] = to_text(_col(df, "CLIENTE"))
+    out["cuit_venta"] = to_text(_col(df, "CUIT_VENTA"))
+    out["destino"] = to_text(_col(df, "DESTINO"))
+    return out
+
+
+def rejected_mask(out: "pd.DataFrame") -> "pd.Series":
+    """Máscara booleana de filas rechazadas (con `motivo`)."""
+    return out["motivo"].notna()
+
+
+def to_records(out: "pd.DataFrame", fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """Filas normalizadas como dicts con tipos nativos de Python (NaN -> None)."""
+    sub = out.loc[:, list(fields)].astype(object)
+    sub = sub.where(sub.notna(), None)
+    return sub.to_dict("records")
+
+
+# ------------------- Huellas y detección de cambios -------------------
+
+# Clave natural de una factura: TIPO + CUIT + punto de venta + número (de nro_factura)
+COMPRA_KEY_FIELDS = ("tipo", "cuit", "nro_factura")
+VENTA_KEY_FIELDS = ("tipo", "cuit_venta", "nro_factura")
+# Filas sin número de factura (movimientos N/X): se identifican por estos campos
+COMPRA_ALT_KEY_FIELDS = ("fecha", "tipo", "cuit", "proveedor", "transaccion_id")
+VENTA_ALT_KEY_FIELDS = ("fecha", "tipo", "cuit_venta", "cliente", "transaccion_id")
+
+
+def split_invoice_number(nro_raw: Any) -> Tuple[str, str]:
+    """
+    Separa un número de factura en (punto de venta de 4 dígitos, número de 8 dígitos).
+    '0003-00000204', '300000204' y 204.0 (PV 1) quedan normalizados; sin dígitos -> ('', '').
+    """
+    digits = "".join(ch for ch in str(nro_raw or "").strip() if ch.isdigit())
+    if isinstance(nro_raw, float) and nro_raw.is_integer():
+        digits = str(int(nro_raw))
+    if not digits:
+        return "", ""
+    if len(digits) <= 8:
+        pv, num = "1", digits.zfill(8)
+    else:
+        pv, num = digits[:-8] or "1", digits[-8:]
+    return str(int(pv)).zfill(4), num
+
+
+def _sha1_rows(out: "pd.DataFrame", fields: Sequence[str]) -> "pd.Series":
+    joined = out.loc[:, list(fields)].astype(str).agg("\x1f".join, axis=1)
+    return joined.map(lambda s: hashlib.sha1(s.encode("utf-8")).hexdigest())
+
+
+def natural_keys(out: "pd.DataFrame", key_fields: Sequence[str], alt_key_fields: Sequence[str]) -> "pd.Series":
+    """
+    Clave natural legible por fila: 'F|tipo|cuit|pv|número' si hay número de factura y
+    CUIT, si no 'S|' + alt_key_fields (+ pv y número si lo hay: comprobantes N/X sin CUIT
+    repiten número entre meses y archivos). Si la misma clave se repite en el archivo, la
+    n-ésima repetición lleva '#n' (las filas idénticas no se funden en una).
+    """
+    tipo_f, cuit_f, nro_f = key_fields
+    pv_num = out[nro_f].map(split_invoice_number)
+    pv = pv_num.str[0]
+    num = pv_num.str[1]
+    cuit = out[cuit_f].astype(str).str.replace(r"\D", "", regex=True)
+    factura = "F|" + out[tipo_f].astype(str) + "|" + cuit + "|" + pv + "|" + num
+    otros = "S|" + out.loc[:, list(alt_key_fields)].astype(str).agg("\x1f".join, axis=1)
+    otros = otros.where(num == "", otros + "\x1f" + pv + "|" + num)
+    base = factura.where((num != "") & (cuit != ""), otros)
+    n = base.groupby(base).cumcount()
+    return base.where(n == 0, base + "#" + n.astype(str))
+
+
+def add_fingerprints(
+    out: "pd.DataFrame",
+    fields: Sequence[str],
+    key_fields: Sequence[str],
+    alt_key_fields: Sequence[str],
+) -> "pd.DataFrame":
+    """
+    Agrega 'row_key' (huella de la clave natural, única en la tabla) y 'row_hash'
+    (huella de todos los campos normalizados) a las filas de normalize_compras/normalize_ventas.
+    """
+    if out.empty:
+        out["row_key"] = pd.Series(dtype=object)
+        out["row_hash"] = pd.Series(dtype=object)
+        return out
+    out["row_key"] = natural_keys(out, key_fields, alt_key_fields).map(
+        lambda s: hashlib.sha1(s.encode("utf-8")).hexdigest()
+    )
+    out["row_hash"] = _sha1_rows(out, fields)
+    return out
+
+
+@dataclass
+class RowDiff:
+    """Resultado de comparar filas nuevas contra las existentes (misma clave o mismos YMs)."""
+    inserts: List[Dict[str, Any]] = field(default_factory=list)
+    updates: List[Dict[str, Any]] = field(default_factory=list)
+    deletes: List[int] = field(default_factory=list)
+    unchanged: int = 0
+    # YMs que tenían las filas actualizadas (pueden no estar en el archivo si cambió la fecha)
+    updated_yms: List[str] = field(default_factory=list)
+
+    @property
+    def upserts(self) -> List[Dict[str, Any]]:
+        """Filas a escribir con INSERT ... ON CONFLICT DO UPDATE (nuevas + modificadas)."""
+        return self.inserts + self.updates
+
+
+def diff_rows(
+    existing: Iterable[Tuple[int, Optional[str], Optional[str], Optional[str]]],
+    rows: Iterable[Dict[str, Any]],
+    yms: Iterable[str] = (),
+    prune: bool = True,
+) -> RowDiff:
+    """
+    Compara por clave natural (row_key) las filas existentes (id, row_key, row_hash, ym)
+    con las filas nuevas (dicts con row_key/row_hash).
+
+    - Misma clave y mismo row_hash -> sin cambios (no se escribe).
+    - Misma clave con otro row_hash -> update; clave nueva -> insert (ambos vía upsert).
+    - Existentes de `yms` (los del archivo) sin clave -> delete siempre: son de antes de
+      las huellas (la migración 1 las deja en NULL) y el archivo las vuelve a traer con clave;
+      conservarlas duplicaría cada factura.
+    - Con `prune`, además las de `yms` cuya clave no está en el archivo -> delete.
+      Fuera de esos YMs nunca se borra nada.
+    """
+    por_clave: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+    candidatas: List[Tuple[int, Optional[str]]] = []
+    del_archivo = set(yms)
+    for _id, key, h, ym in existing:
+        if key is not None:
+            por_clave[key] = (h, ym)
+        if ym in del_archivo and (prune or key is None):
+            candidatas.append((_id, key))
+
+    diff = RowDiff()
+    claves = set()
+    yms_previos = set()
+    for r in rows:
+        claves.add(r["row_key"])
+        previa = por_clave.get(r["row_key"])
+        if previa is None:
+            diff.inserts.append(r)
+        elif previa[0] == r["row_hash"]:
+            diff.unchanged += 1
+        else:
+            diff.updates.append(r)
+            yms_previos.add(previa[1])
+    diff.updated_yms = sorted(y for y in yms_previos if y)
+    diff.deletes = sorted(_id for _id, key in candidatas if key is None or key not in claves)
+    return diff
+
+
+# ------------------- Preparación por hoja (en paralelo) -------------------
+
+# hoja -> (normalizador, campos del modelo, clave natural, clave alternativa, columna/campo de denominación)
+SHEET_SPECS = {
+    "FactCompras": (
+        normalize_compras, COMPRA_FIELDS, COMPRA_KEY_FIELDS, COMPRA_ALT_KEY_FIELDS, "PROVEEDOR", "proveedor",
+    ),
+    "FactVentas": (
+        normalize_ventas, VENTA_FIELDS, VENTA_KEY_FIELDS, VENTA_ALT_KEY_FIELDS, "CLIENTE", "cliente",
+    ),
+}
+DATA_SHEETS = tuple(SHEET_SPECS)
+
+
+@dataclass
+class PreparedSheet:
+    """Una hoja de datos lista para escribir: filas válidas con huella, rechazos y YMs."""
+    sheet: str
+    rows: int
+    yms: List[str]
+    records: List[Dict[str, Any]]
+    rechazos: List[Dict[str, Any]]
+
+
+def prepare_sheet(sheet: str, df: "pd.DataFrame", ctx: ImportContext) -> PreparedSheet:
+    """
+    Normaliza una hoja de datos, separa los rechazos y calcula las huellas.
+
+    Los YMs incluyen toda fila con FECHA válida (aunque luego se rechace): son
+    los meses que la importación reemplaza.
+    """
+    normalize, fields, key_fields, alt_key_fields, denom, denom_field = SHEET_SPECS[sheet]
+    norm = normalize(df, ctx)
+    rechazado = rejected_mask(norm)
+    rechazos = [
+        {
+            "sheet": sheet,
+            "motivo": rec["motivo"],
+            "NRO_FACTURA": rec["nro_factura"],
+            "FECHA": str(rec["fecha"] or ""),
+            denom: rec[denom_field],
+        }
+        for rec in to_records(norm[rechazado], ("motivo", "nro_factura", "fecha", denom_field))
+    ]
+    validas = add_fingerprints(norm[~rechazado].copy(), fields + ("socio_id",), key_fields, alt_key_fields)
+    return PreparedSheet(
+        sheet=sheet,
+        rows=len(norm),
+        yms=sorted(set(norm["ym"].dropna())),
+        records=to_records(validas, fields + ("socio_id", "row_key", "row_hash")),
+        rechazos=rechazos,
+    )
+
+
+def load_and_prepare_sheet(path: str, sheet: str, ctx: ImportContext) -> PreparedSheet:
+    """Lee sólo `sheet` del libro y la prepara (unidad de trabajo de cada proceso)."""
+    df = read_import_sheets(path, (sheet,)).get(sheet)
+    if df is None:
+        raise ValueError(f"Falta la hoja {sheet} en el archivo")
+    return prepare_sheet(sheet, df, ctx)
+
+
+def sheet_names(path: str) -> List[str]:
+    """Nombres de las hojas del libro (sin leer sus filas)."""
+    if os.path.isdir(path):
+        return list(_table_files(os.listdir(path)))
+    if os.path.splitext(path)[1].lower() == ".zip":
+        with zipfile.ZipFile(path) as zf:
+            return list(_table_files(zf.namelist()))
+    if os.path.splitext(path)[1].lower() not in OPENPYXL_EXTS:
+        return list(pd.ExcelFile(path).sheet_names)
+    if load_workbook is None:
+        raise RuntimeError("openpyxl no instalado. Ejecutá: pip install openpyxl")
+    wb = load_workbook(path, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+_parse_pool = None
+_parse_pool_workers = 0
+
+
+def get_parse_pool(workers: int):
+    """
+    Pool de procesos compartido para preparar hojas (None si workers <= 1).
+
+    Usa 'spawn' (no hereda hilos ni la conexión SQLite del proceso web) y se
+    reutiliza entre importaciones para no pagar el arranque de pandas cada vez.
+    """
+    global _parse_pool, _parse_pool_workers
+    if workers <= 1:
+        return None
+    if _parse_pool is None or _parse_pool_workers != workers:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False)
+        _parse_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _parse_pool_workers = workers
+    return _parse_pool
+
+
+def parse_in_pool(path: str, workers: int, sheets: Sequence[str] = DATA_SHEETS) -> bool:
+    """
+    ¿prepare_sheets lee y prepara las hojas en el pool de procesos? Sólo con workers > 1 y
+    formatos que se leen por hoja (XLSX, .zip / directorio): con .xls cada proceso tendría
+    que leer el libro entero.
+    """
+    if min(workers, len(sheets)) <= 1:
+        return False
+    ext = os.path.splitext(path)[1].lower()
+    return os.path.isdir(path) or ext == ".zip" or ext in OPENPYXL_EXTS
+
+
+def read_import_book(path: str, workers: int = 1) -> Tuple[Dict[str, "pd.DataFrame"], List[str]]:
+    """
+    Lectura inicial de una importación: ({hoja: DataFrame}, hojas presentes).
+
+    - Sin pool (parse_in_pool) lee todas las IMPORT_SHEETS en una sola pasada: las hojas
+      presentes salen de esa misma lectura y prepare_sheets prepara FactCompras/FactVentas
+      desde esos DataFrames (`frames`), sin volver a abrir el libro.
+    - Con pool cada proceso lee su hoja de datos: acá sólo Parametros/Socios y sheet_names.
+    """
+    if parse_in_pool(path, workers):
+        return read_import_sheets(path, ("Parametros", "Socios")), sheet_names(path)
+    frames = read_import_sheets(path)
+    return frames, list(frames)
+
+
+def prepare_sheets(
+    path: str,
+    ctx: ImportContext,
+    sheets: Sequence[str] = DATA_SHEETS,
+    workers: int = 1,
+    frames: Optional[Dict[str, "pd.DataFrame"]] = None,
+) -> Dict[str, PreparedSheet]:
+    """
+    Prepara las hojas de datos; con pool (parse_in_pool) cada hoja se lee y normaliza en
+    su propio proceso y el llamador sólo junta los resultados para la fase de escritura.
+    En el mismo proceso usa `frames` (las hojas ya leídas por read_import_book) o lee
+    todas las hojas en una sola pasada.
+
+    Si el pool se rompe (p.ej. un proceso muerto por memoria) se recrea la próxima
+    vez y esta importación sigue en el proceso actual.
+    """
+    global _parse_pool
+    pool = get_parse_pool(min(workers, len(sheets))) if parse_in_pool(path, workers, sheets) else None
+    if pool is not None:
+        from concurrent.futures.process import BrokenProcessPool
+
+        try:
+            futures = {s: pool.submit(load_and_prepare_sheet, path, s, ctx) for s in sheets}
+            return {s: f.result() for s, f in futures.items()}
+        except BrokenProcessPool:
+            _parse_pool = None
+    if frames is None or any(s not in frames for s in sheets):
+        frames = read_import_sheets(path, sheets)
+    out = {}
+    for s in sheets:
+        if frames.get(s) is None:
+            raise ValueError(f"Falta la hoja {s} en el archivo")
+        out[s] = prepare_sheet(s, frames[s], ctx)
+    return out
+
+
+# ------------------- Validación sin escritura (dry run) -------------------
+
+# TIPO de comprobante conocidos (A/B van a ARCA; N y X se excluyen en reportes)
+KNOWN_TIPOS = ("A", "B", "C", "N", "X")
+# Parámetros de la hoja Parametros que cambian la normalización de filas
+CONTEXT_PARAMS = {
+    "iva_deducible_normal_pct": "p_norm",
+    "iva_deducible_personal_default_pct": "p_pers_def",
+}
+
+
+def overlay_context(
+    ctx: ImportContext, df_par: Optional["pd.DataFrame"], df_soc: Optional["pd.DataFrame"]
+) -> ImportContext:
+    """
+    Contexto que tendría la importación después del upsert de Parametros/Socios,
+    sin escribir nada: los socios nuevos del libro reciben ids provisorios negativos.
+    """
+    socios = dict(ctx.socios)
+    params = {"p_norm": ctx.p_norm, "p_pers_def": ctx.p_pers_def, "socio_oblig": ctx.socio_oblig}
+    if df_par is not None and {"Parametro", "Valor"}.issubset(df_par.columns):
+        for clave, valor in zip(df_par["Parametro"], df_par["Valor"]):
+            try:
+                valor = float(valor)
+            except (TypeError, ValueError):
+                continue
+            clave = str(clave).strip()
+            if clave in CONTEXT_PARAMS:
+                params[CONTEXT_PARAMS[clave]] = valor
+            elif clave == "nombre_socio_obligatorio":
+                params["socio_oblig"] = bool(int(valor))
+    if df_soc is not None and "nombre_socio" in df_soc.columns:
+        for nombre in df_soc["nombre_socio"].dropna():
+            nombre = str(nombre).strip()
+            if nombre and nombre not in socios:
+                socios[nombre] = -(len(socios) + 1)
+    return ImportContext(socios=socios, **params)
+
+
+def _motivo_tipo(motivo: str) -> str:
+    """'PESOS_SIN_IVA no numérico: abc' -> 'PESOS_SIN_IVA no numérico' (para agrupar)."""
+    return str(motivo).split(":", 1)[0]
+
+
+def summarize_dry_run(
+    prepared: Dict[str, PreparedSheet], diffs: Dict[str, RowDiff], existentes: Dict[str, int]
+) -> Dict[str, Any]:
+    """
+    Resumen de lo que haría la importación, por hoja: YMs afectados, filas existentes en
+    esos YMs, altas/cambios/bajas/sin cambios, rechazos por motivo y TIPO fuera de KNOWN_TIPOS.
+    """
+    hojas = {}
+    for sheet, prep in prepared.items():
+        diff = diffs[sheet]
+        tipos: Dict[str, int] = {}
+        for r in prep.records:
+            tipos[r["tipo"] or ""] = tipos.get(r["tipo"] or "", 0) + 1
+        motivos: Dict[str, int] = {}
+        for r in prep.rechazos:
+            m = _motivo_tipo(r["motivo"])
+            motivos[m] = motivos.get(m, 0) + 1
+        hojas[sheet] = {
+            "filas": prep.rows,
+            "validas": len(prep.records),
+            "rechazos": len(prep.rechazos),
+            "yms": prep.yms,
+            "existentes": existentes.get(sheet, 0),
+            "insertar": len(diff.inserts),
+            "actualizar": len(diff.updates),
+            "borrar": len(diff.deletes),
+            "sin_cambios": diff.unchanged,
+            "tipos": dict(sorted(tipos.items())),
+            "tipos_desconocidos": {t: n for t, n in sorted(tipos.items()) if t not in KNOWN_TIPOS},
+            "motivos": dict(sorted(motivos.items(), key=lambda kv: -kv[1])),
+        }
+    return {
+        "hojas": hojas,
+        "rechazos": sum(h["rechazos"] for h in hojas.values()),
+        "advertencias": sum(sum(h["tipos_desconocidos"].values()) for h in hojas.values()),
+    }
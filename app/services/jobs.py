@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Trabajos de importación en segundo plano.
+
+Un `JobRegistry` mantiene en memoria los trabajos enviados a un pool de hilos
+y su progreso (fase, filas procesadas, rechazos, tiempo transcurrido), para que
+las rutas web devuelvan un id enseguida y la UI consulte el estado.
+
+El registro vive en el proceso: con varios workers de gunicorn cada uno ve
+sólo sus propios trabajos (el Procfile levanta uno solo).
+"""
+from __future__ import annotations
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+PHASES = ("queued", "download", "parse", "delete", "insert", "done", "error")
+
+
+@dataclass
+class ImportJob:
+    id: str
+    fuente: str
+    phase: str = "queued"
+    rows: int = 0
+    rechazos: int = 0
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    messages: List[Any] = field(default_factory=list)
+
+    def progress(self, phase: str, rows: Optional[int] = None, rechazos: Optional[int] = None) -> None:
+        """Callback de progreso que recibe do_import_excel_from_path."""
+        self.phase = phase
+        if rows is not None:
+            self.rows = rows
+        if rechazos is not None:
+            self.rechazos = rechazos
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return round((self.finished or time.time()) - self.started, 2)
+
+    @property
+    def terminado(self) -> bool:
+        return self.phase in ("done", "error")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "fuente": self.fuente,
+            "phase": self.phase,
+            "rows": self.rows,
+            "rechazos": self.rechazos,
+            "elapsed": self.elapsed,
+            "done": self.terminado,
+            "result": self.result,
+            "error": self.error,
+            "messages": self.messages,
+        }
+
+
+class JobRegistry:
+    """Pool de hilos + registro de ImportJob (conserva los últimos `keep` trabajos)."""
+
+    def __init__(self, max_workers: int = 1, keep: int = 50):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="import")
+        self._jobs: Dict[str, ImportJob] = {}
+        self._lock = threading.Lock()
+        self._keep = keep
+
+    def submit(self, fuente: str, fn: Callable[[ImportJob], Optional[Dict[str, Any]]]) -> ImportJob:
+        """
+        Encola `fn(job)` y devuelve el ImportJob enseguida.
+
+        `fn` informa avance con job.progress(...) y devuelve el dict de resultado;
+        si lanza una excepción el trabajo queda en fase 'error'.
+        """
+        job = ImportJob(id=uuid.uuid4().hex[:12], fuente=fuente)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+
+        def _run():
+            job.started = time.time()
+            try:
+                job.result = fn(job)
+                job.phase = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.phase = "error"
+            finally:
+                job.finished = time.time()
+
+        self._executor.submit(_run)
+        return job
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        terminados = [j for j in self._jobs.values() if j.terminado]
+        sobran = len(self._jobs) - self._keep
+        for j in sorted(terminados, key=lambda j: j.created)[: max(sobran, 0)]:
+            del self._jobs[j.id]
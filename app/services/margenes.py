@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Márgenes por socio del Resumen Socio (build_resumen_socio en main.py).
+
+Un 'Socio' cobra margen_Socio sobre la ganancia neta de cada otro 'Socio' y una
+'Empresa' cobra margen_Empresa sobre la de todos los 'Socio'. Los aportes se suman
+una vez y a cada socio se le descuenta el propio: O(n) en vez de recorrer los pares.
+Montos en centavos enteros.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Sequence
+
+
+def calcular_margenes(socios: Sequence[Dict[str, Any]], p_emp: float, p_ven: float, p_soc: float) -> List[Dict[str, int]]:
+    """
+    Márgenes de cada socio a partir de su ganancia neta.
+
+    Parámetros:
+    - socios: dicts con 'tipo' ('Socio' / 'Empresa') y 'gn' (ganancia neta en centavos).
+    - p_emp / p_ven / p_soc: márgenes de empresa, vendedor y socio.
+
+    Devuelve:
+    - una lista alineada con `socios` con Margen_Empresa, Margen_Vendedor, Margen_Socios,
+      Margen_Otros_Socios y Total_Margenes en centavos. Cada aporte se redondea al centavo
+      antes de sumarse, igual que el cálculo por pares original.
+    """
+    aporte_soc = [round(s["gn"] * p_soc) if s["tipo"] == "Socio" else 0 for s in socios]
+    aporte_emp = [round(s["gn"] * p_emp) if s["tipo"] == "Socio" else 0 for s in socios]
+    total_soc = sum(aporte_soc)
+    total_emp = sum(aporte_emp)
+
+    out = []
+    for s, propio in zip(socios, aporte_soc):
+        gn, tipo = s["gn"], s["tipo"]
+        margen_vendedor = round(gn * p_ven)
+        margen_socio = round(gn * p_soc) if tipo == "Socio" else 0
+        if tipo == "Socio":
+            margen_otros = total_soc - propio
+        elif tipo == "Empresa":
+            margen_otros = total_emp
+        else:
+            margen_otros = 0
+        out.append(
+            {
+                "Margen_Empresa": round(gn * p_emp),
+                "Margen_Vendedor": margen_vendedor,
+                "Margen_Socios": margen_socio,
+                "Margen_Otros_Socios": margen_otros,
+                "Total_Margenes": margen_vendedor + margen_socio + margen_otros,
+            }
+        )
+    return out
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Migraciones versionadas del esquema SQLite.
+
+Cada migración (función conn -> None o script db/migrations/NNNN_nombre.sql) se
+aplica una sola vez, en orden de versión y en su propia transacción, y queda
+registrada en `schema_migrations`. main.py arma la lista (MIGRACIONES) y la corre
+al arrancar y desde `flask db-migrate`.
+"""
+from __future__ import annotations
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+
+TABLA = "schema_migrations"
+_ARCHIVO = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+@dataclass(frozen=True)
+class Migracion:
+    version: int
+    nombre: str
+    aplicar: Callable  # conn (Connection de SQLAlchemy) -> None
+
+
+def sentencias_sql(script: str) -> List[str]:
+    """Separa un script SQL en sentencias completas (respeta ';' dentro de textos y triggers)."""
+    out, actual = [], ""
+    for linea in script.splitlines(keepends=True):
+        actual += linea
+        if sqlite3.complete_statement(actual):
+            out.append(actual.strip())
+            actual = ""
+    resto = "\n".join(l for l in actual.splitlines() if not l.strip().startswith("--")).strip()
+    if resto:  # última sentencia sin ';'
+        out.append(resto)
+    return out
+
+
+def migracion_sql(version: int, nombre: str, script: str) -> Migracion:
+    """Migración que ejecuta las sentencias de `script`, una por una."""
+
+    def aplicar(conn):
+        for sentencia in sentencias_sql(script):
+            conn.exec_driver_sql(sentencia)
+
+    return Migracion(version, nombre, aplicar)
+
+
+def migraciones_sql(directorio: str) -> List[Migracion]:
+    """Migraciones de los archivos `NNNN_nombre.sql` de `directorio` (los demás se ignoran)."""
+    out = []
+    if not os.path.isdir(directorio):
+        return out
+    for archivo in sorted(os.listdir(directorio)):
+        m = _ARCHIVO.match(archivo)
+        if not m:
+            continue
+        with open(os.path.join(directorio, archivo), encoding="utf-8") as f:
+            out.append(migracion_sql(int(m.group(1)), m.group(2), f.read()))
+    return out
+
+
+def agregar_columnas(conn, columnas: Mapping[str, Mapping[str, str]]) -> None:
+    """
+    ALTER TABLE ... ADD COLUMN de las columnas que falten (tabla -> {columna: tipo SQL}).
+    SQLite no tiene ADD COLUMN IF NOT EXISTS: una base nueva ya las trae del modelo.
+    """
+    insp = sa_inspect(conn)
+    for tabla, cols in columnas.items():
+        existentes = {c["name"] for c in insp.get_columns(tabla)}
+        for nombre, ddl in cols.items():
+            if nombre not in existentes:
+                conn.exec_driver_sql(f"ALTER TABLE {tabla} ADD COLUMN {nombre} {ddl}")
+
+
+def reconstruir_tabla(conn, tabla, conversiones: Optional[Mapping[str, str]] = None) -> None:
+    """
+    Recrea `tabla` (Table de SQLAlchemy) con su definición actual y copia las filas: SQLite
+    no cambia el tipo de una columna con ALTER TABLE.
+
+    Parámetros:
+    - conn: Connection dentro de la transacción de la migración.
+    - tabla: la Table del modelo (se crea con sus índices).
+    - conversiones: columna -> expresión SQL sobre la tabla vieja; las demás columnas que
+      existan en las dos se copian tal cual.
+
+    Los índices que la base tenía y el modelo no declara (p.ej. los de una migración SQL) se
+    vuelven a crear con la misma definición.
+    """
+    nombre, vieja = tabla.name, f"_{tabla.name}_vieja"
+    indices = conn.exec_driver_sql(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (nombre,)
+    ).all()
+    existentes = [r[1] for r in conn.exec_driver_sql(f"PRAGMA table_info({nombre})")]
+    for indice, _ in indices:
+        conn.exec_driver_sql(f"DROP INDEX {indice}")
+    conn.exec_driver_sql(f"ALTER TABLE {nombre} RENAME TO {vieja}")
+    tabla.create(conn)
+    destino = [c.name for c in tabla.columns if c.name in existentes]
+    origen = [(conversiones or {}).get(c, c) for c in destino]
+    conn.exec_driver_sql(f"INSERT INTO {nombre} ({', '.join(destino)}) SELECT {', '.join(origen)} FROM {vieja}")
+    conn.exec_driver_sql(f"DROP TABLE {vieja}")
+    for _, sql in indices:
+        conn.exec_driver_sql(re.sub(r"^CREATE (UNIQUE )?INDEX ", r"CREATE \1INDEX IF NOT EXISTS ", sql))
+
+
+def _crear_tabla(engine) -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {TABLA} (version INTEGER PRIMARY KEY, nombre TEXT NOT NULL, aplicada TEXT NOT NULL)"
+        )
+
+
+def versiones_aplicadas(engine) -> Dict[int, tuple]:
+    """Versiones ya aplicadas: version -> (nombre, fecha de aplicación)."""
+    _crear_tabla(engine)
+    with engine.connect() as conn:
+        return {v: (n, a) for v, n, a in conn.exec_driver_sql(f"SELECT version, nombre, aplicada FROM {TABLA}")}
+
+
+def migrar(engine, migraciones: Iterable[Migracion], hasta: Optional[int] = None) -> List[Migracion]:
+    """
+    Aplica, en orden de versión, las migraciones que falten.
+
+    Qué hace:
+    - Cada migración corre en su propia transacción junto con su fila en schema_migrations:
+      si falla, no queda aplicada a medias ni registrada, y el error se propaga.
+    - La fila se inserta antes de aplicar: con varios procesos arrancando a la vez (workers
+      de gunicorn) el segundo espera el lock y, al chocar con la versión ya registrada, la salta.
+
+    Parámetros:
+    - engine: Engine de SQLAlchemy.
+    - migraciones: Migracion (versiones únicas; ValueError si se repiten).
+    - hasta: última versión a aplicar (None = todas).
+
+    Devuelve:
+    - las migraciones aplicadas en esta corrida.
+
+    Quién la consume:
+    - main.migrate_db (arranque de la app y `flask --app main db-migrate`).
+    """
+    orden = sorted(migraciones, key=lambda m: m.version)
+    versiones = [m.version for m in orden]
+    if len(set(versiones)) != len(versiones):
+        raise ValueError(f"Versiones de migración repetidas: {versiones}")
+    hechas = versiones_aplicadas(engine)
+    nuevas = []
+    for m in orden:
+        if m.version in hechas or (hasta is not None and m.version > hasta):
+            continue
+        with engine.connect() as conn:
+            tx = conn.begin()
+            try:
+                conn.exec_driver_sql(
+                    f"INSERT INTO {TABLA} (version, nombre, aplicada) VALUES (?, ?, ?)",
+                    (m.version, m.nombre, datetime.now().isoformat(timespec="seconds")),
+                )
+            except IntegrityError:
+                tx.rollback()  # la aplicó otro proceso
+                continue
+            try:
+                m.aplicar(conn)
+            except Exception:
+                tx.rollback()
+                raise
+            tx.commit()
+        nuevas.append(m)
+    return nuevas
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Cursores de la paginación keyset de /compras y /ventas.
+
+El cursor de la URL codifica (valor de la columna ordenable, id) de la última o
+primera fila vista; main.keyset_page arma con él la condición SQL y armar_pagina
+recorta la página y genera los cursores siguiente / anterior.
+"""
+from __future__ import annotations
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class Pagina:
+    items: List[Any]
+    siguiente: Optional[str] = None  # cursor para ?after=
+    anterior: Optional[str] = None  # cursor para ?before=
+
+
+def encode_cursor(valor: Any, row_id: int, orden: str = "") -> str:
+    """
+    Codifica la clave (valor de la columna ordenable, id) en un token apto para URL.
+
+    `orden` (p.ej. 'fecha') queda dentro del token: un cursor de otro orden se ignora.
+    """
+    if isinstance(valor, date):
+        valor = {"d": valor.isoformat()}
+    raw = json.dumps([orden, valor, int(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str], orden: str = "") -> Optional[Tuple[Any, int]]:
+    """
+    Inverso de encode_cursor: devuelve (valor, id) o None si el token falta, está
+    corrupto o corresponde a otro orden (la vista vuelve a la primera página).
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        tok_orden, valor, row_id = json.loads(raw.decode("utf-8"))
+        if isinstance(valor, dict):
+            valor = date.fromisoformat(valor["d"])
+        row_id = int(row_id)
+    except (binascii.Error, ValueError, TypeError, KeyError, UnicodeDecodeError):
+        return None
+    if tok_orden != orden:
+        return None
+    return valor, row_id
+
+
+def armar_pagina(
+    filas: Sequence[Any],
+    size: int,
+    clave: Callable[[Any], Tuple[Any, int]],
+    orden: str = "",
+    con_cursor: bool = False,
+    hacia_atras: bool = False,
+) -> Pagina:
+    """
+    Recorta a `size` las filas leídas (se piden size + 1 para saber si hay más) y arma
+    los cursores de la página siguiente / anterior.
+
+    Parámetros:
+    - filas: en el orden en que se recorrieron (invertido si `hacia_atras`).
+    - clave: fila -> (valor de la columna ordenable, id).
+    - con_cursor: la página se pidió a partir de un cursor (hay filas del otro lado).
+    - hacia_atras: la página se pidió con ?before= (se recorrió en orden inverso).
+    """
+    hay_mas = len(filas) > size
+    items = list(filas[:size])
+    if hacia_atras:
+        items.reverse()
+    if not items:
+        return Pagina([])
+    mas_adelante = con_cursor if hacia_atras else hay_mas
+    mas_atras = hay_mas if hacia_atras else con_cursor
+    return Pagina(
+        items,
+        siguiente=encode_cursor(*clave(items[-1]), orden) if mas_adelante else None,
+        anterior=encode_cursor(*clave(items[0]), orden) if mas_atras else None,
+    )
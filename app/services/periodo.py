@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Periodo de los reportes: selector año/mes (1313 = todos los años, 13 = todos los
+meses), trimestres ('T1'..'T4') y rangos desde/hasta.
+
+Cada periodo es un rango semiabierto [desde, hasta) de claves enteras yyyymm que
+main.periodo_condition aplica sobre `fecha` (compras/ventas) o `yyyymm` (rollup).
+"""
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Mapping, Optional
+
+ANIO_TODOS = 1313  # "Todos" en el selector de año
+MES_TODOS = 13  # "Todos" en el selector de mes
+MESES = (
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre",
+)
+
+_YM = re.compile(r"^(\d{4})-(\d{2})$")
+
+
+def sumar_meses(yyyymm: int, n: int) -> int:
+    """yyyymm + n meses (202512 + 1 -> 202601)."""
+    y, m = divmod(yyyymm // 100 * 12 + yyyymm % 100 - 1 + n, 12)
+    return y * 100 + m + 1
+
+
+def yyyymm(texto: str) -> Optional[int]:
+    """'YYYY-MM' -> yyyymm entero; None si no es un mes válido."""
+    m = _YM.match((texto or "").strip())
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        return None
+    return int(m.group(1)) * 100 + int(m.group(2))
+
+
+def ym_texto(clave: int) -> str:
+    """yyyymm entero -> 'YYYY-MM' (formato de la columna ym)."""
+    return f"{clave // 100:04d}-{clave % 100:02d}"
+
+
+@dataclass(frozen=True)
+class Periodo:
+    """
+    Rango semiabierto de meses [desde, hasta) en claves yyyymm.
+
+    - desde / hasta en None: sin límite de ese lado (Periodo.todos()).
+    - vacio: no incluye ningún mes (año "Todos" con un mes puntual, como antes).
+    - clave: texto estable para nombres de archivo y la querystring (?ym=).
+    - titulo: texto para los encabezados de las plantillas.
+    """
+
+    desde: Optional[int] = None
+    hasta: Optional[int] = None
+    clave: str = "all"
+    titulo: str = "todos los años"
+
+    @classmethod
+    def todos(cls) -> "Periodo":
+        return cls()
+
+    @classmethod
+    def ninguno(cls) -> "Periodo":
+        return cls(0, 0, "none", "sin datos")
+
+    @classmethod
+    def anio(cls, year: int) -> "Periodo":
+        return cls(year * 100 + 1, (year + 1) * 100 + 1, f"{year:04d}", f"año {year}")
+
+    @classmethod
+    def mes(cls, year: int, month: int) -> "Periodo":
+        desde = year * 100 + month
+        return cls(desde, sumar_meses(desde, 1), ym_texto(desde), f"{MESES[month - 1]} / Año: {year}")
+
+    @classmethod
+    def trimestre(cls, year: int, q: int) -> "Periodo":
+        desde = year * 100 + 3 * (q - 1) + 1
+        return cls(desde, sumar_meses(desde, 3), f"{year:04d}-T{q}", f"{q}º trimestre {year}")
+
+    @classmethod
+    def rango(cls, desde: int, hasta: int) -> "Periodo":
+        """Meses `desde` a `hasta` inclusive (yyyymm); invertidos se ordenan."""
+        desde, hasta = sorted((desde, hasta))
+        return cls(
+            desde,
+            sumar_meses(hasta, 1),
+            f"{ym_texto(desde)}_{ym_texto(hasta)}",
+            f"{ym_texto(desde)} a {ym_texto(hasta)}",
+        )
+
+    @property
+    def vacio(self) -> bool:
+        return self.desde is not None and self.hasta is not None and self.desde >= self.hasta
+
+    @property
+    def un_mes(self) -> Optional[str]:
+        """'YYYY-MM' si el periodo es exactamente un mes (permite ym = :ym con los índices por ym)."""
+        if self.desde is None or self.hasta is None or self.hasta != sumar_meses(self.desde, 1):
+            return None
+        return ym_texto(self.desde)
+
+    @property
+    def fecha_desde(self) -> Optional[date]:
+        return None if self.desde is None else date(self.desde // 100, self.desde % 100, 1)
+
+    @property
+    def fecha_hasta(self) -> Optional[date]:
+        return None if self.hasta is None else date(self.hasta // 100, self.hasta % 100, 1)
+
+    def contiene(self, clave: Optional[int]) -> bool:
+        """¿El mes yyyymm `clave` cae en el periodo?"""
+        if clave is None or self.vacio:
+            return False
+        return (self.desde is None or clave >= self.desde) and (self.hasta is None or clave < self.hasta)
+
+
+def periodo_desde_ym(texto: Optional[str]) -> Optional[Periodo]:
+    """
+    Parsea la clave de un periodo: 'all', 'none', 'YYYY', 'YYYY-*', 'YYYY-MM', 'YYYY-Tn' o
+    'YYYY-MM_YYYY-MM'. Devuelve None si viene vacío o no se reconoce.
+    """
+    t = (texto or "").strip()
+    if t == "all":
+        return Periodo.todos()
+    if t == "none":
+        return Periodo.ninguno()
+    if re.fullmatch(r"\d{4}(-\*)?", t):
+        return Periodo.anio(int(t[:4]))
+    m = re.fullmatch(r"(\d{4})-T([1-4])", t)
+    if m:
+        return Periodo.trimestre(int(m.group(1)), int(m.group(2)))
+    if "_" in t:
+        a, _, b = t.partition("_")
+        a, b = yyyymm(a), yyyymm(b)
+        return Periodo.rango(a, b) if a and b else None
+    clave = yyyymm(t)
+    return Periodo.mes(clave // 100, clave % 100) if clave else None
+
+
+def periodo_desde_args(args: Mapping[str, str], default_year: int, default_month=MES_TODOS) -> Periodo:
+    """
+    Periodo pedido en la querystring de una vista.
+
+    Parámetros:
+    - args: request.args. Se reconocen, en orden:
+      - desde / hasta ('YYYY-MM'): rango de meses inclusive;
+      - year (1313 = todos) y month (1-12, 13 = todos, 'T1'..'T4' = trimestre).
+    - default_year / default_month: valores cuando no vienen year / month.
+
+    Devuelve:
+    - el Periodo; un mes o trimestre fuera de rango (o un mes puntual con año "Todos")
+      da un periodo vacío, como el ym inexistente de antes.
+
+    Errores:
+    - ValueError si year / month no son números (igual que el int() que hacía cada vista).
+    """
+    desde, hasta = yyyymm(args.get("desde") or ""), yyyymm(args.get("hasta") or "")
+    if desde and hasta:
+        return Periodo.rango(desde, hasta)
+    year = int(args.get("year") or default_year)
+    month = str(args.get("month") or default_month).strip().upper()
+    if month.startswith("T"):
+        q = int(month[1:])
+        if year == ANIO_TODOS or not 1 <= q <= 4:
+            return Periodo.ninguno()
+        return Periodo.trimestre(year, q)
+    month = int(month)
+    if year == ANIO_TODOS:
+        return Periodo.todos() if month == MES_TODOS else Periodo.ninguno()
+    if month == MES_TODOS:
+        return Periodo.anio(year)
+    if not 1 <= month <= 12:
+        return Periodo.ninguno()
+    return Periodo.mes(year, month)
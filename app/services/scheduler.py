@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Sincronización periódica de Google Sheets.
+
+- SheetLock: candado por Sheet (hilo + flock) para que no corran dos
+  sincronizaciones del mismo Sheet, tampoco desde otro proceso.
+- run_sync: corre una sincronización y mide duración / estado.
+- SyncScheduler: hilo que recorre los Sheets cada `interval` segundos con la
+  función de descarga/importación que le pasa main.py.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional
+
+try:
+    import fcntl
+except Exception:  # Windows: sólo queda el candado entre hilos
+    fcntl = None
+
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+class SheetBusy(RuntimeError):
+    """Ya hay una sincronización en curso para ese Sheet."""
+
+
+class SheetLock:
+    """Candado no bloqueante por Sheet: `with SheetLock(dir, sid):` o SheetBusy."""
+
+    def __init__(self, lock_dir: str, sheet_id: str):
+        self.sheet_id = sheet_id
+        nombre = hashlib.sha1(sheet_id.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(lock_dir, f".sync_{nombre}.lock")
+        with _thread_locks_guard:
+            self._lock = _thread_locks.setdefault(sheet_id, threading.Lock())
+        self._fh = None
+
+    def __enter__(self):
+        if not self._lock.acquire(blocking=False):
+            raise SheetBusy(f"Ya hay una sincronización en curso para {self.sheet_id}")
+        if fcntl is not None:
+            self._fh = open(self.path, "a")
+            try:
+                fcntl.flock(self._fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._fh.close()
+                self._fh = None
+                self._lock.release()
+                raise SheetBusy(f"Otro proceso está sincronizando {self.sheet_id}")
+        return self
+
+    def __exit__(self, *exc):
+        if self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+        self._lock.release()
+        return False
+
+
+@dataclass
+class SyncOutcome:
+    sheet_id: str
+    estado: str  # ok / sin_cambios / ocupado / error
+    inicio: float
+    duracion: float
+    detalle: str = ""
+
+
+def run_sync(
+    sheet_id: str,
+    sync_fn: Callable[[str], Optional[dict]],
+    record: Optional[Callable[[SyncOutcome], None]] = None,
+) -> SyncOutcome:
+    """
+    Corre sync_fn(sheet_id) midiendo duración y resultado.
+
+    - sync_fn toma el SheetLock del Sheet y devuelve el dict de resultado de la
+      importación (sin_cambios=True si no hubo nada nuevo) o lanza excepción.
+    - Si el Sheet ya se está sincronizando (SheetBusy) no espera: estado 'ocupado'.
+    - record(outcome), si se pasa, guarda la corrida (también las fallidas).
+    """
+    inicio = time.time()
+    try:
+        res = sync_fn(sheet_id) or {}
+        estado = "sin_cambios" if res.get("sin_cambios") else "ok"
+        detalle = ""
+    except SheetBusy as e:
+        estado, detalle = "ocupado", str(e)
+    except Exception as e:
+        estado, detalle = "error", str(e)
+    outcome = SyncOutcome(sheet_id, estado, inicio, round(time.time() - inicio, 3), detalle)
+    if record is not None:
+        record(outcome)
+    return outcome
+
+
+class SyncScheduler:
+    """Hilo daemon que sincroniza `sheet_ids` cada `interval` segundos (la primera vez al arrancar)."""
+
+    def __init__(
+        self,
+        sheet_ids: Iterable[str],
+        interval: float,
+        run_one: Callable[[str], SyncOutcome],
+    ):
+        self.sheet_ids = [s for s in sheet_ids if s]
+        self.interval = interval
+        self.run_one = run_one
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_pending(self) -> list:
+        """Una pasada por todos los Sheets (la usan el hilo y el CLI --once)."""
+        return [self.run_one(sid) for sid in self.sheet_ids]
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(self.interval)
+
+    def start(self) -> "SyncScheduler":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="gsheet-sync", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_forever(self) -> None:
+        """Bucle bloqueante para el daemon de CLI (Ctrl+C para salir)."""
+        try:
+            self._loop()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,28 @@
+-- 0003: índices de los reportes sobre compras / ventas (SQLite).
+-- Reemplaza db/patches/2025-08-24-idx-and-checks.sql, que era para Postgres y nunca se
+-- aplicaba a app.db. Los CHECK de tipo no se portan: SQLite no agrega constraints a una
+-- tabla existente; el TIPO lo valida la importación (dry-run: tipos_desconocidos).
+
+-- TIPO normalizado como lo guarda la importación (mayúsculas, sin espacios): arca_filters
+-- compara la columna tal cual y puede usar (tipo, fecha)
+UPDATE compras SET tipo = UPPER(TRIM(tipo)) WHERE tipo <> UPPER(TRIM(tipo));
+UPDATE ventas SET tipo = UPPER(TRIM(tipo)) WHERE tipo <> UPPER(TRIM(tipo));
+UPDATE resumen_mensual SET tipo = UPPER(TRIM(tipo)) WHERE tipo <> UPPER(TRIM(tipo));
+
+-- listados filtrados por socio o estado dentro del mes (ix_*_ym_estado ya viene de LIST_INDEXES)
+CREATE INDEX IF NOT EXISTS ix_compras_ym_socio_id ON compras (ym, socio_id);
+CREATE INDEX IF NOT EXISTS ix_ventas_ym_socio_id ON ventas (ym, socio_id);
+CREATE INDEX IF NOT EXISTS ix_compras_ym_estado ON compras (ym, estado);
+CREATE INDEX IF NOT EXISTS ix_ventas_ym_estado ON ventas (ym, estado);
+
+-- Resumen Caja filtrado por caja
+CREATE INDEX IF NOT EXISTS ix_compras_origen ON compras (origen);
+CREATE INDEX IF NOT EXISTS ix_ventas_destino ON ventas (destino);
+
+-- Resumen ARCA por tipo de comprobante y rango de fechas
+CREATE INDEX IF NOT EXISTS ix_compras_tipo_fecha ON compras (tipo, fecha);
+CREATE INDEX IF NOT EXISTS ix_ventas_tipo_fecha ON ventas (tipo, fecha);
+
+-- Resumen Caja filtrado por transacción (mismo nombre que el index=True de los modelos)
+CREATE INDEX IF NOT EXISTS ix_compras_transaccion_id ON compras (transaccion_id);
+CREATE INDEX IF NOT EXISTS ix_ventas_transaccion_id ON ventas (transaccion_id);
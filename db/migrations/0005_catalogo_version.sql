@@ -0,0 +1,8 @@
+-- 0005: versión del catálogo de opciones de los filtros (main.CatalogoVersion): la suben la
+-- importación y el alta de socios; cada proceso recarga sus listas cacheadas al verla cambiar.
+CREATE TABLE IF NOT EXISTS catalogo_version (
+    id INTEGER NOT NULL PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO catalogo_version (id, version) VALUES (1, 0);
@@ -10,14 +10,47 @@ from flask import (
     url_for,
     flash,
     Response,
+    jsonify,
     send_file,
     send_from_directory,
 )
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import func, literal_column, text
+from sqlalchemy import and_, case, cast, event, false, func, literal, literal_column, select, text, true, tuple_, union_all, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.schema import CreateIndex
 from werkzeug.utils import secure_filename
 
-import os, io, csv, shutil, time, hashlib
+import os, io, csv, json, math, sqlite3, time, hashlib
+import click
+
+from app.services.gsheet import DownloadError, download_to_file
+from app.services.catalogo import Catalogo
+from app.services.dashboard import DashboardMetrics, fold_dashboard
+from app.services.jobs import JobRegistry
+from app.services.margenes import calcular_margenes
+from app.services.migraciones import (
+    Migracion,
+    agregar_columnas,
+    migraciones_sql,
+    migrar,
+    reconstruir_tabla,
+    versiones_aplicadas,
+)
+from app.services.paginacion import armar_pagina, decode_cursor
+from app.services.periodo import MES_TODOS, Periodo, periodo_desde_args, periodo_desde_ym
+from app.services.scheduler import SheetLock, SyncScheduler, run_sync
+from app.services.importer import (
+    DATA_SHEETS,
+    ImportContext,
+    RowDiff,
+    diff_rows,
+    file_sha256,
+    overlay_context,
+    prepare_sheets,
+    read_import_book,
+    split_invoice_number,
+    summarize_dry_run,
+)
 
 
 def color_index(value, num_colors=8):
@@ -37,7 +70,7 @@ except Exception:
     requests = None
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "app.db")
+DB_PATH = os.getenv("DB_PATH") or os.path.join(BASE_DIR, "app.db")
 UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
 BACKUPS_FOLDER = os.path.join(BASE_DIR, "backups")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -48,12 +81,35 @@ app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + DB_PATH
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "change-me-in-prod")
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-ALLOWED_XL = {".xlsx", ".xlsm", ".xls"}
+ALLOWED_XL = {".xlsx", ".xlsm", ".xls", ".zip"}  # .zip: un CSV (o Parquet) por hoja
+# Tamaño de lote para los INSERT masivos de la importación (executemany)
+app.config["IMPORT_CHUNK_SIZE"] = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Procesos para leer/normalizar FactCompras y FactVentas en paralelo (1 = en el mismo proceso)
+app.config["IMPORT_PARSE_WORKERS"] = int(os.getenv("IMPORT_PARSE_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Importaciones en segundo plano (hilos; con SQLite conviene 1 para serializar escrituras)
+app.config["IMPORT_WORKERS"] = int(os.getenv("IMPORT_WORKERS", "1"))
+import_jobs = JobRegistry(max_workers=app.config["IMPORT_WORKERS"])
+# Borrar las filas de los YMs del archivo que ya no vienen en él (el archivo manda en sus meses).
+# En 0, la importación sólo agrega/actualiza por clave natural (feeds parciales o solapados).
+app.config["IMPORT_PRUNE_MISSING"] = os.getenv("IMPORT_PRUNE_MISSING", "1") not in ("0", "false", "no")
+# Espera ante un lock de SQLite antes de fallar con "database is locked" (ms)
+app.config["SQLITE_BUSY_TIMEOUT_MS"] = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+# Aplicar las migraciones pendientes al arrancar; en 0 se corren aparte con `flask --app main db-migrate`
+app.config["AUTO_MIGRATE"] = os.getenv("AUTO_MIGRATE", "1") not in ("0", "false", "no")
+# Filas por página de /compras y /ventas (paginación por cursor)
+app.config["LIST_PAGE_SIZE"] = int(os.getenv("LIST_PAGE_SIZE", "300"))
+# Tope de tamaño de la descarga de Google Sheets (MB)
+app.config["GSHEET_MAX_BYTES"] = int(os.getenv("GSHEET_MAX_MB", "50")) * 1024 * 1024
 
 # ID por defecto de Google Sheet
 app.config["DEFAULT_GSHEET_ID"] = os.getenv(
     "DEFAULT_GSHEET_ID", "1M7BLBqPM3rzrniaekB_EEoaRZ-NDTFp0phFkObRP5Qw"
 )
+# Sincronización periódica: IDs/URLs separados por coma y cada cuántos minutos (0 = sin hilo)
+app.config["GSHEET_SYNC_IDS"] = [
+    s.strip() for s in os.getenv("GSHEET_SYNC_IDS", app.config["DEFAULT_GSHEET_ID"]).split(",") if s.strip()
+]
+app.config["GSHEET_SYNC_MINUTES"] = float(os.getenv("GSHEET_SYNC_MINUTES", "0"))
 
 # ------------------- MODELOS -------------------
 db = SQLAlchemy(app)
@@ -76,14 +132,15 @@ class Parametro(db.Model):
 class Compra(db.Model):
     __tablename__ = "compras"
     id = db.Column(db.Integer, primary_key=True)
-    fecha = db.Column(db.Date, nullable=False)
+    fecha = db.Column(db.Date, nullable=False, index=True)
     ym = db.Column(db.String(7), index=True)
     proveedor = db.Column(db.String(120))
     socio_id = db.Column(db.Integer, db.ForeignKey("socios.id"), nullable=True)
-    pesos_sin_iva = db.Column(db.Float, default=0.0)
-    iva_21 = db.Column(db.Float, default=0.0)
-    iva_105 = db.Column(db.Float, default=0.0)
-    total_con_iva = db.Column(db.Float, default=0.0)
+    # montos en centavos enteros (las sumas en SQL son exactas); a pesos sólo al mostrar / exportar
+    pesos_sin_iva = db.Column(db.Integer, default=0)
+    iva_21 = db.Column(db.Integer, default=0)
+    iva_105 = db.Column(db.Integer, default=0)
+    total_con_iva = db.Column(db.Integer, default=0)
     tipo = db.Column(db.String(5))
     nro_factura = db.Column(db.String(50))
     cuit = db.Column(db.String(20))
@@ -93,18 +150,23 @@ class Compra(db.Model):
     personal = db.Column(db.Boolean, default=False)
     iva_deducible_pct = db.Column(db.Float, default=None)
     transaccion_id = db.Column(db.String(100), nullable=True, index=True)
+    # Huellas de importación (ver app.services.importer.add_fingerprints); row_key es la
+    # clave natural (tipo + CUIT + PV + número) y el blanco del INSERT ... ON CONFLICT
+    row_key = db.Column(db.String(40), nullable=True, unique=True, index=True)
+    row_hash = db.Column(db.String(40), nullable=True)
 
 class Venta(db.Model):
     __tablename__ = "ventas"
     id = db.Column(db.Integer, primary_key=True)
-    fecha = db.Column(db.Date, nullable=False)
+    fecha = db.Column(db.Date, nullable=False, index=True)
     ym = db.Column(db.String(7), index=True)
     cliente = db.Column(db.String(120))
     socio_id = db.Column(db.Integer, db.ForeignKey("socios.id"), nullable=True)
-    pesos_sin_iva = db.Column(db.Float, default=0.0)
-    iva_21 = db.Column(db.Float, default=0.0)
-    iva_105 = db.Column(db.Float, default=0.0)
-    total_con_iva = db.Column(db.Float, default=0.0)
+    # montos en centavos enteros, como en Compra
+    pesos_sin_iva = db.Column(db.Integer, default=0)
+    iva_21 = db.Column(db.Integer, default=0)
+    iva_105 = db.Column(db.Integer, default=0)
+    total_con_iva = db.Column(db.Integer, default=0)
     nro_factura = db.Column(db.String(50))
     cuit_venta = db.Column(db.String(20))
     destino = db.Column(db.String(50))
@@ -112,10 +174,157 @@ class Venta(db.Model):
     descripcion = db.Column(db.String(255))
     tipo = db.Column(db.String(5))
     transaccion_id = db.Column(db.String(100), nullable=True, index=True)
+    # Huellas de importación (ver app.services.importer.add_fingerprints); row_key es la
+    # clave natural (tipo + CUIT + PV + número) y el blanco del INSERT ... ON CONFLICT
+    row_key = db.Column(db.String(40), nullable=True, unique=True, index=True)
+    row_hash = db.Column(db.String(40), nullable=True)
+
+
+class Importacion(db.Model):
+    """Registro de archivos importados (hash del contenido + resultado en JSON)."""
+    __tablename__ = "importaciones"
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    archivo = db.Column(db.String(255))
+    creado = db.Column(db.DateTime, default=datetime.now)
+    resultado = db.Column(db.Text)
+    # Descargas de Google Sheets: URL y validadores HTTP para el pedido condicional
+    origen = db.Column(db.String(512))
+    etag = db.Column(db.String(255))
+    last_modified = db.Column(db.String(64))
+
+
+class ResumenMensual(db.Model):
+    """
+    Totales por mes de compras y ventas (rollup), agrupados por las dimensiones que usan
+    los reportes. Se recalcula por YM en cada importación (refresh_rollup).
+    """
+    __tablename__ = "resumen_mensual"
+    id = db.Column(db.Integer, primary_key=True)
+    ym = db.Column(db.String(7), index=True)
+    # mismo mes como entero yyyymm: los periodos (app.services.periodo) filtran por rango
+    yyyymm = db.Column(db.Integer, index=True)
+    operacion = db.Column(db.String(6))  # COMPRA / VENTA
+    socio_id = db.Column(db.Integer, nullable=True)
+    tipo = db.Column(db.String(5))
+    caja = db.Column(db.String(50))  # origen (compras) / destino (ventas)
+    estado = db.Column(db.String(20))
+    personal = db.Column(db.Boolean, default=False)
+    filas = db.Column(db.Integer, default=0)
+    # montos en centavos: sumas enteras de las columnas de compras / ventas
+    pesos_sin_iva = db.Column(db.Integer, default=0)
+    iva_21 = db.Column(db.Integer, default=0)
+    iva_105 = db.Column(db.Integer, default=0)
+    # total efectivo: total_con_iva o, si está en 0/NULL, neto + IVA (total_con_iva_expr)
+    total_con_iva = db.Column(db.Integer, default=0)
+    # IVA deducible: Σ IVA × iva_deducible_pct (acotado a 0..1) de las filas que lo traen;
+    # las que no, suman su IVA en iva_sin_pct y el default (normal/personal) se aplica al leer.
+    # iva_pct y gasto_real son centavos con fracción (productos por un porcentaje)
+    iva_pct = db.Column(db.Float, default=0.0)
+    iva_sin_pct = db.Column(db.Integer, default=0)
+    # compras: neto + IVA no deducible (egreso real de la caja, como en resumen_caja)
+    gasto_real = db.Column(db.Float, default=0.0)
+
+
+class SyncRun(db.Model):
+    """Corridas de la sincronización periódica de Google Sheets (duración y resultado)."""
+    __tablename__ = "sync_runs"
+    id = db.Column(db.Integer, primary_key=True)
+    sheet_id = db.Column(db.String(512), nullable=False, index=True)
+    inicio = db.Column(db.DateTime, default=datetime.now)
+    duracion = db.Column(db.Float)
+    estado = db.Column(db.String(20))  # ok / sin_cambios / ocupado / error
+    detalle = db.Column(db.Text)
+
+
+class CatalogoVersion(db.Model):
+    """Versión de las listas de los filtros (una fila, id=1): ver app.services.catalogo."""
+    __tablename__ = "catalogo_version"
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Columnas agregadas después de creadas las tablas: se suman con ALTER TABLE si faltan
+SCHEMA_COLUMNS = {
+    "compras": {"row_key": "VARCHAR(40)", "row_hash": "VARCHAR(40)"},
+    "ventas": {"tipo": "VARCHAR(5)", "row_key": "VARCHAR(40)", "row_hash": "VARCHAR(40)"},
+    "importaciones": {"origen": "VARCHAR(512)", "etag": "VARCHAR(255)", "last_modified": "VARCHAR(64)"},
+    "resumen_mensual": {"yyyymm": "INTEGER"},
+}
+# Índices únicos agregados después: tabla -> (nombre, columna)
+SCHEMA_UNIQUE_INDEXES = {
+    "compras": ("ix_compras_row_key", "row_key"),
+    "ventas": ("ix_ventas_row_key", "row_key"),
+}
+
+
+def _sqlite_transactions(engine, busy_timeout_ms: int = 30000):
+    """
+    Deja que SQLAlchemy maneje BEGIN/SAVEPOINT en SQLite (receta de la doc de SQLAlchemy).
+
+    pysqlite abre la transacción recién en el primer INSERT/UPDATE: un SAVEPOINT emitido
+    antes pasa a ser la transacción y su RELEASE ya confirma todo. Con BEGIN explícito los
+    begin_nested() de la importación son SAVEPOINTs reales dentro de una sola transacción.
+
+    Con BEGIN explícito también las lecturas de cada request quedan en una transacción
+    abierta hasta el teardown: en modo WAL un lector no bloquea el COMMIT de la importación
+    (trabajos en segundo plano, sincronización), que con el journal clásico esperaba el lock
+    EXCLUSIVE y fallaba con "database is locked".
+
+    busy_timeout sólo hace esperar a un BEGIN IMMEDIATE o a una transacción que escribe
+    antes de leer: una que leyó y después quiere escribir, si otro confirmó en el medio,
+    falla enseguida (su lectura ya es vieja). Por eso la importación, que lee y después
+    escribe, abre su transacción con begin_immediate (execution option `sqlite_begin`).
+    """
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cur = dbapi_connection.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        cur.close()
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        modo = conn.get_execution_options().get("sqlite_begin")
+        conn.exec_driver_sql(f"BEGIN {modo}" if modo else "BEGIN")
+
+
+def begin_immediate():
+    """
+    Confirma la transacción en curso de db.session y abre otra con BEGIN IMMEDIATE: toma
+    el lock de escritura de entrada (esperando hasta busy_timeout si otro escribe), así
+    lo que se lee adentro no queda viejo antes del primer INSERT/UPDATE.
+    """
+    db.session.commit()
+    db.session.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+
+
+with app.app_context():
+    _sqlite_transactions(db.engine, app.config["SQLITE_BUSY_TIMEOUT_MS"])
 
 # ------------------- HELPERS -------------------
 
 
+def request_periodo(default_month=MES_TODOS):
+    """
+    Periodo pedido en la querystring (year / month, trimestre 'T1'..'T4' o desde / hasta).
+
+    Devuelve:
+    - (periodo, year, month): year y month (int, o 'T1'..'T4') vuelven a la plantilla para
+      que los selectores muestren lo elegido.
+
+    Quién la consume:
+    - Todas las vistas con selector de periodo (index, listados, resúmenes y exports).
+    """
+    today = date.today()
+    periodo = periodo_desde_args(request.args, today.year, default_month)
+    year = int(request.args.get("year") or today.year)
+    month = str(request.args.get("month") or default_month).strip().upper()
+    return periodo, year, int(month) if month.isdigit() else month
+
+
 def parse_date(dstr: str):
     """
     Parsea una fecha desde distintos formatos comunes y devuelve un objeto datetime.date.
@@ -169,30 +378,64 @@ def ym_from_date(d: date):
 @app.template_filter("ars")
 def format_ars(value, digits=2):
     """
-    Formatea un número como moneda ARS para plantillas Jinja2.
+    Formatea un monto en centavos como moneda ARS para plantillas Jinja2.
 
     Qué hace:
-    - Convierte el valor a float, aplica formato con separadores de miles y coma decimal.
+    - Redondea al centavo como los exports (redondear_centavos), pasa a pesos y aplica
+      formato con separadores de miles y coma decimal.
     - Devuelve string con prefijo '$'.
 
     Parámetros:
-    - value: valor numérico o convertible (float/int/None).
+    - value: centavos (int, float con fracción de centavo o None).
     - digits: decimales (int).
 
     Retorno:
-    - str formateado (ej: "$1.234,56").
+    - str formateado (ej: 123456 -> "$1.234,56").
 
     Quién la consume:
-    - Plantillas HTML usan este filtro para mostrar montos (p. ej. {{ monto|ars }}).
+    - Plantillas HTML usan este filtro para mostrar montos (p. ej. {{ monto|ars }}): los
+      reportes trabajan en centavos y es el único lugar donde se pasan a texto.
     """
     try:
-        n = float(value or 0)
+        n = redondear_centavos(value) / 100
     except Exception:
         n = 0.0
     s = f"{n:,.{digits}f}".replace(",", "X").replace(".", ",").replace("X", ".")
     return f"${s}"
 
 
+def redondear_centavos(valor) -> int:
+    """
+    Centavos (int, o float con fracción de centavo) -> centavo entero, con las mitades lejos
+    de cero como la importación (importer.to_amounts) y la migración 4: el HTML (`ars`) y los
+    exports (`pesos`) muestran el mismo centavo (p. ej. el gasto real con 50% de IVA deducible).
+    """
+    v = float(valor or 0)
+    c = math.floor(round(abs(v), 6) + 0.5)
+    return -c if v < 0 else c
+
+
+def pesos(centavos) -> float:
+    """Centavos (int, o float con fracción de centavo) -> pesos redondeados al centavo; para los exports."""
+    return redondear_centavos(centavos) / 100
+
+
+def en_pesos(filas, columnas):
+    """
+    Copia de `filas` (dicts) con las `columnas` de montos pasadas de centavos a pesos.
+
+    Quién la consume:
+    - Exports CSV/XLSX de los reportes (el HTML formatea los centavos con el filtro `ars`).
+    """
+    return [{k: pesos(v) if k in columnas else v for k, v in f.items()} for f in filas]
+
+
+@app.template_filter("color_index")
+def color_index_filter(value):
+    """Índice de color (0..7) de un transaccion_id para resumen_caja; None si está vacío (filas alternas)."""
+    return color_index(value, 8) if value else None
+
+
 @app.template_filter("factnum")
 def format_factnum(value):
     """
@@ -233,7 +476,7 @@ def format_factnum(value):
     return f"{pv_pad}-{num}"
 
 
-def get_param(clave: str, default: float | None = None) -> float:
+def get_param(clave: str, default: float | None = None, commit: bool = True) -> float:
     """
     Obtiene un parámetro desde la tabla Parametro o lo crea si no existe.
 
@@ -246,6 +489,7 @@ def get_param(clave: str, default: float | None = None) -> float:
     Parámetros:
     - clave: nombre de parámetro.
     - default: valor por defecto opcional.
+    - commit: False deja el alta pendiente en la transacción en curso (importación).
 
     Devuelve:
     - float: valor del parámetro.
@@ -260,16 +504,18 @@ def get_param(clave: str, default: float | None = None) -> float:
             raise RuntimeError(f"Parametro {clave} no encontrado y sin default")
         p = Parametro(clave=clave, valor=default)
         db.session.add(p)
-        db.session.commit()
+        if commit:
+            db.session.commit()
         return default
     return p.valor
 
-def _read_param_any(keys, default=None):
+def _read_param_any(keys, default=None, commit: bool = True):
     """
     Buscar un parámetro probando varias claves en orden y devolver su valor.
     - keys: lista de claves a probar (ej. ["margen_Empresa","margen_empresa"])
     - default: si se pasa y no existe ninguna clave, crea Parametro(clave=keys[0], valor=default)
                y devuelve default.
+    - commit: False deja el alta pendiente en la transacción en curso (importación).
 
     Retorna:
     - valor del parámetro (float si es numérico) o lanza RuntimeError si no existe y default es None.
@@ -294,7 +540,8 @@ def _read_param_any(keys, default=None):
         k0 = keys[0]
         p_new = Parametro(clave=k0, valor=default)
         db.session.add(p_new)
-        db.session.commit()
+        if commit:
+            db.session.commit()
         try:
             return float(default)
         except Exception:
@@ -302,22 +549,31 @@ def _read_param_any(keys, default=None):
     raise RuntimeError(f"Ningún parametro encontrado para claves {keys} y sin default")
 
 
-def build_resumen_socio(ym: str):
+# Montos (centavos) de las filas de build_resumen_socio: los exports los pasan a pesos (en_pesos)
+MONTOS_SOCIO = (
+    "Ganancia_neta", "Margen_Empresa", "Margen_Vendedor", "Margen_Socios", "Margen_Otros_Socios",
+    "Total_Margenes", "Total_Caja", "Resto",
+)
+
+
+def build_resumen_socio(periodo: Periodo):
     """
-    Construye un resumen de ventas/compras agregadas por socio para un periodo `ym`.
+    Construye un resumen de ventas/compras agregadas por socio para un Periodo.
 
     Qué hace:
     - Lee parámetros de márgenes (empresa, vendedor, socio).
-    - Crea consultas filtradas por `ym` (soporta 'all', 'none', 'YYYY-*' y 'YYYY-MM').
-    - Genera subconsultas agregadas (ventas y compras por socio).
-    - Junta con la tabla Socio para devolver lista de diccionarios con montos y márgenes.
+    - Lee el rollup mensual (ResumenMensual) del periodo (rango de meses, periodo_condition).
+    - Genera subconsultas agregadas (ventas y compras por socio) y el saldo por caja.
+    - Junta con la tabla Socio y calcula los márgenes en tiempo lineal (calcular_margenes:
+      el margen de otros socios es el total por tipo menos el aporte propio).
 
     Parámetros:
-    - ym: periodo string ('all', 'none', 'YYYY-*' o 'YYYY-MM').
+    - periodo: Periodo (app.services.periodo); su clave va en la columna YM.
 
     Devuelve:
     - (filas, p_emp, p_ven, p_soc)
-      - filas: lista de dicts con claves: YM, nombre_socio, Ganancia_neta, Margen_Empresa, Margen_Vendedor, Margen_Socios, Margen_Otros_Socios, Total_Margenes
+      - filas: lista de dicts con claves: YM, nombre_socio y los montos en centavos (MONTOS_SOCIO):
+        Ganancia_neta, Margen_Empresa, Margen_Vendedor, Margen_Socios, Margen_Otros_Socios, Total_Margenes, Total_Caja, Resto
       - p_emp/p_ven/p_soc: valores de parámetros leídos.
 
     Quién la consume:
@@ -329,75 +585,47 @@ def build_resumen_socio(ym: str):
     p_ven = _read_param_any(["margen_Vendedor"], 0.20)
     p_soc = _read_param_any(["margen_Socio"], 0.09)
 
-    # Construir ventas_query / compras_query según el valor de ym
-    if ym == "all":
-        base_compras_query = db.session.query(Compra)
-        base_ventas_query = db.session.query(Venta)
-    elif ym == "none" or not ym:
-        base_compras_query = db.session.query(Compra).filter(Compra.id == -1)
-        base_ventas_query = db.session.query(Venta).filter(Venta.id == -1)
-    elif isinstance(ym, str) and ym.endswith("-*"):
-        year_prefix = ym[:-2]  # "2025-*"[0:-2] => "2025"
-        base_compras_query = db.session.query(Compra).filter(Compra.ym.like(f"{year_prefix}-%"))
-        base_ventas_query = db.session.query(Venta).filter(Venta.ym.like(f"{year_prefix}-%"))
-    else:
-        base_compras_query = db.session.query(Compra).filter(Compra.ym == ym)
-        base_ventas_query = db.session.query(Venta).filter(Venta.ym == ym)
+    # Todo sale del rollup mensual del periodo (ResumenMensual), no de las filas
+    R = ResumenMensual
 
     # --- INICIO: CÁLCULO DE TOTALES POR CAJA (INCLUYE TODOS LOS TIPOS) ---
-    # Se calcula el saldo de cada caja para el período filtrado.
-    # Esta lógica es similar a la de `resumen_caja`.
-    resumen_caja_temp = {}
-    # Se usa la misma lógica de `resumen_caja` para calcular el egreso real.
-    for c in base_compras_query.all():
-        if not c.origen:
-            continue
-        # --- CÁLCULO DE EGRESO (COMPRA) ---
-        pesos_sin_iva = float(c.pesos_sin_iva or 0.0)
-        iva_total = float(c.iva_21 or 0.0) + float(c.iva_105 or 0.0)
-        pct_deducible = float(c.iva_deducible_pct if c.iva_deducible_pct is not None else 1.0)
-        iva_no_deducible = iva_total * (1 - pct_deducible)
-        # El Gasto Real es el neto más el IVA que no se recupera.
-        monto_gasto_real = pesos_sin_iva + iva_no_deducible
-        # Se guarda como un monto negativo (egreso).
-        resumen_caja_temp.setdefault(c.origen, []).append({"monto": -monto_gasto_real})
-
-    # Se usa la misma lógica de `resumen_caja` para calcular el ingreso.
-    for v in base_ventas_query.all():
-        if not v.destino:
-            continue
-        # --- CÁLCULO DE INGRESO (VENTA) ---
-        # El monto de ingreso es el total de la factura.
-        monto_venta = float(v.total_con_iva or (v.pesos_sin_iva or 0.0) + (v.iva_21 or 0.0) + (v.iva_105 or 0.0))
-        # Se guarda como un monto positivo (ingreso).
-        resumen_caja_temp.setdefault(v.destino, []).append({"monto": monto_venta})
-
-    totales_caja = {
-        caja: round(sum(item["monto"] for item in movimientos), 2)
-        for caja, movimientos in resumen_caja_temp.items()
-    }
+    # Saldo de cada caja para el período filtrado, con la misma lógica que `resumen_caja`:
+    # compras restan su gasto real (neto + IVA no deducible), ventas suman su total.
+    totales_caja = {}
+    cajas = (
+        rollup_query(periodo)
+        .with_entities(
+            R.caja,
+            func.sum(case((R.operacion == "VENTA", R.total_con_iva), else_=-R.gasto_real)),
+        )
+        .filter(R.caja.is_not(None), R.caja != "")
+        .group_by(R.caja)
+        .all()
+    )
+    for caja, monto in cajas:
+        totales_caja[caja] = redondear_centavos(monto)  # centavos (gasto_real trae fracción)
     # --- FIN: CÁLCULO DE TOTALES POR CAJA ---
 
     # Ahora, filtramos para excluir el tipo 'X' para los cálculos de Ganancia Neta y márgenes.
-    compras_query = base_compras_query.filter(Compra.tipo != 'X')
-    ventas_query = base_ventas_query.filter(Venta.tipo != 'X')
-
-    # Subconsultas de ventas/compras por socio (usando las queries ya filtradas)
     ventas_sub = (
-        ventas_query.with_entities(
-            Venta.socio_id.label("socio_id"),
-            func.coalesce(func.sum(Venta.pesos_sin_iva), 0.0).label("ventas_sin_iva"),
+        rollup_query(periodo, "VENTA")
+        .filter(R.tipo != "X")
+        .with_entities(
+            R.socio_id.label("socio_id"),
+            func.coalesce(func.sum(R.pesos_sin_iva), 0).label("ventas_sin_iva"),
         )
-        .group_by(Venta.socio_id)
+        .group_by(R.socio_id)
         .subquery()
     )
 
     compras_sub = (
-        compras_query.with_entities(
-            Compra.socio_id.label("socio_id"),
-            func.coalesce(func.sum(Compra.pesos_sin_iva), 0.0).label("compras_sin_iva"),
+        rollup_query(periodo, "COMPRA")
+        .filter(R.tipo != "X")
+        .with_entities(
+            R.socio_id.label("socio_id"),
+            func.coalesce(func.sum(R.pesos_sin_iva), 0).label("compras_sin_iva"),
         )
-        .group_by(Compra.socio_id)
+        .group_by(R.socio_id)
         .subquery()
     )
 
@@ -407,8 +635,8 @@ def build_resumen_socio(ym: str):
             Socio.id.label("id"),
             Socio.nombre.label("nombre"),
             Socio.tipo.label("tipo"),
-            func.coalesce(ventas_sub.c.ventas_sin_iva, 0.0).label("ventas_sin_iva"),
-            func.coalesce(compras_sub.c.compras_sin_iva, 0.0).label("compras_sin_iva"),
+            func.coalesce(ventas_sub.c.ventas_sin_iva, 0).label("ventas_sin_iva"),
+            func.coalesce(compras_sub.c.compras_sin_iva, 0).label("compras_sin_iva"),
         )
         .outerjoin(ventas_sub, ventas_sub.c.socio_id == Socio.id)
         .outerjoin(compras_sub, compras_sub.c.socio_id == Socio.id)
@@ -417,8 +645,8 @@ def build_resumen_socio(ym: str):
     # Normalizar resultados en una lista de dicts
     socios = []
     for sid, nombre, tipo, v_sin, c_sin in q.all():
-        v = float(v_sin or 0.0)
-        c = float(c_sin or 0.0)
+        v = int(v_sin or 0)
+        c = int(c_sin or 0)
         gn = v - c
         socios.append(
             {
@@ -431,48 +659,32 @@ def build_resumen_socio(ym: str):
             }
         )
 
-    # Construcción de filas de salida + márgenes
+    # Construcción de filas de salida + márgenes (otros socios: total por tipo menos el aporte propio)
     filas = []
-    for s in socios:
+    for s, m in zip(socios, calcular_margenes(socios, p_emp, p_ven, p_soc)):
         gn = s["gn"]
-        tipo = s["tipo"]
-
-        margen_empresa = round(gn * p_emp, 2)
-        margen_vendedor = round(gn * p_ven, 2)
-        margen_socio = round(gn * p_soc, 2) if tipo == "Socio" else 0.0
-
-        # Acumulado de otros socios (según tu lógica original)
-        margen_otros = 0.0
-        for o in socios:
-            if o["id"] == s["id"]:
-                continue
-            if tipo == "Socio" and o["tipo"] == "Socio":
-                margen_otros += round(o["gn"] * p_soc, 2)
-            elif tipo == "Empresa" and o["tipo"] == "Socio":
-                margen_otros += round(o["gn"] * p_emp, 2)
-
-        total_margenes = round(margen_vendedor + margen_socio + margen_otros, 2)
-        total_caja = totales_caja.get(s["nombre"], 0.0)
+        total_margenes = m["Total_Margenes"]
+        total_caja = totales_caja.get(s["nombre"], 0)
         socio_nombre = s["nombre"]
 
-        resto_calculado = 0.0
+        resto_calculado = 0
         if socio_nombre != "Legion":
             # Para socios que no son "Legion", si la caja es negativa, se usa su valor absoluto para el cálculo.
             caja_para_calculo = abs(total_caja)
-            resto_calculado = round(caja_para_calculo - total_margenes, 2)
+            resto_calculado = caja_para_calculo - total_margenes
         else:
             # Para "Legion", se mantiene la lógica original.
-            resto_calculado = round(total_caja - total_margenes, 2)
+            resto_calculado = total_caja - total_margenes
 
         filas.append(
             {
-                "YM": ym,
+                "YM": periodo.clave,
                 "nombre_socio": socio_nombre,
-                "Ganancia_neta": round(gn, 2),
-                "Margen_Empresa": margen_empresa,
-                "Margen_Vendedor": margen_vendedor,
-                "Margen_Socios": margen_socio,
-                "Margen_Otros_Socios": round(margen_otros, 2),
+                "Ganancia_neta": gn,
+                "Margen_Empresa": m["Margen_Empresa"],
+                "Margen_Vendedor": m["Margen_Vendedor"],
+                "Margen_Socios": m["Margen_Socios"],
+                "Margen_Otros_Socios": m["Margen_Otros_Socios"],
                 "Total_Margenes": total_margenes,
                 "Total_Caja": total_caja,
                 "Resto": resto_calculado,
@@ -483,6 +695,8 @@ def build_resumen_socio(ym: str):
 
 
 # ------------------- ARCA -------------------
+# Montos (centavos) de las filas de build_resumen_arca / build_totales_arca
+MONTOS_ARCA = ("PESOS_SIN_IVA", "IVA_21", "IVA_105", "TOTAL_CON_IVA", "Saldo_Tecnico_IVA")
 
 
 def _split_fact(nro_raw):
@@ -490,7 +704,8 @@ def _split_fact(nro_raw):
     Separa un número de factura crudo en punto de venta (4 dígitos), número (8 dígitos) y formato 'PV-NRO'.
 
     Qué hace:
-    - Extrae dígitos, determina punto de venta y el número (padding si es necesario).
+    - Extrae dígitos, determina punto de venta y el número (padding si es necesario);
+      es la misma separación que arma la clave natural de la importación (split_invoice_number).
 
     Parámetros:
     - nro_raw: cadena o número con dígitos.
@@ -501,165 +716,161 @@ def _split_fact(nro_raw):
     Quién la consume:
     - build_resumen_arca para mostrar / exportar facturas con formato consistente.
     """
-    s = "".join(ch for ch in str(nro_raw or "").strip() if ch.isdigit())
-    if not s:
+    pv_pad, num = split_invoice_number(nro_raw)
+    if not num:
         return "", "", ""
-    if len(s) <= 8:
-        pv = "1"
-        num = s.zfill(8)
-    else:
-        pv = s[:-8] or "1"
-        num = s[-8:].zfill(8)
-    try:
-        pv = str(int(pv))
-    except Exception:
-        pass
-    pv_pad = pv.zfill(4)
     return pv_pad, num, f"{pv_pad}-{num}"
 
 
-def build_resumen_arca():
+def arca_filters(Model, periodo=None, tipo=None, incluirN=True):
+    """
+    Condiciones SQL de los filtros ARCA sobre Compra/Venta (o el rollup ResumenMensual).
+
+    - periodo: Periodo (periodo_condition); None = todos.
+    - incluirN=False: sólo comprobantes A/B; tipo ('A', 'B' o 'N'): sólo ese tipo.
+
+    El tipo se compara tal cual está guardado (la importación lo guarda en mayúsculas y sin
+    espacios, la migración 0003 normalizó las filas viejas): así se usa el índice (tipo, fecha).
+    """
+    conds = []
+    if periodo is not None:
+        conds.append(periodo_condition(Model, periodo))
+    if not incluirN:
+        conds.append(Model.tipo.in_(["A", "B"]))
+    if tipo in {"A", "B", "N"}:
+        conds.append(Model.tipo == tipo)
+    return conds
+
+
+def build_resumen_arca(periodo=None, tipo=None, incluirN=True):
     """
     Construye la lista 'plana' de operaciones ARCA (compras + ventas) para mostrar en Resumen ARCA.
 
     Qué hace:
-    - Lee todas las compras y ventas y construye una fila por operación con campos normalizados:
+    - Una sola consulta UNION ALL (compras, ventas) con los filtros en SQL (arca_filters) y
+      una fila por operación con campos normalizados:
       tipo_operacion, fecha, tipo_comprobante, NRO_FACTURA, PUNTO_VENTA, NRO_COMPROBANTE, CUIT, Denominación,
       PESOS_SIN_IVA, IVA_21, IVA_105, TOTAL_CON_IVA, estado, origen_destino, nombre_socio.
-    - Calcula TOTAL_CON_IVA por fila haciendo fallback a (pesos_sin_iva + iva_21 + iva_105) cuando total_con_iva está en 0 o NULL.
-    - Normaliza nombres de socio consultando la tabla Socio.
+    - TOTAL_CON_IVA hace fallback a (pesos_sin_iva + iva_21 + iva_105) en SQL cuando
+      total_con_iva está en 0 o NULL (total_con_iva_expr); el socio sale de un LEFT JOIN.
+    - Sólo se traen las filas del periodo/tipo pedido: el costo depende del mes, no del histórico.
+
+    Parámetros:
+    - periodo: Periodo a filtrar (app.services.periodo); None = todos.
+    - tipo: 'A', 'B' o 'N' para un único tipo de comprobante.
+    - incluirN: False = sólo A/B (como las vistas por defecto); True = todos.
 
     Retorna:
-    - lista de diccionarios (filas) que consumen las vistas resumen_arca, totales_arca y sus exportadores.
+    - lista de diccionarios (filas) que consumen las vistas resumen_arca, totales_arca y sus exportadores;
+      los montos (MONTOS_ARCA) en centavos.
 
     Quién la consume:
     - resumen_arca view / export
-    - totales_arca view / export (a través de build_totales_arca)
     - Herramientas de depuración / exports
     """
-    filas = []
-    socios_map = {
-        sid: nom for sid, nom in db.session.query(Socio.id, Socio.nombre).all()
-    }
-    for c in db.session.query(Compra).all():
-        tipo_up = (c.tipo or "").strip().upper()
-        pv, nro8, nro_fmt = _split_fact(c.nro_factura)
-
-        # calcular total c/iva con fallback cuando total_con_iva es 0 o None
-        total_civa = None
-        try:
-            if c.total_con_iva is not None and float(c.total_con_iva) != 0.0:
-                total_civa = float(c.total_con_iva)
-            else:
-                total_civa = float((c.pesos_sin_iva or 0.0) + (c.iva_21 or 0.0) + (c.iva_105 or 0.0))
-        except Exception:
-            total_civa = float((c.pesos_sin_iva or 0.0) + (c.iva_21 or 0.0) + (c.iva_105 or 0.0))
-
-        filas.append(
-            {
-                "tipo_operacion": "COMPRA",
-                "fecha": c.fecha.strftime("%Y-%m-%d"),
-                "tipo_comprobante": tipo_up,
-                "NRO_FACTURA": c.nro_factura or "",
-                "NRO_FACTURA_FMT": nro_fmt,
-                "PUNTO_VENTA": pv,
-                "NRO_COMPROBANTE": nro8,
-                "CUIT": c.cuit or "",
-                "Denominación": c.proveedor or "",
-                "PESOS_SIN_IVA": round(c.pesos_sin_iva or 0.0, 2),
-                "IVA_21": round(c.iva_21 or 0.0, 2),
-                "IVA_105": round(c.iva_105 or 0.0, 2),
-                "TOTAL_CON_IVA": round(total_civa or 0.0, 2),
-                "estado": c.estado or "",
-                "origen_destino": c.origen or "",
-                "nombre_socio": socios_map.get(c.socio_id, ""),
-            }
+    partes = []
+    for orden, (Model, operacion, cuit, denominacion, caja) in enumerate(
+        (
+            (Compra, "COMPRA", Compra.cuit, Compra.proveedor, Compra.origen),
+            (Venta, "VENTA", Venta.cuit_venta, Venta.cliente, Venta.destino),
         )
-    for v in db.session.query(Venta).all():
-        tipo_up = (v.tipo or "").strip().upper()
-        pv, nro8, nro_fmt = _split_fact(v.nro_factura)
-
-        # calcular total c/iva con fallback cuando total_con_iva es 0 o None (ventas)
-        total_v_civa = None
-        try:
-            if v.total_con_iva is not None and float(v.total_con_iva) != 0.0:
-                total_v_civa = float(v.total_con_iva)
-            else:
-                total_v_civa = float((v.pesos_sin_iva or 0.0) + (v.iva_21 or 0.0) + (v.iva_105 or 0.0))
-        except Exception:
-            total_v_civa = float((v.pesos_sin_iva or 0.0) + (v.iva_21 or 0.0) + (v.iva_105 or 0.0))
-
+    ):
+        partes.append(
+            select(
+                literal(orden).label("orden"),
+                Model.id.label("id"),
+                literal(operacion).label("tipo_operacion"),
+                Model.fecha.label("fecha"),
+                func.upper(func.trim(func.coalesce(Model.tipo, ""))).label("tipo_comprobante"),
+                Model.nro_factura.label("nro_factura"),
+                func.coalesce(cuit, "").label("cuit"),
+                func.coalesce(denominacion, "").label("denominacion"),
+                func.coalesce(Model.pesos_sin_iva, 0).label("pesos_sin_iva"),
+                func.coalesce(Model.iva_21, 0).label("iva_21"),
+                func.coalesce(Model.iva_105, 0).label("iva_105"),
+                total_con_iva_expr(Model).element.label("total_con_iva"),
+                func.coalesce(Model.estado, "").label("estado"),
+                func.coalesce(caja, "").label("origen_destino"),
+                func.coalesce(Socio.nombre, "").label("nombre_socio"),
+            )
+            .select_from(Model)
+            .outerjoin(Socio, Socio.id == Model.socio_id)
+            .where(*arca_filters(Model, periodo, tipo, incluirN))
+        )
+    u = union_all(*partes).subquery()
+    filas = []
+    for r in db.session.execute(select(u).order_by(u.c.orden, u.c.id)):
+        pv, nro8, nro_fmt = _split_fact(r.nro_factura)
+        fecha = r.fecha if isinstance(r.fecha, str) else r.fecha.strftime("%Y-%m-%d")
         filas.append(
             {
-                "tipo_operacion": "VENTA",
-                "fecha": v.fecha.strftime("%Y-%m-%d"),
-                "tipo_comprobante": tipo_up,
-                "NRO_FACTURA": v.nro_factura or "",
+                "tipo_operacion": r.tipo_operacion,
+                "fecha": fecha[:10],
+                "tipo_comprobante": r.tipo_comprobante,
+                "NRO_FACTURA": r.nro_factura or "",
                 "NRO_FACTURA_FMT": nro_fmt,
                 "PUNTO_VENTA": pv,
                 "NRO_COMPROBANTE": nro8,
-                "CUIT": v.cuit_venta or "",
-                "Denominación": v.cliente or "",
-                "PESOS_SIN_IVA": round(v.pesos_sin_iva or 0.0, 2),
-                "IVA_21": round(v.iva_21 or 0.0, 2),
-                "IVA_105": round(v.iva_105 or 0.0, 2),
-                "TOTAL_CON_IVA": round(total_v_civa or 0.0, 2),
-                "estado": v.estado or "",
-                "origen_destino": v.destino or "",
-                "nombre_socio": socios_map.get(v.socio_id, ""),
+                "CUIT": r.cuit,
+                "Denominación": r.denominacion,
+                "PESOS_SIN_IVA": r.pesos_sin_iva,
+                "IVA_21": r.iva_21,
+                "IVA_105": r.iva_105,
+                "TOTAL_CON_IVA": r.total_con_iva,
+                "estado": r.estado,
+                "origen_destino": r.origen_destino,
+                "nombre_socio": r.nombre_socio,
             }
         )
     return filas
 
 
-def build_totales_arca(filtered=None):
+def build_totales_arca(periodo=None, tipo=None, incluirN=True):
     """
-    Agrega (suma) las filas de build_resumen_arca por periodo (YM) y tipo_operacion.
+    Totales ARCA por periodo (YM) y tipo_operacion con un GROUP BY en SQL.
 
     Qué hace:
-    - Acepta 'filtered' (lista de filas ya filtradas) o genera todas las filas.
-    - Agrupa por (YM, tipo_operacion) y suma PESOS_SIN_IVA, IVA_21, IVA_105 y TOTAL_CON_IVA.
-    - Añade cálculo Saldo_Tecnico_IVA = IVA_21 + IVA_105 y redondea resultados.
+    - Suma el rollup mensual (ResumenMensual) agrupado por (ym, operacion), con los
+      mismos filtros que build_resumen_arca (arca_filters) aplicados en SQL: no arma
+      ninguna fila ARCA, así que el costo no depende del tamaño del histórico.
+    - Añade cálculo Saldo_Tecnico_IVA = IVA_21 + IVA_105.
 
     Parámetros:
-    - filtered: lista opcional de filas (tal como las generadas por build_resumen_arca).
+    - periodo: Periodo o None (todos); tipo: 'A', 'B' o 'N'; incluirN: False = sólo A/B.
 
     Devuelve:
-    - lista de diccionarios con claves: YM, tipo_operacion, PESOS_SIN_IVA, IVA_21, IVA_105, TOTAL_CON_IVA, Saldo_Tecnico_IVA.
+    - lista de diccionarios con claves: YM, tipo_operacion, PESOS_SIN_IVA, IVA_21, IVA_105, TOTAL_CON_IVA, Saldo_Tecnico_IVA
+      (montos en centavos, sumas enteras exactas).
 
     Quién la consume:
     - totales_arca view y su export. Garantiza el formato que usan las plantillas.
     """
-    filas = filtered if filtered is not None else build_resumen_arca()
-    agg = {}
-    for f in filas:
-        ym = f["fecha"][:7]
-        key = (ym, f["tipo_operacion"])
-        d = agg.setdefault(
-            key,
-            {
-                "YM": ym,
-                "tipo_operacion": f["tipo_operacion"],
-                "PESOS_SIN_IVA": 0.0,
-                "IVA_21": 0.0,
-                "IVA_105": 0.0,
-                "TOTAL_CON_IVA": 0.0,
-            },
+    R = ResumenMensual
+    q = (
+        db.session.query(
+            R.ym,
+            R.operacion,
+            func.sum(R.pesos_sin_iva),
+            func.sum(R.iva_21),
+            func.sum(R.iva_105),
+            func.sum(R.total_con_iva),
         )
-        d["PESOS_SIN_IVA"] += f["PESOS_SIN_IVA"]
-        d["IVA_21"] += f["IVA_21"]
-        d["IVA_105"] += f["IVA_105"]
-        d["TOTAL_CON_IVA"] += f["TOTAL_CON_IVA"]
-    filas_out = []
-    for d in agg.values():
-        d["Saldo_Tecnico_IVA"] = round(d["IVA_21"] + d["IVA_105"], 2)
-        d["PESOS_SIN_IVA"] = round(d["PESOS_SIN_IVA"], 2)
-        d["IVA_21"] = round(d["IVA_21"], 2)
-        d["IVA_105"] = round(d["IVA_105"], 2)
-        d["TOTAL_CON_IVA"] = round(d["TOTAL_CON_IVA"], 2)
-        filas_out.append(d)
-    filas_out.sort(key=lambda x: (x["YM"], x["tipo_operacion"]))
-    return filas_out
+        .filter(*arca_filters(R, periodo, tipo, incluirN))
+        .group_by(R.ym, R.operacion)
+        .order_by(R.ym, R.operacion)
+    )
+    return [
+        {
+            "YM": y,
+            "tipo_operacion": op,
+            "PESOS_SIN_IVA": int(neto or 0),
+            "IVA_21": int(i21 or 0),
+            "IVA_105": int(i105 or 0),
+            "TOTAL_CON_IVA": int(total or 0),
+            "Saldo_Tecnico_IVA": int(i21 or 0) + int(i105 or 0),
+        }
+        for y, op, neto, i21, i105, total in q.all()
+    ]
 
 
 # ------------------- RUTAS -------------------
@@ -669,170 +880,64 @@ def index():
     Página principal / dashboard.
 
     Qué hace:
-    - Lee filtros year/month de la querystring y construye consultas filtradas.
-    - Calcula totales agregados (ventas sin IVA, IVA ventas, compras sin IVA, IVA compras).
-    - Calcula IVA deducible considerando la bandera 'personal' y porcentajes configurables.
+    - Lee el periodo de la querystring (request_periodo: year/month, trimestre o rango).
+    - Calcula todas las métricas con dashboard_metrics (una consulta agrupada sobre el
+      rollup mensual): totales, IVA deducible según 'personal' y porcentajes configurables,
+      ADEUDADOS y montos por socio.
     - Prepara datos por socio para mostrar en el dashboard.
     - Renderiza 'index.html' con todos los totales y listas auxiliares.
 
     Parámetros (via querystring):
     - year: año (int) (opcional)
-    - month: mes (1-12) o 13 para 'Todos' (opcional)
+    - month: mes (1-12), 13 para 'Todos' o 'T1'..'T4' (trimestre) (opcional)
+    - desde / hasta: rango de meses 'YYYY-MM' (opcional, tiene prioridad)
 
     Renderiza:
-    - 'index.html' con variables: ventas_tot, compras_tot, ventas_sin_iva, compras_sin_iva, ganancia_neta, iva_a_pagar, per_socio, current_year, etc.
+    - 'index.html' con variables: periodo, ventas_tot, compras_tot, ventas_sin_iva, compras_sin_iva, ganancia_neta, iva_a_pagar, per_socio, current_year, etc.
 
     Quién la consume:
     - Usuario final a través del navegador.
     """
     today = date.today()
-    year = int(request.args.get("year", today.year))
-
-    # Si no se recibe 'month' en la query, por defecto usamos 13 -> "Todos"
-    month_arg = request.args.get("month", None)
-    month = int(month_arg) if month_arg is not None else 13
-
-    if year == 1313 and month == 13:
-        compras_query = db.session.query(Compra)
-        ventas_query = db.session.query(Venta)
-        ym = "all"
-    elif month == 13:
-        compras_query = db.session.query(Compra).filter(Compra.ym.like(f"{year}-%"))
-        ventas_query = db.session.query(Venta).filter(Venta.ym.like(f"{year}-%"))
-        ym = f"{year}-*"
-    elif year == 1313:
-        compras_query = db.session.query(Compra).filter(Compra.id == -1)
-        ventas_query = db.session.query(Venta).filter(Venta.id == -1)
-        ym = "none"
-    else:
-        ym = f"{year:04d}-{month:02d}"
-        compras_query = db.session.query(Compra).filter(Compra.ym == ym)
-        ventas_query = db.session.query(Venta).filter(Venta.ym == ym)
-
-    v = ventas_query.with_entities(
-        func.coalesce(func.sum(Venta.pesos_sin_iva), 0.0),
-        func.coalesce(func.sum(Venta.iva_21 + Venta.iva_105), 0.0),
-    ).first()
-    ventas_sin_iva, iva_venta = float(v[0]), float(v[1])
-
-    c = compras_query.with_entities(
-        func.coalesce(func.sum(Compra.pesos_sin_iva), 0.0),
-        func.coalesce(func.sum(Compra.iva_21 + Compra.iva_105), 0.0),
-    ).first()
-    compras_sin_iva, iva_compra_total = float(c[0]), float(c[1])
-
-    # usar compras_query para calcular IVA personal (respeta filtros "all"/"year-*")
-    iva_personal_total = float(
-        compras_query.with_entities(
-            func.coalesce(func.sum(Compra.iva_21 + Compra.iva_105), 0.0)
-        )
-        .filter(Compra.personal == True)
-        .scalar()
-        or 0.0
-    )
-
-    p_norm = get_param("iva_deducible_normal_pct", 1.0)
-    p_pers_def = get_param("iva_deducible_personal_default_pct", 0.5)
-
-    # obtener filas desde compras_query para respetar filtros
-    rows = compras_query.with_entities(
-        Compra.personal, Compra.iva_deducible_pct, Compra.iva_21, Compra.iva_105
-    ).all()
-
-    iva_compra_creditable = 0.0
-    iva_personal_credito_empresa = 0.0
-    for personal, pct, i21, i105 in rows:
-        base = float((i21 or 0.0) + (i105 or 0.0))
-        eff = float(pct if pct is not None else (p_pers_def if personal else p_norm))
-        eff = min(max(eff, 0.0), 1.0)
-        iva_compra_creditable += base * eff
-        if personal:
-            iva_personal_credito_empresa += base * eff
-
-    margen_sin_iva = ventas_sin_iva - compras_sin_iva
-    iva_a_pagar = iva_venta - iva_compra_creditable
-    adeudado_compras = (
-        db.session.query(func.count(Compra.id))
-        .filter((Compra.ym == ym) & (Compra.estado == "ADEUDADO"))
-        .scalar()
-    )
-    adeudado_ventas = (
-        db.session.query(func.count(Venta.id))
-        .filter((Venta.ym == ym) & (Venta.estado == "ADEUDADO"))
-        .scalar()
-    )
-
-    # Contar ADEUDADOS reutilizando compras_query/ventas_query (respetan filtros "all"/"year-*"/"none")
-    adeudado_compras = int(
-        compras_query.with_entities(func.count(Compra.id))
-        .filter(Compra.estado == "ADEUDADO")
-        .scalar()
-        or 0
-    )
-    adeudado_ventas = int(
-        ventas_query.with_entities(func.count(Venta.id))
-        .filter(Venta.estado == "ADEUDADO")
-        .scalar()
-        or 0
-    )
-
-    # Subconsultas por socio: usar ventas_query/compras_query SIN volver a filtrar por ym
-    ventas_sub = (
-        ventas_query.with_entities(
-            Venta.socio_id.label("socio_id"),
-            func.coalesce(func.sum(Venta.pesos_sin_iva), 0.0).label("ventas_sin_iva"),
-        )
-        .group_by(Venta.socio_id)
-        .subquery()
-    )
-    compras_sub = (
-        compras_query.with_entities(
-            Compra.socio_id.label("socio_id"),
-            func.coalesce(func.sum(Compra.pesos_sin_iva), 0.0).label("compras_sin_iva"),
-        )
-        .group_by(Compra.socio_id)
-        .subquery()
-    )
-    q = (
-        db.session.query(
-            Socio.nombre,
-            func.coalesce(ventas_sub.c.ventas_sin_iva, 0.0),
-            func.coalesce(compras_sub.c.compras_sin_iva, 0.0),
+    # Si no se recibe 'month' en la query, por defecto 13 -> "Todos"
+    periodo, year, month = request_periodo()
+
+    # Todas las métricas salen de una consulta agrupada sobre el rollup mensual
+    m = dashboard_metrics(periodo)
+    per_socio = []
+    for sid, nombre in CATALOGO.obtener("socios"):
+        montos = m.por_socio.get(sid, {})
+        v_sin = montos.get("ventas_sin_iva", 0)
+        c_sin = montos.get("compras_sin_iva", 0)
+        per_socio.append(
+            {
+                "nombre": nombre,
+                "ventas_sin_iva": v_sin,
+                "compras_sin_iva": c_sin,
+                "ganancia_neta": v_sin - c_sin,
+            }
         )
-        .outerjoin(ventas_sub, ventas_sub.c.socio_id == Socio.id)
-        .outerjoin(compras_sub, compras_sub.c.socio_id == Socio.id)
-    )
-    per_socio = [
-        {
-            "nombre": nombre,
-            "ventas_sin_iva": float(v_sin or 0.0),
-            "compras_sin_iva": float(c_sin or 0.0),
-            "ganancia_neta": float((v_sin or 0.0) - (c_sin or 0.0)),
-        }
-        for nombre, v_sin, c_sin in q.all()
-    ]
 
     return render_template(
         "index.html",
+        periodo=periodo,
         year=year,
         month=month,
-        ventas_tot={"monto_total": ventas_sin_iva + iva_venta, "iva": iva_venta},
+        ventas_tot={"monto_total": m.ventas_sin_iva + m.iva_venta, "iva": m.iva_venta},
         compras_tot={
-            "monto_total": compras_sin_iva + iva_compra_total,
-            "iva": iva_compra_total,
-            "iva_deducible": iva_compra_creditable,
+            "monto_total": m.compras_sin_iva + m.iva_compra_total,
+            "iva": m.iva_compra_total,
+            "iva_deducible": m.iva_compra_creditable,
         },
-        ventas_sin_iva=ventas_sin_iva,
-        compras_sin_iva=compras_sin_iva,
-        ganancia_neta=margen_sin_iva,
-        iva_a_pagar=iva_a_pagar,
-        iva_personal_total=iva_personal_total,
-        iva_personal_credito_empresa=iva_personal_credito_empresa,
-        iva_personal_credito_socios=max(
-            iva_personal_total - iva_personal_credito_empresa, 0.0
-        ),
-        adeudado_compras=adeudado_compras,
-        adeudado_ventas=adeudado_ventas,
+        ventas_sin_iva=m.ventas_sin_iva,
+        compras_sin_iva=m.compras_sin_iva,
+        ganancia_neta=m.margen_sin_iva,
+        iva_a_pagar=m.iva_a_pagar,
+        iva_personal_total=m.iva_personal_total,
+        iva_personal_credito_empresa=m.iva_personal_credito_empresa,
+        iva_personal_credito_socios=m.iva_personal_credito_socios,
+        adeudado_compras=m.adeudado_compras,
+        adeudado_ventas=m.adeudado_ventas,
         per_socio=per_socio,
         debug=True,
         current_year=today.year,
@@ -847,7 +952,8 @@ def dashboard_export():
 
     Qué hace:
     - Aplica la misma lógica de filtros year/month que la vista index.
-    - Calcula varios agregados (ventas, compras, IVA personal, adeudados).
+    - Usa las mismas métricas que index (dashboard_metrics): ventas, compras, IVA personal,
+      IVA deducible, adeudados.
     - Devuelve un XLSX o CSV con un único registro resumen.
 
     Parámetros (querystring):
@@ -857,87 +963,24 @@ def dashboard_export():
     Quién la consume:
     - Usuario a través de la UI (botón Exportar en el dashboard).
     """
-    today = date.today()
-    year = int(request.args.get("year", today.year))
-    month = int(request.args.get("month", today.month))
-
-    if year == 1313 and month == 13:
-        compras_query = db.session.query(Compra)
-        ventas_query = db.session.query(Venta)
-        ym = "all"
-    elif month == 13:
-        compras_query = db.session.query(Compra).filter(Compra.ym.like(f"{year}-%"))
-        ventas_query = db.session.query(Venta).filter(Venta.ym.like(f"{year}-%"))
-        ym = f"{year}-*"
-    elif year == 1313:
-        compras_query = db.session.query(Compra).filter(Compra.id == -1)
-        ventas_query = db.session.query(Venta).filter(Venta.id == -1)
-        ym = "none"
-    else:
-        ym = f"{year:04d}-{month:02d}"
-        compras_query = db.session.query(Compra).filter(Compra.ym == ym)
-        ventas_query = db.session.query(Venta).filter(Venta.ym == ym)
-
-    v = ventas_query.with_entities(
-        func.coalesce(func.sum(Venta.pesos_sin_iva), 0.0),
-        func.coalesce(func.sum(Venta.iva_21 + Venta.iva_105), 0.0),
-    ).first()
-    ventas_sin_iva, iva_venta = float(v[0]), float(v[1])
-
-    c = compras_query.with_entities(
-        func.coalesce(func.sum(Compra.pesos_sin_iva), 0.0),
-        func.coalesce(func.sum(Compra.iva_21 + Compra.iva_105), 0.0),
-    ).first()
-    compras_sin_iva, iva_compra_total = float(c[0]), float(c[1])
-
-    p_norm = get_param("iva_deducible_normal_pct", 1.0)
-    p_pers_def = get_param("iva_deducible_personal_default_pct", 0.5)
-    rows = (
-        db.session.query(
-            Compra.personal, Compra.iva_deducible_pct, Compra.iva_21, Compra.iva_105
-        )
-        .filter(Compra.ym == ym)
-        .all()
-    )
-
-    iva_compra_creditable, iva_personal_total, iva_personal_credito_empresa = (
-        0.0,
-        0.0,
-        0.0,
-    )
-    for personal, pct, i21, i105 in rows:
-        base = float((i21 or 0.0) + (i105 or 0.0))
-        eff = float(pct if pct is not None else (p_pers_def if personal else p_norm))
-        eff = min(max(eff, 0.0), 1.0)
-        iva_compra_creditable += base * eff
-        if personal:
-            iva_personal_total += base
-            iva_personal_credito_empresa += base * eff
+    periodo, _, _ = request_periodo(default_month=date.today().month)
+    ym = periodo.clave
 
+    m = dashboard_metrics(periodo)
     resumen = [
         {
             "YM": ym,
-            "Ventas_sin_IVA": round(ventas_sin_iva, 2),
-            "IVA_Venta": round(iva_venta, 2),
-            "Compras_sin_IVA": round(compras_sin_iva, 2),
-            "IVA_Compra": round(iva_compra_total, 2),
-            "IVA_Personal_Total": round(iva_personal_total, 2),
-            "IVA_Personal_Creditable": round(iva_personal_credito_empresa, 2),
-            "IVA_Compra_Creditable": round(iva_compra_creditable, 2),
-            "Margen_sin_IVA": round(margen_sin_iva, 2),
-            "IVA_a_Pagar": round(iva_a_pagar, 2),
-            "Compras_ADEUDADO": int(
-                compras_query.with_entities(func.count(Compra.id))
-                .filter(Compra.estado == "ADEUDADO")
-                .scalar()
-                or 0
-            ),
-            "Ventas_ADEUDADO": int(
-                ventas_query.with_entities(func.count(Venta.id))
-                .filter(Venta.estado == "ADEUDADO")
-                .scalar()
-                or 0
-            ),
+            "Ventas_sin_IVA": pesos(m.ventas_sin_iva),
+            "IVA_Venta": pesos(m.iva_venta),
+            "Compras_sin_IVA": pesos(m.compras_sin_iva),
+            "IVA_Compra": pesos(m.iva_compra_total),
+            "IVA_Personal_Total": pesos(m.iva_personal_total),
+            "IVA_Personal_Creditable": pesos(m.iva_personal_credito_empresa),
+            "IVA_Compra_Creditable": pesos(m.iva_compra_creditable),
+            "Margen_sin_IVA": pesos(m.margen_sin_iva),
+            "IVA_a_Pagar": pesos(m.iva_a_pagar),
+            "Compras_ADEUDADO": m.adeudado_compras,
+            "Ventas_ADEUDADO": m.adeudado_ventas,
         }
     ]
 
@@ -973,17 +1016,12 @@ def dashboard_export():
 # --------- Rutas ARCA / Socio / Import / Limpieza / Listas (igual que anteriores) ---------
 @app.route("/resumen-arca")
 def resumen_arca():
-    filas = build_resumen_arca()
     ym = request.args.get("ym")
     tipo = (request.args.get("tipo") or "").upper()
     incluirN = request.args.get("incluirN", "0") == "1"
-    if ym:
-        filas = [f for f in filas if f["fecha"].startswith(ym)]
-    if not incluirN:
-        filas = [f for f in filas if (f["tipo_comprobante"] in {"A", "B"})]
-    if tipo in {"A", "B", "N"}:
-        filas = [f for f in filas if f["tipo_comprobante"] == tipo]
-    all_dates = sorted({f["fecha"][:7] for f in build_resumen_arca()})
+    filas = build_resumen_arca(periodo=periodo_desde_ym(ym), tipo=tipo, incluirN=incluirN)
+    # YMs del selector: del catálogo de filtros (no se arman filas para esto)
+    all_dates = list(CATALOGO.obtener("yms"))
     return render_template(
         "resumen_arca.html",
         filas=filas,
@@ -996,17 +1034,11 @@ def resumen_arca():
 
 @app.route("/resumen-arca/export")
 def resumen_arca_export():
-    filas = build_resumen_arca()
     ym = request.args.get("ym")
     tipo = (request.args.get("tipo") or "").upper()
     incluirN = request.args.get("incluirN", "0") == "1"
     fmt = request.args.get("format", "csv").lower()
-    if ym:
-        filas = [f for f in filas if f["fecha"].startswith(ym)]
-    if not incluirN:
-        filas = [f for f in filas if (f["tipo_comprobante"] in {"A", "B"})]
-    if tipo in {"A", "B", "N"}:
-        filas = [f for f in filas if f["tipo_comprobante"] == tipo]
+    filas = en_pesos(build_resumen_arca(periodo=periodo_desde_ym(ym), tipo=tipo, incluirN=incluirN), MONTOS_ARCA)
     if fmt == "xlsx":
         if pd is None:
             return Response("Pandas no instalado", status=500)
@@ -1036,56 +1068,97 @@ def resumen_arca_export():
             },
         )
 
+def caja_ledger(periodo, caja=None, transaccion_id=None):
+    """
+    Movimientos por caja con monto con signo y saldo acumulado, calculados en SQL.
+
+    Qué hace:
+    - UNION ALL de compras (origen) y ventas (destino) del periodo con caja no vacía.
+    - Monto por movimiento en SQL: las compras restan su gasto real (neto + IVA no deducible,
+      iva_deducible_pct o 1.0 si no hay), las ventas suman su total (total_con_iva_expr).
+    - Saldo: SUM(monto) OVER (PARTITION BY caja ...) en el mismo orden en que se muestran
+      (transaccion_id ascendente con los vacíos al final, luego fecha descendente).
+
+    Parámetros:
+    - periodo: Periodo (app.services.periodo), ver periodo_condition.
+    - caja / transaccion_id: filtros opcionales.
+
+    Devuelve:
+    - (movimientos, totales): filas (caja, tipo, fecha, detalle, monto, saldo,
+      transaccion_id, personal) ordenadas por caja, y {caja: total} de un GROUP BY; montos
+      en centavos (los de compras con fracción por el IVA no deducible).
+
+    Quién la consume:
+    - resumen_caja (HTML) y resumen_caja_export: las dos muestran los mismos montos.
+    """
+    partes = []
+    for orden, (Model, tipo, col_caja) in enumerate(((Compra, "COMPRA", Compra.origen), (Venta, "VENTA", Venta.destino))):
+        if Model is Compra:
+            iva = func.coalesce(Compra.iva_21, 0) + func.coalesce(Compra.iva_105, 0)
+            monto = -(func.coalesce(Compra.pesos_sin_iva, 0) + iva * (1 - func.coalesce(Compra.iva_deducible_pct, 1.0)))
+            personal = func.coalesce(Compra.personal, False)
+        else:
+            monto = total_con_iva_expr(Venta).element
+            personal = literal(False)
+        q = select(
+            col_caja.label("caja"),
+            literal(tipo).label("tipo"),
+            Model.fecha.label("fecha"),
+            Model.descripcion.label("detalle"),
+            monto.label("monto"),
+            Model.transaccion_id.label("transaccion_id"),
+            personal.label("personal"),
+            literal(orden).label("orden"),
+            Model.id.label("id"),
+        ).where(periodo_condition(Model, periodo), col_caja.is_not(None), col_caja != "")
+        if caja:
+            q = q.where(col_caja == caja)
+        if transaccion_id:
+            q = q.where(Model.transaccion_id == transaccion_id)
+        partes.append(q)
+    u = union_all(*partes).subquery()
+
+    sin_tid = case((func.coalesce(u.c.transaccion_id, "") == "", 1), else_=0)
+    orden_mov = (sin_tid, u.c.transaccion_id, u.c.fecha.desc(), u.c.orden, u.c.id)
+    saldo = func.sum(u.c.monto).over(partition_by=u.c.caja, order_by=orden_mov, rows=(None, 0))
+    movimientos = db.session.execute(
+        select(
+            u.c.caja, u.c.tipo, u.c.fecha, u.c.detalle, u.c.monto, saldo.label("saldo"),
+            u.c.transaccion_id, u.c.personal,
+        ).order_by(u.c.caja, *orden_mov)
+    ).all()
+    totales = {
+        c: t or 0
+        for c, t in db.session.execute(select(u.c.caja, func.sum(u.c.monto)).group_by(u.c.caja)).all()
+    }
+    return movimientos, totales
+
+
 @app.route("/resumen-caja/export")
 def resumen_caja_export():
-    year = int(request.args.get("year", date.today().year))
-    month = int(request.args.get("month", 13))
+    periodo, _, _ = request_periodo()
     caja_filtro = request.args.get("caja", "").strip()
+    transaccion_id_filtro = request.args.get("transaccion_id", "").strip()
     fmt = request.args.get("format", "csv").lower()
 
-    if year == 1313 and month == 13:
-        compras_query = db.session.query(Compra)
-        ventas_query = db.session.query(Venta)
-    elif month == 13:
-        compras_query = db.session.query(Compra).filter(Compra.ym.like(f"{year}-%"))
-        ventas_query = db.session.query(Venta).filter(Venta.ym.like(f"{year}-%"))
-    elif year == 1313:
-        compras_query = db.session.query(Compra).filter(Compra.id == -1)
-        ventas_query = db.session.query(Venta).filter(Venta.id == -1)
-    else:
-        ym = f"{year:04d}-{month:02d}"
-        compras_query = db.session.query(Compra).filter(Compra.ym == ym)
-        ventas_query = db.session.query(Venta).filter(Venta.ym == ym)
-
-    if caja_filtro:
-        compras_query = compras_query.filter(Compra.origen == caja_filtro)
-        ventas_query = ventas_query.filter(Venta.destino == caja_filtro)
-
-    rows = []
-    for c in compras_query.all():
-        if not c.origen:
-            continue
-        rows.append({
-            "Caja": c.origen,
-            "Fecha": c.fecha.strftime("%Y-%m-%d"),
-            "Tipo": "COMPRA",
-            "Detalle": c.descripcion,
-            "Monto": -float(c.total_con_iva or 0.0)
-        })
-    for v in ventas_query.all():
-        if not v.destino:
-            continue
-        rows.append({
-            "Caja": v.destino,
-            "Fecha": v.fecha.strftime("%Y-%m-%d"),
-            "Tipo": "VENTA",
-            "Detalle": v.descripcion,
-            "Monto": float(v.total_con_iva or 0.0)
-        })
+    # mismos montos que la vista (caja_ledger): compras por gasto real, ventas por total
+    movimientos, _ = caja_ledger(periodo, caja_filtro, transaccion_id_filtro)
+    campos = ["Caja", "Fecha", "Tipo", "Detalle", "Monto", "Saldo"]
+    rows = [
+        {
+            "Caja": m.caja,
+            "Fecha": m.fecha.strftime("%Y-%m-%d"),
+            "Tipo": m.tipo,
+            "Detalle": m.detalle,
+            "Monto": pesos(m.monto),
+            "Saldo": pesos(m.saldo),
+        }
+        for m in movimientos
+    ]
 
     if fmt == "xlsx":
         bio = io.BytesIO()
-        df = pd.DataFrame(rows)
+        df = pd.DataFrame(rows, columns=campos)
         with pd.ExcelWriter(bio, engine="openpyxl") as writer:
             df.to_excel(writer, index=False, sheet_name="ResumenCaja")
         bio.seek(0)
@@ -1093,7 +1166,7 @@ def resumen_caja_export():
                          mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
     else:
         sio = io.StringIO()
-        writer = csv.DictWriter(sio, fieldnames=rows[0].keys())
+        writer = csv.DictWriter(sio, fieldnames=campos)
         writer.writeheader()
         writer.writerows(rows)
         return Response(sio.getvalue(), mimetype="text/csv",
@@ -1103,137 +1176,30 @@ def resumen_caja_export():
 @app.route("/resumen-caja")
 def resumen_caja():
     today = date.today()
-    year = int(request.args.get("year", today.year))
-    month = int(request.args.get("month", 13))
+    periodo, year, month = request_periodo()
     caja_filtro = request.args.get("caja", "").strip()
     transaccion_id_filtro = request.args.get("transaccion_id", "").strip()
 
-    # Obtener todos los IDs de transacción únicos para el menú de filtro
-    compra_tids = db.session.query(Compra.transaccion_id).filter(Compra.transaccion_id.isnot(None)).distinct()
-    venta_tids = db.session.query(Venta.transaccion_id).filter(Venta.transaccion_id.isnot(None)).distinct()
-    transacciones_unicas = sorted({tid[0] for tid in compra_tids.union(venta_tids).all() if tid[0]})
-
-    if year == 1313 and month == 13:
-        compras_query = db.session.query(Compra)
-        ventas_query = db.session.query(Venta)
-    elif month == 13:
-        compras_query = db.session.query(Compra).filter(Compra.ym.like(f"{year}-%"))
-        ventas_query = db.session.query(Venta).filter(Venta.ym.like(f"{year}-%"))
-    elif year == 1313:
-        compras_query = db.session.query(Compra).filter(Compra.id == -1)
-        ventas_query = db.session.query(Venta).filter(Venta.id == -1)
-    else:
-        ym = f"{year:04d}-{month:02d}"
-        compras_query = db.session.query(Compra).filter(Compra.ym == ym)
-        ventas_query = db.session.query(Venta).filter(Venta.ym == ym)
-
-    # Aplicar filtro de transacción si se proporciona uno
-    if transaccion_id_filtro:
-        compras_query = compras_query.filter(Compra.transaccion_id == transaccion_id_filtro)
-        ventas_query = ventas_query.filter(Venta.transaccion_id == transaccion_id_filtro)
-
-    if caja_filtro:
-        compras_query = compras_query.filter(Compra.origen == caja_filtro)
-        ventas_query = ventas_query.filter(Venta.destino == caja_filtro)
+    # IDs de transacción únicos para el menú de filtro (catálogo de filtros)
+    transacciones_unicas = CATALOGO.obtener("transacciones")
 
+    # Movimientos con monto y saldo acumulado calculados en SQL (caja_ledger):
+    # - compras: egreso = -(neto + IVA no deducible), ventas: ingreso = total de la factura;
+    # - ya vienen ordenados por transaccion_id (vacíos al final) y fecha descendente;
+    # - `totales` es el saldo final de cada caja (GROUP BY).
+    # El color de cada transacción lo resuelve la plantilla (filtro color_index).
+    movimientos, totales = caja_ledger(periodo, caja_filtro, transaccion_id_filtro)
     resumen = {}
-    cajas = set()
-
-    for c in compras_query.all():
-        if not c.origen:
-            continue
-        cajas.add(c.origen)
-        # --- CÁLCULO DE EGRESO (COMPRA) ---
-        # 1. Se toman los valores base de la compra.
-        pesos_sin_iva = float(c.pesos_sin_iva or 0.0)
-        iva_total = float(c.iva_21 or 0.0) + float(c.iva_105 or 0.0)
-        
-        # 2. Se determina el porcentaje de IVA que se puede usar como crédito fiscal.
-        #    `iva_deducible_pct` viene del Excel (ej: 0.5 para 50%). Si no está, se usan los defaults.
-        pct_deducible = float(c.iva_deducible_pct if c.iva_deducible_pct is not None else 1.0)
-        
-        # 3. Se calcula la porción del IVA que NO es crédito fiscal y, por lo tanto, es un gasto.
-        iva_no_deducible = iva_total * (1 - pct_deducible)
-
-        # 4. El "Gasto Real" es el neto más el IVA que no se recupera. Este es el dinero que efectivamente sale de la caja.
-        monto_gasto_real = pesos_sin_iva + iva_no_deducible
-        
-        
-        resumen.setdefault(c.origen, []).append({
-            "tipo": "COMPRA",
-            "fecha": c.fecha,
-            "detalle": c.descripcion,
-            # 5. El monto se guarda en NEGATIVO para representar una salida de dinero (egreso).
-            "monto": -monto_gasto_real,
-            "transaccion_id": c.transaccion_id,
-            "personal": c.personal
-        })
-
-
-
-    for v in ventas_query.all():
-        if not v.destino:
-            continue
-        cajas.add(v.destino)
-        # --- CÁLCULO DE INGRESO (VENTA) ---
-        # 1. Se toma el monto total de la factura de venta.
-        #    Si `total_con_iva` es 0 o nulo, se calcula sumando el neto más los IVAs como fallback.
-        monto_venta = float(v.total_con_iva or (v.pesos_sin_iva or 0.0) + (v.iva_21 or 0.0) + (v.iva_105 or 0.0))
-        
-        resumen.setdefault(v.destino, []).append({
-        "tipo": "VENTA",
-        "fecha": v.fecha,
-        "detalle": v.descripcion,
-        # 2. El monto se guarda en POSITIVO para representar una entrada de dinero (ingreso).
-        "monto": monto_venta,
-        "transaccion_id": v.transaccion_id,
-        "personal": False
-        })
-
-
-
-# Ordenar los movimientos por transaccion_id (asc) y luego por fecha (desc)
-    for movimientos in resumen.values():
-        # 1. Sort by date descending (secondary sort)
-        movimientos.sort(key=lambda x: x["fecha"], reverse=True)
-        # 2. Sort by transaction_id ascending (primary sort). Python's sort is stable.
-        #    We use a very high unicode character for None/empty IDs to push them to the end.
-        movimientos.sort(key=lambda x: x.get("transaccion_id") or '\uffff')
-
-    # Lógica para asignar colores por transaccion_id
-    transaccion_color_map = {}
-    color_idx_counter = 0
-    all_movimientos = [mov for caja_movs in resumen.values() for mov in caja_movs]
-
-    for m in all_movimientos:
-        tid = m.get("transaccion_id")
-        # Solo asignamos un índice de color si existe un transaccion_id no vacío.
-        # De lo contrario, será None y la plantilla no aplicará color,
-        # permitiendo que funcione el estilo de filas alternas (striped).
-        if tid:
-            # Usamos la función de hash para obtener un índice de color determinista.
-            m['color_index'] = color_index(m['transaccion_id'], 8)
-        else:
-            m['color_index'] = None
-
-    # --- CÁLCULO DEL TOTAL POR CAJA ---
-    # Aquí se calcula el saldo final para cada caja.
-    # Se itera sobre cada 'caja' en el diccionario 'resumen'.
-    # Para cada caja, se suman todos los valores de 'monto' de sus movimientos.
-    #   - Las ventas tienen un 'monto' positivo (ingreso).
-    #   - Las compras tienen un 'monto' negativo (egreso).
-    # El resultado es el balance neto de la caja para el período filtrado.
-    totales = {
-        caja: round(sum(item["monto"] for item in resumen[caja]), 2)
-        for caja in resumen
-    }
+    for m in movimientos:
+        resumen.setdefault(m.caja, []).append(m)
 
     return render_template(
         "resumen_caja.html",
         resumen=resumen,
         totales=totales,
-        cajas=sorted(cajas),
+        cajas=sorted(totales),
         caja_filtro=caja_filtro,
+        periodo=periodo,
         year=year,
         month=month,
         transacciones_unicas=transacciones_unicas,
@@ -1252,35 +1218,35 @@ def resumen_caja():
 def totales_arca():
     ym = request.args.get("ym", "") or ""
     tipo = (request.args.get("tipo") or "").upper()
-    incluirN = request.args.get("incluirN", "0") == "1"
+    # la vista muestra todos los tipos salvo que se pida incluirN=0 (el export, sólo A/B)
+    incluirN = request.args.get("incluirN", "1") == "1"
 
     try:
-        filas_totales = build_totales_arca()
+        filas_totales = build_totales_arca(periodo=periodo_desde_ym(ym), tipo=tipo, incluirN=incluirN)
     except Exception as e:
-        print("[totales_arca] build_resumen_arca error:", e)
+        print("[totales_arca] build_totales_arca error:", e)
         filas_totales = []
 
-    def valid_ym(f):
-        y = f.get("YM", "") or ""
+    def valid_ym(y):
+        y = y or ""
         if not (isinstance(y, str) and len(y) == 7 and y[4] == '-' and y[:4].isdigit()):
             return False
         if y == "1970-01":
             return False
         return True
 
-    filas = [f for f in filas_totales if valid_ym(f)]
-    if ym:
-        filas = [f for f in filas if f.get("YM", "") == ym]
+    filas = [f for f in filas_totales if valid_ym(f.get("YM"))]
+    ym_list = [ym for ym in reversed(CATALOGO.obtener("yms")) if valid_ym(ym)]
 
-    filas = sorted(filas, key=lambda x: (x.get("YM", ""), x.get("tipo_operacion", "")), reverse=False)
-    ym_list = sorted({f.get("YM", "") for f in filas if f.get("YM")}, reverse=True)
-
-    # Totales por YM: resultado = Saldo_Tecnico_IVA(VENTA) - Saldo_Tecnico_IVA(COMPRA)
-    totals = []
-    for y in sorted({f.get("YM") for f in filas}):
-        ventas = sum((f.get("Saldo_Tecnico_IVA") or 0) for f in filas if f.get("YM") == y and (f.get("tipo_operacion") or "").upper() == "VENTA")
-        compras = sum((f.get("Saldo_Tecnico_IVA") or 0) for f in filas if f.get("YM") == y and (f.get("tipo_operacion") or "").upper() == "COMPRA")
-        totals.append({"YM": y, "ventas": ventas, "compras": compras, "resultado": ventas - compras})
+    # Totales por YM en una pasada: resultado = Saldo_Tecnico_IVA(VENTA) - Saldo_Tecnico_IVA(COMPRA)
+    por_ym = {}
+    for f in filas:
+        t = por_ym.setdefault(f["YM"], {"YM": f["YM"], "ventas": 0, "compras": 0})
+        if f["tipo_operacion"] == "VENTA":
+            t["ventas"] += f["Saldo_Tecnico_IVA"] or 0
+        elif f["tipo_operacion"] == "COMPRA":
+            t["compras"] += f["Saldo_Tecnico_IVA"] or 0
+    totals = [dict(t, resultado=t["ventas"] - t["compras"]) for _, t in sorted(por_ym.items())]
 
     print(f"[totales_arca] pasando {len(filas)} filas a template (raw totales={len(filas_totales)}) totals={len(totals)}")
 
@@ -1297,20 +1263,12 @@ def totales_arca():
 
 @app.route("/totales-arca/export")
 def totales_arca_export():
-    filas = build_resumen_arca()
     ym = request.args.get("ym")
     tipo = (request.args.get("tipo") or "").upper()
     incluirN = request.args.get("incluirN", "0") == "1"
     fmt = request.args.get("format", "csv").lower()
-    if ym:
-        filas = [f for f in filas if f["fecha"][:7] == ym]
-    if not incluirN:
-        filas = [f for f in filas if (f["tipo_comprobante"] in {"A", "B"})]
-    if tipo in {"A", "B", "N"}:
-        filas = [f for f in filas if f["tipo_comprobante"] == tipo]
-
-    # usar el agregador existente (asegura keys/format compatibles con la plantilla)
-    filas_totales = build_totales_arca(filtered=filas)
+    # mismo agregador que la vista (GROUP BY en SQL, keys/format compatibles con la plantilla)
+    filas_totales = en_pesos(build_totales_arca(periodo=periodo_desde_ym(ym), tipo=tipo, incluirN=incluirN), MONTOS_ARCA)
 
     if fmt == "xlsx":
         if pd is None:
@@ -1345,75 +1303,40 @@ def totales_arca_export():
 @app.route("/resumen-socio", endpoint="resumen_socio")
 def resumen_socio_view():
     """
-    Resumen por socio con filtros year/month (month 1-12, 13 = Todos).
-    Compatibilidad:
-      - Si se pasan year/month se usan para construir ym (same semantics as index/ventas/compras).
-      - Si se pasa ym (legacy) y no se pasan year/month, se respeta el comportamiento anterior.
-    Pasa 'year' y 'month' al template para que los selects puedan mostrarlos.
+    Resumen por socio con filtros year/month (month 1-12, 13 = Todos, 'T1'..'T4' = trimestre)
+    o rango desde/hasta; el periodo se resuelve con request_periodo como en index/ventas/compras.
+    Pasa 'periodo', 'year' y 'month' al template para que los selects puedan mostrarlos.
     """
-    # lista de YMs disponibles (legacy)
-    yms = db.session.query(Compra.ym).distinct().union(db.session.query(Venta.ym)).all()
-    ym_list = sorted({r[0] for r in yms if r[0]}, reverse=True)
+    # lista de YMs disponibles (legacy), del catálogo de filtros
+    ym_list = list(reversed(CATALOGO.obtener("yms")))
 
-    # leer filtros year/month (ya presente)
+    # leer el periodo (year/month, trimestre o rango)
     today = date.today()
-    year = int(request.args.get("year", today.year))
-    month_arg = request.args.get("month", None)
-    month = int(month_arg) if month_arg is not None else 13
+    periodo, year, month = request_periodo()
+    ym = periodo.clave
 
     # nuevo filtro: socio (nombre)
     socio_name = (request.args.get("socio") or "").strip()
-    socios = [n for (_id, n) in db.session.query(Socio.id, Socio.nombre).order_by(Socio.nombre).all()]
-
-    # construir ventas_query según year/month (misma lógica que index/ventas/compras)
-    if year == 1313 and month == 13:
-        ventas_query = db.session.query(Venta)
-        compras_query = db.session.query(Compra)
-        ym = "all"
-    elif month == 13:
-        ventas_query = db.session.query(Venta).filter(Venta.ym.like(f"{year}-%"))
-        compras_query = db.session.query(Compra).filter(Compra.ym.like(f"{year}-%"))
-        ym = f"{year}-*"
-    elif year == 1313:
-        ventas_query = db.session.query(Venta).filter(Venta.id == -1)
-        compras_query = db.session.query(Compra).filter(Compra.id == -1)
-        ym = "none"
-    else:
-        ym = f"{year:04d}-{month:02d}"
-        ventas_query = db.session.query(Venta).filter(Venta.ym == ym)
-        compras_query = db.session.query(Compra).filter(Compra.ym == ym)
+    socios = [n for (_id, n) in CATALOGO.obtener("socios")]
+
+    # totales desde el rollup mensual del periodo
+    R = ResumenMensual
+    ventas_query = rollup_query(periodo, "VENTA")
+    compras_query = rollup_query(periodo, "COMPRA")
 
     # aplicar filtro por nombre_socio si se pidió
     if socio_name:
-        ventas_query = ventas_query.join(Socio, Venta.socio_id == Socio.id).filter(Socio.nombre == socio_name)
+        ventas_query = ventas_query.join(Socio, R.socio_id == Socio.id).filter(Socio.nombre == socio_name)
 
-    total_ventas_con_iva = float(
-        ventas_query.with_entities(
-            func.coalesce(func.sum(total_con_iva_expr(Venta)), 0.0)
-        ).scalar()
-        or 0.0
-    )
-
-    # total ventas sin IVA (base)
-    total_ventas_sin_iva = float(
-        ventas_query.with_entities(
-            func.coalesce(func.sum(func.coalesce(Venta.pesos_sin_iva, 0.0)), 0.0)
-        ).scalar() or 0.0
+    total_ventas_con_iva, total_ventas_sin_iva = (
+        int(x or 0)
+        for x in ventas_query.with_entities(func.sum(R.total_con_iva), func.sum(R.pesos_sin_iva)).first()
     )
 
     # total compras: mismo tratamiento
-    total_compras_con_iva = float(
-        compras_query.with_entities(
-            func.coalesce(func.sum(total_con_iva_expr(Compra)), 0.0)
-        ).scalar()
-        or 0.0
-    )
-
-    # total compras sin IVA (base)
-    total_compras_sin_iva = float(
-        compras_query.with_entities(
-            func.coalesce(func.sum(func.coalesce(Compra.pesos_sin_iva, 0.0)), 0.0)
-        ).scalar() or 0.0
+    total_compras_con_iva, total_compras_sin_iva = (
+        int(x or 0)
+        for x in compras_query.with_entities(func.sum(R.total_con_iva), func.sum(R.pesos_sin_iva)).first()
     )
 
     # saldos
@@ -1440,10 +1363,11 @@ def resumen_socio_view():
     except Exception:
         pass
 
-    filas, p_emp, p_ven, p_soc = build_resumen_socio(ym)
+    filas, p_emp, p_ven, p_soc = build_resumen_socio(periodo)
     return render_template(
         "resumen_socio.html",
         filas=filas,
+        periodo=periodo,
         ym=ym,
         ym_list=ym_list,
         p_emp=p_emp,
@@ -1467,38 +1391,28 @@ def resumen_socio_view():
 @app.route("/resumen-socio/export", endpoint="resumen_socio_export")
 def resumen_socio_export():
     """
-    Export versión que acepta year/month (preferible) o legacy ym param.
+    Export versión que acepta year/month / trimestre / desde-hasta (preferible, request_periodo)
+    o legacy ym param (cualquier clave de periodo, ver periodo_desde_ym).
     """
-    # construir lista de ym disponibles (legacy)
-    yms = db.session.query(Compra.ym).distinct().union(db.session.query(Venta.ym)).all()
-    ym_list = sorted({r[0] for r in yms if r[0]}, reverse=True)
+    # lista de ym disponibles (legacy), del catálogo de filtros
+    ym_list = list(reversed(CATALOGO.obtener("yms")))
 
-    # priorizar year/month si presentes
-    today = date.today()
-    year_arg = request.args.get("year")
-    month_arg = request.args.get("month")
+    # priorizar year/month (o trimestre / rango) si presentes
     fmt = request.args.get("format", "csv").lower()
 
-    if year_arg is not None or month_arg is not None:
-        year = int(year_arg) if year_arg is not None else today.year
-        month = int(month_arg) if month_arg is not None else 13
-        if year == 1313 and month == 13:
-            ym = "all"
-        elif month == 13:
-            ym = f"{year}-*"
-        elif year == 1313:
-            ym = "none"
-        else:
-            ym = f"{year:04d}-{month:02d}"
+    if any(request.args.get(k) is not None for k in ("year", "month", "desde", "hasta")):
+        periodo, _, _ = request_periodo()
     else:
-        ym = request.args.get("ym")
-        if not ym or ym not in ym_list:
-            ym = ym_list[0] if ym_list else None
+        periodo = periodo_desde_ym(request.args.get("ym"))
+        if periodo is None and ym_list:
+            periodo = periodo_desde_ym(ym_list[0])
 
-    if not ym:
+    if periodo is None:
         return Response("No hay datos para exportar", status=400)
 
-    filas, p_emp, p_ven, p_soc = build_resumen_socio(ym)
+    ym = periodo.clave
+    filas, p_emp, p_ven, p_soc = build_resumen_socio(periodo)
+    filas = en_pesos(filas, MONTOS_SOCIO)
 
     if fmt == "xlsx":
         if pd is None:
@@ -1548,255 +1462,366 @@ def resumen_socio_export():
 # ------------------- Importación -------------------
 
 
-def do_import_excel_from_path(path: str):
+def build_import_context(read_only: bool = False) -> ImportContext:
     """
-    Procesa un archivo Excel (ruta local) y lo importa a la base de datos.
+    Resuelve los datos de referencia de una importación en pocas consultas.
 
     Qué hace:
-    - Lee pestañas esperadas: Parametros, Socios, FactCompras, FactVentas.
-    - Actualiza/crea parámetros y socios.
-    - Valida y convierte filas de compras/ventas, crea objetos Compra/Venta.
-    - Maneja rechazos (los guarda en un CSV en uploads/ y devuelve path).
-    - Borra previamente los YMs detectados para evitar duplicados (limpieza por periodo).
-    - Ajusta márgenes por defecto en Socio si están vacíos.
+    - Carga todos los socios en un dict nombre -> id (una consulta).
+    - Lee una vez nombre_socio_obligatorio e iva_deducible_normal/personal_default_pct.
+    - Los parámetros faltantes se crean con su default sin commit (quedan en la transacción
+      de la importación); read_only=True no los crea, sólo usa el default.
 
-    Parámetros:
-    - path: ruta al archivo XLSX descargado/subido.
+    Quién la consume:
+    - do_import_excel_from_path, después del upsert de Parametros/Socios.
+    - dry_run_import (read_only=True).
+    """
+    if read_only:
+        valores = dict(db.session.query(Parametro.clave, Parametro.valor).all())
+        param = lambda clave, default: valores.get(clave, default)  # noqa: E731
+    else:
+        param = lambda clave, default: get_param(clave, default, commit=False)  # noqa: E731
+    return ImportContext(
+        socios={nombre: sid for sid, nombre in db.session.query(Socio.id, Socio.nombre).all()},
+        p_norm=param("iva_deducible_normal_pct", 1.0),
+        p_pers_def=param("iva_deducible_personal_default_pct", 0.5),
+        socio_oblig=bool(int(param("nombre_socio_obligatorio", 1))),
+    )
 
-    Devuelve:
-    - dict con keys: deleted_c, deleted_v, rechazos, rechazos_path.
 
-    Efectos secundarios:
-    - Inserta/borra filas en la BD (db.session).
-    - Crea archivos en UPLOAD_FOLDER cuando hay rechazos.
+def existing_fingerprints(Model, yms, keys=()) -> list:
+    """
+    Devuelve (id, row_key, row_hash, ym) de las filas existentes de Model que pueden chocar
+    con una importación: todas las de los YMs `yms` (una consulta) más, por lotes de
+    claves, las de otros YMs cuya row_key viene en el archivo (p. ej. fecha corregida).
 
     Quién la consume:
-    - import_xls route y import_gsheet (descarga y reusa esta función).
+    - sync_import_rows y dry_run_import.
     """
-    rechazos = []
-    socio_oblig = bool(int(get_param("nombre_socio_obligatorio", 1)))
-    # Parametros
-    try:
-        df_par = pd.read_excel(path, sheet_name="Parametros")
-        if {"Parametro", "Valor"}.issubset(df_par.columns):
-            for _, r in df_par.iterrows():
-                clave = str(r.get("Parametro")).strip()
-                if not clave:
-                    continue
-                try:
-                    valor = float(r.get("Valor"))
-                except Exception:
-                    continue
-                p = db.session.get(Parametro, clave)
-                if p is None:
-                    db.session.add(Parametro(clave=clave, valor=valor))
-                else:
-                    p.valor = valor
-            db.session.commit()
-    except Exception:
-        pass
-    # Socios
-    try:
-        df_soc = pd.read_excel(path, sheet_name="Socios")
-        if {"nombre_socio", "tipo_socio"}.issubset(df_soc.columns):
-            for _, r in df_soc.iterrows():
-                nombre = str(r["nombre_socio"]).strip()
-                if not nombre:
-                    continue
-                tipo = (
-                    str(r["tipo_socio"]).strip()
-                    if pd.notna(r.get("tipo_socio"))
-                    else "Socio"
-                )
-                s = db.session.query(Socio).filter_by(nombre=nombre).first()
-                if not s:
-                    db.session.add(Socio(nombre=nombre, tipo=tipo))
-                else:
-                    s.tipo = tipo
-            db.session.commit()
-    except Exception:
-        pass
+    q = db.session.query(Model.id, Model.row_key, Model.row_hash, Model.ym)
+    filas = q.filter(Model.ym.in_(list(yms))).all() if yms else []
+    vistas = {f.row_key for f in filas}
+    faltan = [k for k in keys if k not in vistas]
+    for i in range(0, len(faltan), 500):
+        filas += q.filter(Model.row_key.in_(faltan[i : i + 500])).all()
+    return filas
 
-    def get_socio_id(nom):
-        if nom is None:
-            return None
-        s = db.session.query(Socio).filter_by(nombre=str(nom).strip()).first()
-        return s.id if s else None
 
-    # Detectar YMs a limpiar
-    yms_c, yms_v = set(), set()
-    try:
-        tmp = pd.read_excel(path, sheet_name="FactCompras")
-        for _, r in tmp.iterrows():
-            f = r.get("FECHA")
-            if pd.isna(f):
-                continue
-            f = parse_date(f) if isinstance(f, str) else pd.to_datetime(f).date()
-            yms_c.add(ym_from_date(f))
-    except Exception:
-        pass
-    try:
-        tmp = pd.read_excel(path, sheet_name="FactVentas")
-        for _, r in tmp.iterrows():
-            f = r.get("FECHA")
-            if pd.isna(f):
-                continue
-            f = parse_date(f) if isinstance(f, str) else pd.to_datetime(f).date()
-            yms_v.add(ym_from_date(f))
-    except Exception:
-        pass
-    deleted_c = (
-        db.session.query(Compra)
-        .filter(Compra.ym.in_(list(yms_c)))
-        .delete(synchronize_session=False)
-        if yms_c
-        else 0
-    )
-    deleted_v = (
-        db.session.query(Venta)
-        .filter(Venta.ym.in_(list(yms_v)))
-        .delete(synchronize_session=False)
-        if yms_v
-        else 0
+def upsert_rows(Model, rows, chunk_size: int | None = None, on_chunk=None) -> int:
+    """
+    Escribe filas (dicts ya normalizados) con INSERT ... ON CONFLICT(row_key) DO UPDATE por lotes.
+
+    Qué hace:
+    - Evita crear objetos ORM: un único statement Core ejecutado con executemany.
+    - Fila nueva -> se inserta; row_key existente -> se actualiza sólo si cambió row_hash.
+      Reimportar el mismo rango (o uno solapado) no duplica ni reescribe nada.
+    - Parte `rows` en lotes de `chunk_size` (default: app.config["IMPORT_CHUNK_SIZE"]).
+    - on_chunk(n): callback opcional tras cada lote (progreso de la importación).
+
+    Devuelve:
+    - int: cantidad de filas enviadas.
+
+    Quién la consume:
+    - sync_import_rows para escribir FactCompras/FactVentas.
+    """
+    if not rows:
+        return 0
+    size = max(int(chunk_size or app.config["IMPORT_CHUNK_SIZE"]), 1)
+    table = Model.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.row_key],
+        set_={c: stmt.excluded[c] for c in rows[0] if c != "row_key"},
+        where=table.c.row_hash.is_not(stmt.excluded.row_hash),
     )
-    if any([deleted_c, deleted_v]):
-        db.session.commit()
+    for i in range(0, len(rows), size):
+        chunk = rows[i : i + size]
+        db.session.execute(stmt, chunk)
+        if on_chunk:
+            on_chunk(len(chunk))
+    return len(rows)
 
-    # Helpers parsing
-    def _to_bool_si_no(val):
-        s = str(val).strip().lower()
-        return s in {"si", "sí", "s", "yes", "y", "true", "1"}
 
-    def _to_pct(val, default=None):
-        if val is None or (isinstance(val, float) and pd.isna(val)):
-            return default
-        s = str(val).strip().replace(",", ".")
-        try:
-            if s.endswith("%"):
-                p = float(s[:-1]) / 100.0
-            else:
-                p = float(s)
-                if p > 1.0:
-                    p = p / 100.0
-            return min(max(p, 0.0), 1.0)
-        except Exception:
-            return default
+def sync_import_rows(
+    Model, yms, rows, chunk_size: int | None = None, on_chunk=None, prune: bool | None = None
+) -> RowDiff:
+    """
+    Aplica sólo los cambios de una importación sobre Model, por clave natural (row_key).
+
+    Qué hace:
+    - Lee (id, row_key, row_hash, ym) de las filas que pueden chocar (existing_fingerprints).
+    - Compara por huella con las filas nuevas (diff_rows): sin cambios / update / insert / delete.
+    - Escribe inserts y updates con un único upsert por lotes (upsert_rows).
+    - Borra por lotes de ids las filas sin row_key de `yms` (previas a las huellas) y, con
+      `prune` (default IMPORT_PRUNE_MISSING), también las que ya no vienen en el archivo.
+    - on_chunk(n): callback opcional con las filas procesadas (sin cambios, updates, inserts).
+
+    Devuelve:
+    - RowDiff con las listas aplicadas y la cantidad de filas sin cambios.
+
+    Quién la consume:
+    - do_import_excel_from_path para FactCompras y FactVentas.
+    """
+    size = max(int(chunk_size or app.config["IMPORT_CHUNK_SIZE"]), 1)
+    if prune is None:
+        prune = app.config["IMPORT_PRUNE_MISSING"]
+    existentes = existing_fingerprints(Model, yms, [r["row_key"] for r in rows])
+    diff = diff_rows(existentes, rows, yms, prune=prune)
+    if on_chunk:
+        on_chunk(diff.unchanged)
+    table = Model.__table__
+    # primero las bajas: una fila vieja sin clave no choca con la nueva que la reemplaza
+    for i in range(0, len(diff.deletes), size):
+        db.session.execute(table.delete().where(table.c.id.in_(diff.deletes[i : i + size])))
+    upsert_rows(Model, diff.upserts, size, on_chunk)
+    return diff
+
+
+def last_import_for(sha: str):
+    """
+    Devuelve la última Importacion si su hash coincide con `sha`, si no None.
+
+    Sólo se compara contra la importación más reciente: si en el medio se importó
+    otro archivo, volver a subir uno anterior sí debe reimportarse.
+    """
+    ultima = db.session.query(Importacion).order_by(Importacion.id.desc()).first()
+    return ultima if ultima is not None and ultima.sha256 == sha else None
+
+
+def last_import_from(origen: str):
+    """
+    Devuelve la última Importacion si vino de la URL `origen` (Google Sheets), si no None.
+
+    Igual que last_import_for: un 304 sólo vale si nada se importó después.
+    """
+    ultima = db.session.query(Importacion).order_by(Importacion.id.desc()).first()
+    return ultima if ultima is not None and ultima.origen == origen else None
+
+
+def previous_import_result(previa, sha: str | None = None) -> dict:
+    """Resultado guardado de una Importacion, marcado como sin_cambios (no se reimportó)."""
+    res = json.loads(previa.resultado or "{}")
+    res.update(
+        {
+            "sin_cambios": True,
+            "sha256": sha or previa.sha256,
+            "importado": previa.creado.strftime("%Y-%m-%d %H:%M") if previa.creado else "",
+        }
+    )
+    return res
+
+
+def dry_run_import(path: str, nombre: str | None = None) -> dict:
+    """
+    Valida un libro sin escribir nada y dice qué haría la importación.
+
+    Qué hace:
+    - Corre la misma lectura/normalización que do_import_excel_from_path (prepare_sheets):
+      fechas, nombre_socio desconocido, montos no numéricos; además cuenta TIPO desconocidos.
+    - Los Parametros/Socios del libro se aplican sólo en memoria (overlay_context).
+    - Compara las huellas contra las filas existentes que pueden chocar (existing_fingerprints,
+      sólo lectura) para contar altas, cambios y bajas (filas sin clave de los YMs y, con
+      IMPORT_PRUNE_MISSING, las que faltan en el archivo).
+    - Nunca hace commit: al final descarta la sesión (rollback).
+
+    Devuelve:
+    - dict de summarize_dry_run más archivo, sha256, identico (igual al último importado),
+      socios_nuevos y los primeros 200 rechazos (detalle).
+
+    Quién la consume:
+    - import_xls (checkbox "Sólo validar") y el comando `flask import-dry-run`.
+    """
+    try:
+        workers = app.config["IMPORT_PARSE_WORKERS"]
+        sheets, presentes = read_import_book(path, workers)
+        for required in DATA_SHEETS:
+            if required not in presentes:
+                raise ValueError(f"Falta la hoja {required} en el archivo")
+        sha = file_sha256(path)
+        base = build_import_context(read_only=True)
+        ctx = overlay_context(base, sheets.get("Parametros"), sheets.get("Socios"))
+        prep = prepare_sheets(path, ctx, workers=workers, frames=sheets)
+        diffs, existentes = {}, {}
+        for sheet, Model in (("FactCompras", Compra), ("FactVentas", Venta)):
+            yms, records = prep[sheet].yms, prep[sheet].records
+            filas = existing_fingerprints(Model, yms, [r["row_key"] for r in records])
+            existentes[sheet] = sum(1 for f in filas if f.ym in yms)
+            diffs[sheet] = diff_rows(filas, records, yms, prune=app.config["IMPORT_PRUNE_MISSING"])
+        rechazos = [r for p in prep.values() for r in p.rechazos]
+        res = summarize_dry_run(prep, diffs, existentes)
+        res.update(
+            {
+                "archivo": nombre or os.path.basename(path),
+                "sha256": sha,
+                "identico": last_import_for(sha) is not None,
+                "socios_nuevos": sorted(n for n in ctx.socios if n not in base.socios),
+                "detalle_rechazos": rechazos[:200],
+            }
+        )
+        return res
+    finally:
+        db.session.rollback()
+
 
-    # Import Compras
-    df_c = pd.read_excel(path, sheet_name="FactCompras")
-    for _, r in df_c.iterrows():
+def do_import_excel_from_path(
+    path: str, chunk_size: int | None = None, force: bool = False, progress=None, origen=None
+):
+    """
+    Procesa un archivo Excel (ruta local) y lo importa a la base de datos.
+
+    También acepta, con las mismas hojas y columnas, un .zip con un CSV por hoja
+    (FactCompras.csv, ...) o un directorio/.zip con un Parquet por hoja: se saltea
+    openpyxl y pasan por la misma validación y rechazos (ver read_import_sheets).
+
+    Qué hace:
+    - Lee el libro una sola vez (read_import_book, openpyxl en modo read-only): con un solo
+      proceso de lectura trae todas las hojas; con IMPORT_PARSE_WORKERS > 1 sólo Parametros
+      y Socios. Actualiza/crea parámetros y socios y arma un ImportContext (socios nombre->id
+      y parámetros de IVA) que las filas leen en memoria.
+    - Prepara FactCompras y FactVentas (prepare_sheets): en paralelo, cada hoja leída en su
+      proceso, o desde las hojas ya leídas; conversión columnar, máscara de rechazos y huella
+      por fila (row_key/row_hash).
+    - Junta los resultados y, en este proceso, aplica sólo los cambios por clave natural
+      (tipo + CUIT + PV + número, sync_import_rows): altas y cambios con un único
+      INSERT ... ON CONFLICT DO UPDATE por lotes (upsert_rows), sin objetos ORM; reimportar
+      un rango solapado es idempotente. Con IMPORT_PRUNE_MISSING borra además las filas de
+      los YMs del archivo que ya no vienen en él.
+    - Maneja rechazos (los guarda en un CSV en uploads/ y devuelve path).
+    - Recalcula los totales mensuales (ResumenMensual) de los YMs tocados.
+    - Ajusta márgenes por defecto en Socio si están vacíos.
+
+    Parámetros:
+    - path: ruta al archivo XLSX descargado/subido, .zip de CSV/Parquet o directorio de Parquet.
+    - chunk_size: tamaño de lote para el upsert masivo (default IMPORT_CHUNK_SIZE).
+    - force: reimporta aunque el archivo sea idéntico al último importado.
+    - progress: callback opcional progress(fase, rows=..., rechazos=...) con fases
+      parse / delete / insert (lo usan los trabajos en segundo plano).
+    - origen: DownloadResult de la descarga de Google Sheets; se guardan
+      la URL y sus validadores ETag/Last-Modified en la Importacion.
+
+    Devuelve:
+    - dict con keys: deleted_c, deleted_v, inserted_c, inserted_v, updated_c, updated_v,
+      unchanged_c, unchanged_v, rechazos, rechazos_path, sha256, sin_cambios.
+    - Si el contenido (SHA-256) es idéntico al de la última importación y no se pidió
+      `force`, no lee el archivo: devuelve el resultado previo con sin_cambios=True.
+
+    Efectos secundarios:
+    - Inserta/borra filas en la BD en una sola transacción con un único commit al final
+      (BEGIN IMMEDIATE, Parametros/Socios en SAVEPOINTs); ante un error hace rollback
+      completo y relanza.
+    - Crea archivos en UPLOAD_FOLDER cuando hay rechazos.
+
+    Quién la consume:
+    - import_xls route y import_gsheet (descarga y reusa esta función).
+    """
+    report = progress or (lambda *a, **k: None)
+    report("parse")
+    sha = file_sha256(path)
+    previa = None if force else last_import_for(sha)
+    if previa is not None:
+        if origen is not None:
+            # mismo contenido con validadores nuevos: el próximo pedido condicional usa éstos
+            begin_immediate()
+            previa.origen, previa.etag, previa.last_modified = origen.url, origen.etag, origen.last_modified
+            db.session.commit()
+        return previous_import_result(previa, sha)
+
+    # Una sola lectura del libro: sin pool trae también FactCompras / FactVentas
+    # (read_import_book); Parametros y Socios se aplican primero (la validación de filas depende de ellos)
+    workers = app.config["IMPORT_PARSE_WORKERS"]
+    sheets, presentes = read_import_book(path, workers)
+    for required in DATA_SHEETS:
+        if required not in presentes:
+            raise ValueError(f"Falta la hoja {required} en el archivo")
+    # Todo lo que sigue es una sola transacción (un único commit al final): los lectores
+    # nunca ven un período borrado y sin reinsertar. Parametros y Socios van en SAVEPOINTs:
+    # si fallan se descartan sólo ellos y la importación sigue, como antes.
+    # BEGIN IMMEDIATE: otro escritor (upload, sincronización, socios) que confirme mientras
+    # tanto espera a este COMMIT en vez de invalidar lo leído acá.
+    begin_immediate()
+    # Parametros
+    df_par = sheets.get("Parametros")
+    if df_par is not None and {"Parametro", "Valor"}.issubset(df_par.columns):
         try:
-            fecha = r.get("FECHA")
-            if pd.isna(fecha):
-                continue
-            fecha = (
-                parse_date(fecha)
-                if isinstance(fecha, str)
-                else pd.to_datetime(fecha).date()
-            )
-            ym = ym_from_date(fecha)
-            socio_id = get_socio_id(r.get("nombre_socio"))
-            if socio_oblig and not socio_id:
-                rechazos.append(
-                    {
-                        "sheet": "FactCompras",
-                        "motivo": "nombre_socio inválido/ausente",
-                        "NRO_FACTURA": r.get("NRO_FACTURA"),
-                        "FECHA": str(fecha),
-                        "PROVEEDOR": r.get("PROVEEDOR"),
-                    }
-                )
-                continue
-            personal = (
-                _to_bool_si_no(r.get("personal"))
-                if ("personal" in df_c.columns)
-                else False
-            )
-            p_norm = get_param("iva_deducible_normal_pct", 1.0)
-            p_pers_def = get_param("iva_deducible_personal_default_pct", 0.5)
-            ded_pct = _to_pct(r.get("iva_deducible_pct"), None)
-            if ded_pct is None:
-                ded_pct = p_pers_def if personal else p_norm
-            ded_pct = min(max(float(ded_pct), 0.0), 1.0)
-            cobj = Compra(
-                fecha=fecha,
-                ym=ym,
-                proveedor=str(r.get("PROVEEDOR", "")),
-                socio_id=socio_id,
-                pesos_sin_iva=float(r.get("PESOS_SIN_IVA") or 0),
-                iva_21=float(r.get("IVA_21") or 0),
-                iva_105=float(r.get("IVA_105") or 0),
-                total_con_iva=float(r.get("TOTAL_CON_IVA") or 0),
-                tipo=str(r.get("TIPO") or "").upper(),
-                nro_factura=str(r.get("NRO_FACTURA") or ""),
-                cuit=str(r.get("CUIT") or ""),
-                origen=str(r.get("ORIGEN") or ""),
-                estado=str(r.get("ESTADO") or "PAGADO"),
-                descripcion=str(r.get("DETALLE") or ""),
-                personal=personal,
-                iva_deducible_pct=ded_pct,
-                transaccion_id=str(r.get("transaccion_id") or "").strip()
-            )
-            db.session.add(cobj)
-        except Exception as e:
-            rechazos.append({"sheet": "FactCompras", "motivo": str(e)})
-    db.session.commit()
-    # Import Ventas
-    df_v = pd.read_excel(path, sheet_name="FactVentas")
-    for _, r in df_v.iterrows():
+            with db.session.begin_nested():
+                existentes = {p.clave: p for p in db.session.query(Parametro).all()}
+                for _, r in df_par.iterrows():
+                    clave = str(r.get("Parametro")).strip()
+                    if not clave:
+                        continue
+                    try:
+                        valor = float(r.get("Valor"))
+                    except Exception:
+                        continue
+                    p = existentes.get(clave)
+                    if p is None:
+                        p = existentes[clave] = Parametro(clave=clave, valor=valor)
+                        db.session.add(p)
+                    else:
+                        p.valor = valor
+        except Exception:
+            pass
+    # Socios
+    df_soc = sheets.get("Socios")
+    if df_soc is not None and {"nombre_socio", "tipo_socio"}.issubset(df_soc.columns):
         try:
-            fecha = r.get("FECHA")
-            if pd.isna(fecha):
-                continue
-            fecha = (
-                parse_date(fecha)
-                if isinstance(fecha, str)
-                else pd.to_datetime(fecha).date()
-            )
-            ym = ym_from_date(fecha)
-            socio_id = get_socio_id(r.get("nombre_socio"))
-            if socio_oblig and not socio_id:
-                rechazos.append(
-                    {
-                        "sheet": "FactVentas",
-                        "motivo": "nombre_socio inválido/ausente",
-                        "NRO_FACTURA": r.get("NRO_FACTURA"),
-                        "FECHA": str(fecha),
-                        "CLIENTE": r.get("CLIENTE"),
-                    }
-                )
-                continue
-            vobj = Venta(
-                fecha=fecha,
-                ym=ym,
-                cliente=str(r.get("CLIENTE", "")),
-                socio_id=socio_id,
-                pesos_sin_iva=float(r.get("PESOS_SIN_IVA") or 0),
-                iva_21=float(r.get("IVA_21") or 0),
-                iva_105=float(r.get("IVA_105") or 0),
-                total_con_iva=float(r.get("TOTAL_CON_IVA") or 0),
-                nro_factura=str(r.get("NRO_FACTURA") or ""),
-                cuit_venta=str(r.get("CUIT_VENTA") or ""),
-                destino=str(r.get("DESTINO") or ""),
-                estado=str(r.get("ESTADO") or "PAGADO"),
-                descripcion=str(r.get("DETALLE") or ""),
-                tipo=str(r.get("TIPO") or "").upper(),
-                transaccion_id=str(r.get("transaccion_id") or "").strip()
-            )
-            db.session.add(vobj)
-        except Exception as e:
-            rechazos.append({"sheet": "FactVentas", "motivo": str(e)})
-    db.session.commit()
-    # Margenes default
-    p_emp = _read_param_any(["margen_Empresa"], 0.53)
-    p_soc = _read_param_any(["margen_Socio"], 0.09)
-    changed = False
-    for s in db.session.query(Socio).order_by(Socio.nombre).all():
-        if s.margen_porcentaje is None:
-            s.margen_porcentaje = p_emp if s.tipo == "Empresa" else p_soc
-            changed = True
-    if changed:
-        db.session.commit()
+            with db.session.begin_nested():
+                existentes = {s.nombre: s for s in db.session.query(Socio).all()}
+                for _, r in df_soc.iterrows():
+                    if pd.isna(r["nombre_socio"]):
+                        continue
+                    nombre = str(r["nombre_socio"]).strip()
+                    if not nombre:
+                        continue
+                    tipo = (
+                        str(r["tipo_socio"]).strip()
+                        if pd.notna(r.get("tipo_socio"))
+                        else "Socio"
+                    )
+                    s = existentes.get(nombre)
+                    if not s:
+                        s = existentes[nombre] = Socio(nombre=nombre, tipo=tipo)
+                        db.session.add(s)
+                    else:
+                        s.tipo = tipo
+        except Exception:
+            pass
+
+    try:
+        # Contexto de importación: socios y parámetros se resuelven una sola vez
+        ctx = build_import_context()
+        # FactCompras y FactVentas se normalizan en paralelo (un proceso por hoja) o desde `sheets`
+        prep = prepare_sheets(path, ctx, workers=workers, frames=sheets)
+        rechazos = [r for p in prep.values() for r in p.rechazos]
+        report("parse", rows=sum(p.rows for p in prep.values()), rechazos=len(rechazos))
+
+        escritas = 0
+
+        def _avance(n):
+            nonlocal escritas
+            escritas += n
+            report("insert", rows=escritas)
+
+        # Aplicar sólo los cambios (hash-join contra las huellas existentes de esos YMs)
+        report("delete")
+        diff_c = sync_import_rows(Compra, prep["FactCompras"].yms, prep["FactCompras"].records, chunk_size, _avance)
+        report("delete")
+        diff_v = sync_import_rows(Venta, prep["FactVentas"].yms, prep["FactVentas"].records, chunk_size, _avance)
+        # Totales mensuales: sólo los YMs tocados (los del archivo y los de filas que cambiaron de mes)
+        refresh_rollup(
+            set(prep["FactCompras"].yms) | set(prep["FactVentas"].yms)
+            | set(diff_c.updated_yms) | set(diff_v.updated_yms)
+        )
+        # Margenes default
+        p_emp = _read_param_any(["margen_Empresa"], 0.53, commit=False)
+        p_soc = _read_param_any(["margen_Socio"], 0.09, commit=False)
+        for s in db.session.query(Socio).order_by(Socio.nombre).all():
+            if s.margen_porcentaje is None:
+                s.margen_porcentaje = p_emp if s.tipo == "Empresa" else p_soc
+    except Exception:
+        # nada a medias: se descartan también Parametros/Socios
+        db.session.rollback()
+        raise
     # Rechazos file
     rej_file = None
     if rechazos:
@@ -1808,12 +1833,229 @@ def do_import_excel_from_path(path: str):
             writer.writeheader()
             writer.writerows(rechazos)
         rej_file = fpath
-    return {
-        "deleted_c": deleted_c,
-        "deleted_v": deleted_v,
+    res = {
+        "deleted_c": len(diff_c.deletes),
+        "deleted_v": len(diff_v.deletes),
+        "inserted_c": len(diff_c.inserts),
+        "inserted_v": len(diff_v.inserts),
+        "updated_c": len(diff_c.updates),
+        "updated_v": len(diff_v.updates),
+        "unchanged_c": diff_c.unchanged,
+        "unchanged_v": diff_v.unchanged,
         "rechazos": len(rechazos),
         "rechazos_path": rej_file,
+        "sha256": sha,
+        "sin_cambios": False,
     }
+    db.session.add(
+        Importacion(
+            sha256=sha,
+            archivo=os.path.basename(path),
+            resultado=json.dumps(res),
+            origen=origen.url if origen is not None else None,
+            etag=origen.etag if origen is not None else None,
+            last_modified=origen.last_modified if origen is not None else None,
+        )
+    )
+    # las listas de los filtros (transacciones, YMs, socios) pueden haber cambiado
+    bump_catalogo()
+    # único commit de la importación
+    db.session.commit()
+    return res
+
+
+def import_result_messages(res: dict, fuente: str) -> list:
+    """
+    Arma los mensajes [(categoría, texto)] del resultado de do_import_excel_from_path.
+
+    Qué hace:
+    - Resume por tabla las filas nuevas / actualizadas / borradas / sin cambios.
+    - Avisa las filas rechazadas y el link al CSV de detalle.
+
+    Quién la consume:
+    - Trabajos de importación en segundo plano (se exponen en /import/jobs/<id>).
+    """
+    if res.get("sin_cambios"):
+        return [
+            (
+                "info",
+                f"El archivo de {fuente} es idéntico al último importado ({res.get('importado', '')}): "
+                "no hay cambios. Marcá 'Forzar' para reimportarlo igual.",
+            )
+        ]
+    msgs = [
+        (
+            "info",
+            "Compras: {inserted_c} nuevas, {updated_c} actualizadas, {deleted_c} borradas, "
+            "{unchanged_c} sin cambios. Ventas: {inserted_v} nuevas, {updated_v} actualizadas, "
+            "{deleted_v} borradas, {unchanged_v} sin cambios.".format(**res),
+        )
+    ]
+    if res["rechazos"]:
+        msgs.append(("warning", f"Importación ({fuente}) completa con {res['rechazos']} filas rechazadas."))
+        if res["rechazos_path"]:
+            msgs.append(
+                ("info", f"Descargá el detalle: /uploads/{os.path.basename(res['rechazos_path'])}")
+            )
+    else:
+        msgs.append(("success", f"Importación desde {fuente} completa"))
+    return msgs
+
+
+def submit_import_job(fuente: str, path: str, force: bool = False, download_url: str | None = None):
+    """
+    Encola una importación en el pool de trabajos (import_jobs) y devuelve el ImportJob.
+
+    Qué hace (en el hilo del trabajo, con su propio app_context):
+    - Si hay download_url, descarga e importa con import_from_gsheet (fase 'download',
+      304 sin cambios y candado por Sheet compartido con la sincronización periódica).
+    - Si no, llama a do_import_excel_from_path informando fases/filas/rechazos al job.
+    - Guarda los mensajes de resultado; ante error hace rollback y el job queda en 'error'.
+
+    Quién la consume:
+    - import_xls e import_gsheet.
+    """
+
+    def _run(job):
+        with app.app_context():
+            try:
+                if download_url:
+                    res = import_from_gsheet(download_url, path, force=force, progress=job.progress)
+                else:
+                    res = do_import_excel_from_path(path, force=force, progress=job.progress)
+                job.messages = import_result_messages(res, fuente)
+                return res
+            except Exception:
+                db.session.rollback()
+                raise
+
+    return import_jobs.submit(fuente, _run)
+
+
+def import_from_gsheet(export_url: str, dest: str, force: bool = False, progress=None) -> dict:
+    """
+    Descarga (condicional) e importa un Google Sheet, bajo el candado de ese Sheet.
+
+    Qué hace:
+    - Toma SheetLock(export_url): si ya hay otra importación/sincronización del mismo
+      Sheet en curso (en este u otro proceso) lanza SheetBusy sin esperar.
+    - Descarga a `dest` con download_gsheet_xlsx; si el servidor responde 304 devuelve el
+      resultado previo (sin_cambios=True) sin bajar ni leer nada. Si en el medio se importó
+      otra cosa (no queda Importacion de esta URL), vuelve a bajar sin validadores.
+    - Importa con do_import_excel_from_path; si el contenido resultó idéntico borra la copia.
+
+    Devuelve:
+    - dict de resultado de do_import_excel_from_path.
+
+    Quién la consume:
+    - submit_import_job (import_gsheet) y sync_gsheet (sincronización periódica / CLI).
+    """
+    report = progress or (lambda *a, **k: None)
+    with SheetLock(app.config["UPLOAD_FOLDER"], export_url):
+        report("download")
+        origen = download_gsheet_xlsx(export_url, dest, force=force)
+        if origen.not_modified:
+            # 304: el Sheet no cambió desde la última importación, no se bajó nada
+            previa = last_import_from(export_url)
+            if previa is not None:
+                return previous_import_result(previa)
+            # otra importación (un upload) entró después de mandar los validadores:
+            # lo del Sheet ya no es lo último importado, se baja completo
+            origen = download_gsheet_xlsx(export_url, dest, force=True)
+        res = do_import_excel_from_path(dest, force=force, progress=progress, origen=origen)
+        if res.get("sin_cambios"):
+            # ya hay una copia idéntica en uploads/: no acumular descargas repetidas
+            os.remove(dest)
+        return res
+
+
+def record_sync_run(outcome) -> None:
+    """Guarda una corrida de sincronización (SyncOutcome) en sync_runs."""
+    db.session.add(
+        SyncRun(
+            sheet_id=outcome.sheet_id,
+            inicio=datetime.fromtimestamp(outcome.inicio),
+            duracion=outcome.duracion,
+            estado=outcome.estado,
+            detalle=outcome.detalle,
+        )
+    )
+    db.session.commit()
+
+
+def sync_gsheet(sheet_id: str, force: bool = False):
+    """
+    Sincroniza un Sheet (ID o URL) y registra la corrida en sync_runs.
+
+    Devuelve:
+    - SyncOutcome con estado ok / sin_cambios / ocupado / error y duración en segundos.
+
+    Quién la consume:
+    - SyncScheduler (hilo periódico) y el comando `flask sync-gsheets`.
+    """
+    with app.app_context():
+
+        def _sync(_sid):
+            export_url = _normalize_gsheet_export_url(sheet_id)
+            ts = time.strftime("%Y%m%d_%H%M%S")
+            dest = os.path.join(app.config["UPLOAD_FOLDER"], f"gsheet_{ts}.xlsx")
+            try:
+                return import_from_gsheet(export_url, dest, force=force)
+            except Exception:
+                db.session.rollback()
+                raise
+
+        # el candado lo toma import_from_gsheet; run_sync mide y registra
+        return run_sync(sheet_id, _sync, record=record_sync_run)
+
+
+def start_gsheet_scheduler(minutes: float | None = None) -> SyncScheduler:
+    """Arranca el hilo de sincronización periódica de GSHEET_SYNC_IDS cada `minutes`."""
+    minutes = minutes or app.config["GSHEET_SYNC_MINUTES"]
+    return SyncScheduler(app.config["GSHEET_SYNC_IDS"], minutes * 60, sync_gsheet).start()
+
+
+def _dry_run_response(file, filename: str):
+    """Valida un archivo subido con dry_run_import: JSON si se pidió, si no la plantilla."""
+    ts = time.strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(app.config["UPLOAD_FOLDER"], f"dryrun_{ts}_{filename}")
+    file.save(path)
+    try:
+        report = dry_run_import(path, nombre=filename)
+    except Exception as e:
+        if request.accept_mimetypes.best == "application/json":
+            return jsonify({"error": str(e)}), 400
+        flash(f"Error validando el archivo: {e}", "danger")
+        return redirect(url_for("import_xls"))
+    finally:
+        os.remove(path)
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(report)
+    return render_template(
+        "import_xls.html", default_gsheet_id=app.config["DEFAULT_GSHEET_ID"], job=None, dry=report
+    )
+
+
+def _job_response(job):
+    """Respuesta de un POST de importación: JSON (202) si se pidió, si no redirect a la UI."""
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"job_id": job.id, "status_url": url_for("import_job_status", job_id=job.id)}), 202
+    return redirect(url_for("import_xls", job=job.id))
+
+
+@app.route("/import/jobs/<job_id>")
+def import_job_status(job_id):
+    """
+    Estado de un trabajo de importación en JSON: fase (download/parse/delete/insert/done/error),
+    filas procesadas, rechazos, segundos transcurridos, resultado y mensajes.
+
+    Quién la consume:
+    - import_xls.html (polling mientras corre la importación).
+    """
+    job = import_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(job.to_dict())
 
 
 @app.route("/import/xls", methods=["GET", "POST"])
@@ -1822,14 +2064,19 @@ def import_xls():
     Ruta para subir e importar un XLSX via formulario web.
 
     Qué hace:
-    - Si POST: guarda archivo en uploads/, llama a do_import_excel_from_path y muestra mensajes (flash).
-    - Si GET: renderiza plantilla con formulario de subida.
+    - Si POST: guarda archivo en uploads/ y encola la importación en segundo plano
+      (submit_import_job); redirige a ?job=<id> (o devuelve {"job_id"} si se pide JSON).
+      Si el archivo es idéntico al último importado no se reimporta, salvo force=1.
+    - Si POST con dry_run=1: valida el archivo sin escribir nada (dry_run_import) y muestra
+      qué YMs se tocarían, altas/cambios/bajas y rechazos; el archivo no se conserva.
+    - Si GET: renderiza plantilla con formulario de subida y, con ?job=<id>, el progreso.
 
     Requiere:
-    - pandas + openpyxl instalados para procesar XLSX.
+    - pandas + openpyxl instalados para procesar XLSX (pyarrow para Parquet dentro de un .zip).
 
     Quién la consume:
-    - Usuario final (admin) que sube el archivo Excel con FactCompras / FactVentas.
+    - Usuario final (admin) que sube el archivo Excel con FactCompras / FactVentas, o un
+      .zip con FactCompras.csv, FactVentas.csv, ... (feeds generados por sistemas).
     """
     if request.method == "POST":
         if pd is None:
@@ -1837,40 +2084,24 @@ def import_xls():
             return redirect(url_for("import_xls"))
         file = request.files.get("file")
         if not file:
-            flash("Subí un archivo .xlsx/.xlsm", "warning")
+            flash("Subí un archivo .xlsx/.xlsm o un .zip de CSV", "warning")
             return redirect(url_for("import_xls"))
         ext = os.path.splitext(file.filename)[1].lower()
         if ext not in ALLOWED_XL:
             flash("Formato no soportado", "warning")
             return redirect(url_for("import_xls"))
         filename = secure_filename(file.filename)
+        if request.form.get("dry_run") == "1":
+            return _dry_run_response(file, filename)
         path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
         file.save(path)
-        try:
-            res = do_import_excel_from_path(path)
-            if res["deleted_c"] or res["deleted_v"]:
-                flash(
-                    f"Limpieza previa: Compras {res['deleted_c']}, Ventas {res['deleted_v']}",
-                    "info",
-                )
-            if res["rechazos"]:
-                flash(
-                    f"Importación completa con {res['rechazos']} filas rechazadas.",
-                    "warning",
-                )
-                if res["rechazos_path"]:
-                    flash(
-                        f"Descargá el detalle: /uploads/{os.path.basename(res['rechazos_path'])}",
-                        "info",
-                    )
-            else:
-                flash("Importación desde Excel completa", "success")
-        except Exception as e:
-            db.session.rollback()
-            flash(f"Error importando Excel: {e}", "danger")
-        return redirect(url_for("import_xls"))
+        job = submit_import_job("Excel", path, force=request.form.get("force") == "1")
+        return _job_response(job)
+    job = import_jobs.get(request.args.get("job", ""))
     return render_template(
-        "import_xls.html", default_gsheet_id=app.config["DEFAULT_GSHEET_ID"]
+        "import_xls.html",
+        default_gsheet_id=app.config["DEFAULT_GSHEET_ID"],
+        job=job.to_dict() if job else None,
     )
 
 
@@ -1917,8 +2148,12 @@ def import_gsheet():
     Descarga un Google Sheet (XLSX) y lo importa reusando do_import_excel_from_path.
 
     Qué hace:
-    - Normaliza la URL/ID, descarga el XLSX con requests, lo guarda en uploads/ y llama a do_import_excel_from_path.
-    - Maneja y muestra errores vía flash.
+    - Normaliza la URL/ID y encola un trabajo que descarga el XLSX a uploads/ y llama a
+      do_import_excel_from_path (submit_import_job); responde enseguida con el id del trabajo.
+    - La descarga es condicional (ETag/Last-Modified de la última importación de esa URL):
+      si el Sheet no cambió no se baja nada; con force=1 se descarga e importa igual.
+    - Si el XLSX descargado es idéntico al último importado, lo descarta sin reimportar (salvo force=1).
+    - Errores de URL se muestran vía flash; los de descarga/importación en el estado del trabajo.
 
     Quién la consume:
     - Formulario de importación que permite pasar una URL o ID de Google Sheets.
@@ -1939,37 +2174,38 @@ def import_gsheet():
         return redirect(url_for("import_xls"))
     ts = time.strftime("%Y%m%d_%H%M%S")
     dest = os.path.join(app.config["UPLOAD_FOLDER"], f"gsheet_{ts}.xlsx")
+    job = submit_import_job(
+        "Google Sheets", dest, force=request.form.get("force") == "1", download_url=export_url
+    )
+    return _job_response(job)
+
+
+def download_gsheet_xlsx(export_url: str, dest: str, force: bool = False):
+    """
+    Descarga el XLSX exportado de Google Sheets a `dest` (streaming, sesión compartida
+    con reintentos y tope GSHEET_MAX_BYTES; ver app/services/gsheet.py).
+
+    Qué hace:
+    - Si la última importación vino de esta misma URL y no se pidió `force`, manda sus
+      validadores (ETag / Last-Modified) para que un Sheet sin cambios responda 304.
+
+    Devuelve:
+    - DownloadResult; not_modified=True si no se bajó nada.
+
+    Quién la consume:
+    - submit_import_job (fase 'download' de las importaciones desde Google Sheets).
+    """
+    previa = None if force else last_import_from(export_url)
     try:
-        r = requests.get(export_url, timeout=60)
-        r.raise_for_status()
-        with open(dest, "wb") as f:
-            f.write(r.content)
-    except Exception as e:
-        flash(f"No pude descargar el XLSX desde Google Sheets: {e}", "danger")
-        return redirect(url_for("import_xls"))
-    try:
-        res = do_import_excel_from_path(dest)
-        if res["deleted_c"] or res["deleted_v"]:
-            flash(
-                f"Limpieza previa: Compras {res['deleted_c']}, Ventas {res['deleted_v']}",
-                "info",
-            )
-        if res["rechazos"]:
-            flash(
-                f"Importación (Google Sheets) completa con {res['rechazos']} filas rechazadas.",
-                "warning",
-            )
-            if res["rechazos_path"]:
-                flash(
-                    f"Descargá el detalle: /uploads/{os.path.basename(res['rechazos_path'])}",
-                    "info",
-                )
-        else:
-            flash("Importación desde Google Sheets completa", "success")
-    except Exception as e:
-        db.session.rollback()
-        flash(f"Error importando el XLSX descargado: {e}", "danger")
-    return redirect(url_for("import_xls"))
+        return download_to_file(
+            export_url,
+            dest,
+            etag=previa.etag if previa is not None else None,
+            last_modified=previa.last_modified if previa is not None else None,
+            max_bytes=app.config["GSHEET_MAX_BYTES"],
+        )
+    except DownloadError as e:
+        raise RuntimeError(f"No pude descargar el XLSX desde Google Sheets: {e}")
 
 
 @app.route("/uploads/<path:filename>")
@@ -1986,6 +2222,8 @@ def download_upload(filename):
 def backup_db(prefix: str = "backup") -> str:
     """
     Crea una copia del archivo SQLite DB en BACKUPS_FOLDER con prefijo y timestamp.
+    Usa la API de backup de SQLite: en modo WAL lo último confirmado puede estar todavía
+    en app.db-wal y una copia del archivo solo lo perdería.
 
     Parámetros:
     - prefix: etiqueta para el backup (ej: 'clean').
@@ -1994,12 +2232,17 @@ def backup_db(prefix: str = "backup") -> str:
     - ruta al fichero de backup o cadena vacía si falla.
 
     Quién la consume:
-    - import_clean y otros lugares donde se necesite snapshot previo a cambios destructivos.
+    - import_clean, reset_db.py y otros lugares donde se necesite snapshot previo a cambios destructivos.
     """
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     dst = os.path.join(BACKUPS_FOLDER, f"{prefix}_{ts}.db")
     try:
-        shutil.copy2(DB_PATH, dst)
+        origen, destino = sqlite3.connect(DB_PATH), sqlite3.connect(dst)
+        try:
+            origen.backup(destino)
+        finally:
+            origen.close()
+            destino.close()
         return dst
     except Exception:
         return ""
@@ -2032,6 +2275,7 @@ def socios_view():
             else:
                 s = Socio(nombre=nombre, tipo=tipo, margen_porcentaje=margen)
                 db.session.add(s)
+                bump_catalogo()
                 db.session.commit()
                 flash("Socio creado", "success")
         return redirect(url_for("socios_view"))
@@ -2046,48 +2290,119 @@ def socios_view():
     return render_template("socios_list.html", socios=socios, p_emp=p_emp, p_soc=p_soc)
 
 
+# ------------------- LISTADOS (paginación) -------------------
+
+
+def keyset_page(query, sort_col, id_col, desc, orden, after=None, before=None, size=None):
+    """
+    Una página de `query` ordenada por (sort_col, id_col) paginando por cursor (keyset).
+
+    Qué hace:
+    - Decodifica el cursor (?after= o ?before=) y filtra las filas posteriores/anteriores a
+      esa clave en vez de usar OFFSET: con los índices (ym, columna) de LIST_INDEXES cada
+      página cuesta lo mismo en la primera que en la última.
+    - SQLite ordena los NULL como el menor valor; cuando la página cruza el límite entre
+      NULL y no NULL se lee en dos tramos (cada uno por rango de índice) y se concatenan.
+    - ?before= recorre en orden inverso y después invierte la página.
+
+    Parámetros:
+    - query: query del modelo con los filtros ya aplicados (sin ORDER BY).
+    - sort_col / id_col: columna (o expresión sin label) de orden y desempate.
+    - desc: orden descendente; orden: nombre del orden (queda dentro del cursor).
+    - size: filas por página (default: app.config["LIST_PAGE_SIZE"]).
+
+    Devuelve:
+    - Pagina (app.services.paginacion) con los objetos del modelo y los cursores.
+
+    Quién la consume:
+    - compras_list / ventas_list (vista HTML).
+    """
+    size = max(int(size or app.config["LIST_PAGE_SIZE"]), 1)
+    hacia_atras = before is not None and after is None
+    cursor = decode_cursor(before if hacia_atras else after, orden)
+    walk_desc = desc != hacia_atras
+    order = (sort_col.desc(), id_col.desc()) if walk_desc else (sort_col.asc(), id_col.asc())
+    # (col, id) < (:valor, :id) como row value; la cota col <= :valor repetida aparte es la
+    # que SQLite usa como rango cuando la columna es una expresión (total con IVA)
+    sigue = (lambda a, b: a < b) if walk_desc else (lambda a, b: a > b)
+    hasta = (lambda a, b: a <= b) if walk_desc else (lambda a, b: a >= b)
+
+    if cursor is None:
+        tramos = [true()]
+    else:
+        valor, row_id = cursor
+        if valor is None:
+            nulos = and_(sort_col.is_(None), sigue(id_col, row_id))
+            tramos = [nulos] if walk_desc else [nulos, sort_col.isnot(None)]
+        else:
+            valores = and_(hasta(sort_col, valor), sigue(tuple_(sort_col, id_col), tuple_(valor, row_id)))
+            tramos = [valores, sort_col.is_(None)] if walk_desc else [valores]
+
+    filas = []
+    base = query.add_columns(sort_col.label("sort_key"))
+    for cond in tramos:
+        filas += base.filter(cond).order_by(*order).limit(size + 1 - len(filas)).all()
+        if len(filas) > size:
+            break
+    pagina = armar_pagina(
+        filas, size, lambda r: (r.sort_key, r[0].id), orden, con_cursor=cursor is not None, hacia_atras=hacia_atras
+    )
+    pagina.items = [r[0] for r in pagina.items]
+    return pagina
+
+
+def list_totals(operacion, periodo, socio_name="", estado=""):
+    """
+    (filas, total con IVA en centavos) del listado para el filtro actual, leídos del rollup
+    ResumenMensual en vez de recorrer el periodo completo.
+
+    Quién la consume:
+    - compras_list / ventas_list (encabezado con el total del filtro).
+    """
+    R = ResumenMensual
+    q = rollup_query(periodo, operacion).with_entities(
+        func.coalesce(func.sum(R.filas), 0), func.coalesce(func.sum(R.total_con_iva), 0)
+    )
+    if socio_name:
+        q = q.join(Socio, R.socio_id == Socio.id).filter(Socio.nombre == socio_name)
+    if estado:
+        q = q.filter(R.estado == estado)
+    filas, total = q.one()
+    return int(filas or 0), int(total or 0)
+
+
 @app.route("/compras")
 def compras_list():
     """
     Lista de compras con filtros year/month y filtro por socio (nombre).
 
     Qué hace:
-    - Construye compras_query según filtros year/month.
+    - Construye compras_query según el periodo (request_periodo / periodo_condition).
     - Aplica filtro por nombre de socio (si viene).
     - Soporta export (export=csv|xlsx) devolviendo filas con total_con_iva calculado (fallback).
-    - Renderiza plantilla 'compras_list.html' con variables: compras, year, month, current_year, socios, selected_socio.
+    - Pagina por cursor (keyset_page) en el orden elegido; el total y la cantidad de filas del
+      filtro salen del rollup (list_totals).
+    - Renderiza plantilla 'compras_list.html' con variables: compras, pagina, total_filas, year, month, current_year, socios, selected_socio.
 
     Parámetros:
-    - year, month, socio, export
+    - year, month (1-12, 13 = Todos, 'T1'..'T4'), desde / hasta, socio, estado, sort_by, sort_dir, export
+    - after / before: cursor de la página siguiente / anterior
 
     Quién la consume:
     - Usuario en la UI (listado, export).
     """
     today = date.today()
-    year = int(request.args.get("year", today.year))
-
-    month_arg = request.args.get("month", None)
-    month = int(month_arg) if month_arg is not None else 13
+    periodo, year, month = request_periodo()
+    ym = periodo.clave
 
     # nuevo filtro: socio (nombre)
     socio_name = (request.args.get("socio") or "").strip()
     estado_filtro = (request.args.get("estado") or "").strip()
     # lista de socios para el select en la plantilla
-    socios = [n for (_id, n) in db.session.query(Socio.id, Socio.nombre).order_by(Socio.nombre).all()]
-
-    # Construir compras_query según year/month (misma lógica que index/ventas/compras)
-    if year == 1313 and month == 13:
-        compras_query = db.session.query(Compra)
-        ym = "all"
-    elif month == 13:
-        compras_query = db.session.query(Compra).filter(Compra.ym.like(f"{year}-%"))
-        ym = f"{year}-*"
-    elif year == 1313:
-        compras_query = db.session.query(Compra).filter(Compra.id == -1)
-        ym = "none"
-    else:
-        ym = f"{year:04d}-{month:02d}"
-        compras_query = db.session.query(Compra).filter(Compra.ym == ym)
+    socios = [n for (_id, n) in CATALOGO.obtener("socios")]
+
+    # compras del periodo: rango de fecha (o ym exacto para un mes), ver periodo_condition
+    compras_query = db.session.query(Compra).filter(periodo_condition(Compra, periodo))
 
     # aplicar filtro por nombre_socio si se pidió
     if socio_name:
@@ -2098,52 +2413,45 @@ def compras_list():
     if estado_filtro:
         compras_query = compras_query.filter(Compra.estado == estado_filtro)
 
-    # Lógica de ordenamiento
+    # Lógica de ordenamiento (columna + id como desempate: es también la clave del cursor)
     sort_by = request.args.get("sort_by", "fecha")
-    sort_dir = request.args.get("sort_dir", "desc")
+    sort_dir = "asc" if request.args.get("sort_dir") == "asc" else "desc"
 
     sortable_columns = {
         "transaccion_id": Compra.transaccion_id,
         "fecha": Compra.fecha,
         "proveedor": Compra.proveedor,
         "pesos_sin_iva": Compra.pesos_sin_iva,
-        "total_con_iva": total_con_iva_expr(Compra),
+        "total_con_iva": total_con_iva_expr(Compra).element,
         "estado": Compra.estado,
     }
     
     sort_column = sortable_columns.get(sort_by)
-    if sort_column is not None:
-        # Aplica .asc() o .desc() dinámicamente
-        compras_query = compras_query.order_by(getattr(sort_column, sort_dir)())
-    else:
-        compras_query = compras_query.order_by(Compra.fecha.desc())
-        sort_by, sort_dir = "fecha", "desc"
-
-    # Calcular el total con IVA para el período filtrado
-    total_compras_con_iva = float(
-        compras_query.with_entities(
-            func.coalesce(func.sum(total_con_iva_expr(Compra)), 0.0)
-        ).scalar()
-        or 0.0
-    )
+    if sort_column is None:
+        sort_column, sort_by, sort_dir = Compra.fecha, "fecha", "desc"
+    desc = sort_dir == "desc"
+
+    # Total con IVA y cantidad de filas del filtro actual (rollup, independiente de la página)
+    total_filas, total_compras_con_iva = list_totals("COMPRA", periodo, socio_name, estado_filtro)
 
     export_fmt = (request.args.get("export") or "").lower()
 
     if export_fmt:
         # preparar filas para export (lista de dicts)
         rows = []
-        compras_iter = compras_query.all()
-        socios_map = {sid: nom for sid, nom in db.session.query(Socio.id, Socio.nombre).all()}
+        order = (sort_column.desc(), Compra.id.desc()) if desc else (sort_column.asc(), Compra.id.asc())
+        compras_iter = compras_query.order_by(*order).all()
+        socios_map = dict(CATALOGO.obtener("socios"))
         for c in compras_iter:
             rows.append(
                 {
                     "fecha": c.fecha.strftime("%Y-%m-%d") if c.fecha else "",
                     "proveedor": c.proveedor or "",
                     "socio": socios_map.get(c.socio_id, ""),
-                    "pesos_sin_iva": round(float(c.pesos_sin_iva or 0.0), 2),
-                    "iva_21": round(float(c.iva_21 or 0.0), 2),
-                    "iva_105": round(float(c.iva_105 or 0.0), 2),
-                    "total_con_iva": round(float(c.total_con_iva or ((c.pesos_sin_iva or 0.0) + (c.iva_21 or 0.0) + (c.iva_105 or 0.0))), 2),
+                    "pesos_sin_iva": pesos(c.pesos_sin_iva),
+                    "iva_21": pesos(c.iva_21),
+                    "iva_105": pesos(c.iva_105),
+                    "total_con_iva": pesos(c.total_con_iva or ((c.pesos_sin_iva or 0) + (c.iva_21 or 0) + (c.iva_105 or 0))),
                     "estado": c.estado or "",
                     "descripcion": c.descripcion or "",
                     "nro_factura": c.nro_factura or "",
@@ -2177,7 +2485,16 @@ def compras_list():
             )
 
     # vista HTML normal: pasar year/month al template para que los selects funcionen
-    compras = compras_query.limit(300).all()
+    pagina = keyset_page(
+        compras_query,
+        sort_column,
+        Compra.id,
+        desc,
+        f"{sort_by}:{sort_dir}",
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+    )
+    compras = pagina.items
     # Añadir color_index para el coloreado de transacciones
     for c in compras:
         if c.transaccion_id:
@@ -2187,7 +2504,10 @@ def compras_list():
     return render_template(
         "compras_list.html",
         compras=compras,
+        periodo=periodo,
         total_compras_con_iva=total_compras_con_iva,
+        total_filas=total_filas,
+        pagina=pagina,
         year=year,
         month=month,
         current_year=today.year,
@@ -2218,42 +2538,32 @@ def ventas_list():
     y soporte de export (export='csv' | 'xlsx').
 
     Qué hace:
-    - Construye ventas_query según filtros year/month.
+    - Construye ventas_query según el periodo (request_periodo / periodo_condition).
     - Aplica filtro por nombre de socio (si viene).
     - Soporta export (export=csv|xlsx) devolviendo filas con total_con_iva calculado (fallback).
-    - Renderiza plantilla 'ventas_list.html' con variables: ventas, year, month, current_year, socios, selected_socio.
+    - Pagina por cursor (keyset_page) en el orden elegido; el total y la cantidad de filas del
+      filtro salen del rollup (list_totals).
+    - Renderiza plantilla 'ventas_list.html' con variables: ventas, pagina, total_filas, year, month, current_year, socios, selected_socio.
 
     Parámetros:
-    - year, month, socio, export
+    - year, month (1-12, 13 = Todos, 'T1'..'T4'), desde / hasta, socio, estado, sort_by, sort_dir, export
+    - after / before: cursor de la página siguiente / anterior
 
     Quién la consume:
     - Usuario en la UI (listado, export).
     """
     today = date.today()
-    year = int(request.args.get("year", today.year))
-
-    month_arg = request.args.get("month", None)
-    month = int(month_arg) if month_arg is not None else 13
+    periodo, year, month = request_periodo()
+    ym = periodo.clave
 
     # nuevo filtro: socio (nombre)
     socio_name = (request.args.get("socio") or "").strip()
     estado_filtro = (request.args.get("estado") or "").strip()
     # lista de socios para el select en la plantilla
-    socios = [n for (_id, n) in db.session.query(Socio.id, Socio.nombre).order_by(Socio.nombre).all()]
-
-    # Construir ventas_query según year/month (misma lógica que index)
-    if year == 1313 and month == 13:
-        ventas_query = db.session.query(Venta)
-        ym = "all"
-    elif month == 13:
-        ventas_query = db.session.query(Venta).filter(Venta.ym.like(f"{year}-%"))
-        ym = f"{year}-*"
-    elif year == 1313:
-        ventas_query = db.session.query(Venta).filter(Venta.id == -1)
-        ym = "none"
-    else:
-        ym = f"{year:04d}-{month:02d}"
-        ventas_query = db.session.query(Venta).filter(Venta.ym == ym)
+    socios = [n for (_id, n) in CATALOGO.obtener("socios")]
+
+    # ventas del periodo: rango de fecha (o ym exacto para un mes), ver periodo_condition
+    ventas_query = db.session.query(Venta).filter(periodo_condition(Venta, periodo))
 
     # aplicar filtro por nombre_socio si se pidió
     if socio_name:
@@ -2263,52 +2573,45 @@ def ventas_list():
     if estado_filtro:
         ventas_query = ventas_query.filter(Venta.estado == estado_filtro)
 
-    # Lógica de ordenamiento
+    # Lógica de ordenamiento (columna + id como desempate: es también la clave del cursor)
     sort_by = request.args.get("sort_by", "fecha")
-    sort_dir = request.args.get("sort_dir", "desc")
+    sort_dir = "asc" if request.args.get("sort_dir") == "asc" else "desc"
 
     sortable_columns = {
         "transaccion_id": Venta.transaccion_id,
         "fecha": Venta.fecha,
         "cliente": Venta.cliente,
         "pesos_sin_iva": Venta.pesos_sin_iva,
-        "total_con_iva": total_con_iva_expr(Venta),
+        "total_con_iva": total_con_iva_expr(Venta).element,
         "estado": Venta.estado,
     }
     
     sort_column = sortable_columns.get(sort_by)
-    if sort_column is not None:
-        # Aplica .asc() o .desc() dinámicamente
-        ventas_query = ventas_query.order_by(getattr(sort_column, sort_dir)())
-    else:
-        ventas_query = ventas_query.order_by(Venta.fecha.desc())
-        sort_by, sort_dir = "fecha", "desc"
-
-    # Calcular el total con IVA para el período filtrado
-    total_ventas_con_iva = float(
-        ventas_query.with_entities(
-            func.coalesce(func.sum(total_con_iva_expr(Venta)), 0.0)
-        ).scalar()
-        or 0.0
-    )
+    if sort_column is None:
+        sort_column, sort_by, sort_dir = Venta.fecha, "fecha", "desc"
+    desc = sort_dir == "desc"
+
+    # Total con IVA y cantidad de filas del filtro actual (rollup, independiente de la página)
+    total_filas, total_ventas_con_iva = list_totals("VENTA", periodo, socio_name, estado_filtro)
 
     export_fmt = (request.args.get("export") or "").lower()
 
     if export_fmt:
         # preparar filas para export (lista de dicts)
         rows = []
-        ventas_iter = ventas_query.all()
-        socios_map = {sid: nom for sid, nom in db.session.query(Socio.id, Socio.nombre).all()}
+        order = (sort_column.desc(), Venta.id.desc()) if desc else (sort_column.asc(), Venta.id.asc())
+        ventas_iter = ventas_query.order_by(*order).all()
+        socios_map = dict(CATALOGO.obtener("socios"))
         for v in ventas_iter:
             rows.append(
                 {
                     "fecha": v.fecha.strftime("%Y-%m-%d") if v.fecha else "",
                     "cliente": v.cliente or "",
                     "socio": socios_map.get(v.socio_id, ""),
-                    "pesos_sin_iva": round(float(v.pesos_sin_iva or 0.0), 2),
-                    "iva_21": round(float(v.iva_21 or 0.0), 2),
-                    "iva_105": round(float(v.iva_105 or 0.0), 2),
-                    "total_con_iva": round(float(v.total_con_iva or ((v.pesos_sin_iva or 0.0) + (v.iva_21 or 0.0) + (v.iva_105 or 0.0))), 2),
+                    "pesos_sin_iva": pesos(v.pesos_sin_iva),
+                    "iva_21": pesos(v.iva_21),
+                    "iva_105": pesos(v.iva_105),
+                    "total_con_iva": pesos(v.total_con_iva or ((v.pesos_sin_iva or 0) + (v.iva_21 or 0) + (v.iva_105 or 0))),
                     "estado": v.estado or "",
                     "descripcion": v.descripcion or "",
                     "nro_factura": v.nro_factura or "",
@@ -2343,7 +2646,16 @@ def ventas_list():
             )
 
     # vista HTML normal: pasar year/month al template para que los selects funcionen
-    ventas = ventas_query.limit(300).all()
+    pagina = keyset_page(
+        ventas_query,
+        sort_column,
+        Venta.id,
+        desc,
+        f"{sort_by}:{sort_dir}",
+        after=request.args.get("after"),
+        before=request.args.get("before"),
+    )
+    ventas = pagina.items
     # Añadir color_index para el coloreado de transacciones
     for v in ventas:
         if v.transaccion_id:
@@ -2353,7 +2665,10 @@ def ventas_list():
     return render_template(
         "ventas_list.html",
         ventas=ventas,
+        periodo=periodo,
         total_ventas_con_iva=total_ventas_con_iva,
+        total_filas=total_filas,
+        pagina=pagina,
         year=year,
         month=month,
         current_year=today.year,
@@ -2381,21 +2696,418 @@ def total_con_iva_expr(Model):
     - Model: la clase SQLAlchemy (Compra o Venta).
 
     Devuelve:
-    - SQLAlchemy ColumnElement etiquetado como 'TOTAL_CON_IVA' (útil en .with_entities).
+    - SQLAlchemy ColumnElement etiquetado como 'TOTAL_CON_IVA' (útil en .with_entities);
+      centavos enteros, como las columnas.
 
     Quién la consume:
     - Vistas que agrupan/suman total_con_iva (totales_arca, resumen_socio, etc.)
     """
+    # constante en línea (no parámetro) para que el SQL coincida con el índice por
+    # expresión de LIST_INDEXES
+    cero = literal_column("0")
     return func.coalesce(
-        func.nullif(getattr(Model, "total_con_iva"), 0),
+        func.nullif(getattr(Model, "total_con_iva"), cero),
         (
-            func.coalesce(getattr(Model, "pesos_sin_iva"), 0.0)
-            + func.coalesce(getattr(Model, "iva_21"), 0.0)
-            + func.coalesce(getattr(Model, "iva_105"), 0.0)
+            func.coalesce(getattr(Model, "pesos_sin_iva"), cero)
+            + func.coalesce(getattr(Model, "iva_21"), cero)
+            + func.coalesce(getattr(Model, "iva_105"), cero)
         ),
     ).label("TOTAL_CON_IVA")
 
 
+def _list_indexes(Model, tercero):
+    """
+    Índices de los listados /compras y /ventas: (ym, columna ordenable) por cada columna de
+    `sortable_columns`, incluido el total efectivo como índice por expresión. Así la
+    paginación por cursor (keyset_page) recorre el índice en orden sin ordenar el periodo.
+    """
+    t = Model.__tablename__
+    return [
+        db.Index(f"ix_{t}_ym_fecha", Model.ym, Model.fecha),
+        db.Index(f"ix_{t}_ym_{tercero}", Model.ym, getattr(Model, tercero)),
+        db.Index(f"ix_{t}_ym_pesos_sin_iva", Model.ym, Model.pesos_sin_iva),
+        db.Index(f"ix_{t}_ym_total", Model.ym, total_con_iva_expr(Model).element),
+        db.Index(f"ix_{t}_ym_estado", Model.ym, Model.estado),
+        db.Index(f"ix_{t}_ym_transaccion_id", Model.ym, Model.transaccion_id),
+    ]
+
+
+LIST_INDEXES = _list_indexes(Compra, "proveedor") + _list_indexes(Venta, "cliente")
+
+
+# ------------------- RESUMEN MENSUAL (rollup) -------------------
+
+
+def periodo_condition(Model, periodo):
+    """
+    Condición SQL del Periodo `periodo` (app.services.periodo) sobre Model.
+
+    - ResumenMensual: rango semiabierto sobre la clave entera yyyymm.
+    - Compra / Venta: rango semiabierto sobre fecha (indexada); si el periodo es un solo
+      mes se agrega además ym = 'YYYY-MM', que es equivalente y deja usar los índices
+      (ym, columna) de los listados (LIST_INDEXES).
+
+    Quién la consume:
+    - Todas las vistas con filtro de periodo (vía rollup_query, caja_ledger, arca_filters
+      y los listados de compras / ventas).
+    """
+    if periodo.vacio:
+        return false()
+    conds = []
+    if Model is ResumenMensual:
+        if periodo.desde is not None:
+            conds.append(Model.yyyymm >= periodo.desde)
+        if periodo.hasta is not None:
+            conds.append(Model.yyyymm < periodo.hasta)
+    else:
+        if periodo.fecha_desde is not None:
+            conds.append(Model.fecha >= periodo.fecha_desde)
+        if periodo.fecha_hasta is not None:
+            conds.append(Model.fecha < periodo.fecha_hasta)
+        if periodo.un_mes:
+            conds.append(Model.ym == periodo.un_mes)
+    return and_(*conds) if conds else true()
+
+
+def rollup_query(periodo, operacion=None):
+    """Query de ResumenMensual filtrada por Periodo (periodo_condition) y, si se pasa, por operación."""
+    q = db.session.query(ResumenMensual).filter(periodo_condition(ResumenMensual, periodo))
+    if operacion:
+        q = q.filter(ResumenMensual.operacion == operacion)
+    return q
+
+
+def dashboard_metrics(periodo) -> DashboardMetrics:
+    """
+    Métricas del dashboard para el Periodo `periodo` en una sola consulta agrupada sobre el rollup.
+
+    Qué hace:
+    - Agrupa ResumenMensual del periodo por (operacion, socio_id, personal, estado): unas pocas
+      filas aun para 'all' o un año entero.
+    - Lee los defaults de IVA deducible y pliega todo con fold_dashboard.
+
+    Quién la consume:
+    - index y dashboard_export (mismas cifras en la página y en el export).
+    """
+    R = ResumenMensual
+    rows = (
+        rollup_query(periodo)
+        .with_entities(
+            R.operacion,
+            R.socio_id,
+            R.personal,
+            R.estado,
+            func.sum(R.filas),
+            func.sum(R.pesos_sin_iva),
+            func.sum(R.iva_21 + R.iva_105),
+            func.sum(R.iva_pct),
+            func.sum(R.iva_sin_pct),
+        )
+        .group_by(R.operacion, R.socio_id, R.personal, R.estado)
+        .all()
+    )
+    p_norm = get_param("iva_deducible_normal_pct", 1.0)
+    p_pers_def = get_param("iva_deducible_personal_default_pct", 0.5)
+    return fold_dashboard(rows, p_norm, p_pers_def)
+
+
+def refresh_rollup(yms=None) -> None:
+    """
+    Recalcula ResumenMensual de los YMs `yms` (None = todos) desde compras y ventas.
+
+    Qué hace:
+    - Borra las filas del rollup de esos YMs y las vuelve a armar con un
+      INSERT ... SELECT ... GROUP BY por tabla, sin traer filas a Python.
+    - No hace commit: corre dentro de la transacción de quien la llama.
+
+    Quién la consume:
+    - do_import_excel_from_path (YMs del archivo) y ensure_rollup (todo, la primera vez).
+    """
+    if yms is not None:
+        yms = sorted(y for y in yms if y)
+        if not yms:
+            return
+    t = ResumenMensual.__table__
+    borrar = t.delete()
+    if yms is not None:
+        borrar = borrar.where(t.c.ym.in_(yms))
+    db.session.execute(borrar)
+    cols = [
+        "ym", "yyyymm", "operacion", "socio_id", "tipo", "caja", "estado", "personal", "filas",
+        "pesos_sin_iva", "iva_21", "iva_105", "total_con_iva", "iva_pct", "iva_sin_pct", "gasto_real",
+    ]
+    for Model, operacion, caja in ((Compra, "COMPRA", Compra.origen), (Venta, "VENTA", Venta.destino)):
+        iva = func.coalesce(Model.iva_21, 0) + func.coalesce(Model.iva_105, 0)
+        if Model is Compra:
+            personal = func.coalesce(Compra.personal, False)
+            pct = Compra.iva_deducible_pct
+            iva_pct = func.sum(case((pct.is_not(None), iva * func.min(func.max(pct, 0.0), 1.0)), else_=0.0))
+            iva_sin_pct = func.sum(case((pct.is_(None), iva), else_=0))
+            gasto = func.sum(func.coalesce(Compra.pesos_sin_iva, 0) + iva * (1 - func.coalesce(pct, 1.0)))
+        else:
+            personal = literal(False)
+            iva_pct = gasto = literal(0.0)
+            iva_sin_pct = literal(0)
+        clave = cast(func.replace(Model.ym, "-", ""), db.Integer)
+        dims = [Model.ym, clave, literal(operacion), Model.socio_id, Model.tipo, caja, Model.estado, personal]
+        sel = select(
+            *dims,
+            func.count(),
+            func.sum(func.coalesce(Model.pesos_sin_iva, 0)),
+            func.sum(func.coalesce(Model.iva_21, 0)),
+            func.sum(func.coalesce(Model.iva_105, 0)),
+            func.sum(total_con_iva_expr(Model).element),
+            iva_pct,
+            iva_sin_pct,
+            gasto,
+        ).group_by(Model.ym, Model.socio_id, Model.tipo, caja, Model.estado, personal)
+        if yms is not None:
+            sel = sel.where(Model.ym.in_(yms))
+        db.session.execute(t.insert().from_select(cols, sel))
+
+
+def ensure_rollup():
+    """
+    Arma ResumenMensual completo si está vacío y ya hay compras/ventas (bases previas al
+    rollup), o si tiene filas sin la clave yyyymm (bases previas a los periodos por rango).
+    """
+    R = ResumenMensual
+    if db.session.query(R.id).first() is not None and db.session.query(R.id).filter(R.yyyymm.is_(None)).first() is None:
+        return
+    if db.session.query(Compra.id).first() is None and db.session.query(Venta.id).first() is None:
+        return
+    refresh_rollup()
+    bump_catalogo()
+    db.session.commit()
+
+
+# ------------------- CATÁLOGO DE FILTROS -------------------
+# Opciones de los desplegables (transacciones de /resumen-caja, YMs, socios de los listados):
+# se cargan una vez por versión de CatalogoVersion en vez de un DISTINCT por request.
+
+
+def catalogo_version():
+    """Versión vigente del catálogo (None si la base todavía no tiene la fila)."""
+    return db.session.query(CatalogoVersion.version).filter(CatalogoVersion.id == 1).scalar()
+
+
+def bump_catalogo() -> None:
+    """
+    Sube la versión del catálogo dentro de la transacción en curso (no hace commit): queda
+    confirmada con los cambios que la motivan y un rollback la descarta junto con ellos.
+
+    Quién la consume:
+    - do_import_excel_from_path, ensure_rollup y el alta de socios (socios_view).
+    """
+    db.session.execute(
+        update(CatalogoVersion).where(CatalogoVersion.id == 1).values(version=CatalogoVersion.version + 1)
+    )
+
+
+def _cargar_transacciones():
+    """transaccion_id distintos de compras y ventas, ordenados."""
+    tids = union_all(
+        select(Compra.transaccion_id).where(Compra.transaccion_id.is_not(None)),
+        select(Venta.transaccion_id).where(Venta.transaccion_id.is_not(None)),
+    ).subquery()
+    q = select(tids.c.transaccion_id).distinct().order_by(tids.c.transaccion_id)
+    return tuple(t for (t,) in db.session.execute(q) if t)
+
+
+CATALOGO = Catalogo(catalogo_version)
+CATALOGO.registrar("transacciones", _cargar_transacciones)
+# YMs con datos, ascendentes (del rollup mensual)
+CATALOGO.registrar(
+    "yms",
+    lambda: tuple(ym for (ym,) in db.session.query(ResumenMensual.ym).distinct().order_by(ResumenMensual.ym) if ym),
+)
+# (id, nombre) de los socios, por nombre
+CATALOGO.registrar(
+    "socios", lambda: tuple((sid, nombre) for sid, nombre in db.session.query(Socio.id, Socio.nombre).order_by(Socio.nombre))
+)
+
+
+# ------------------- MIGRACIONES -------------------
+# Cambios de esquema: una migración nueva con la versión siguiente (archivo NNNN_nombre.sql en
+# db/migrations o función acá), nunca editar una ya aplicada. Una base nueva sale completa de la
+# migración 1 (create_all con los modelos actuales): las posteriores tienen que tolerarlo
+# (IF NOT EXISTS, agregar_columnas).
+MIGRATIONS_DIR = os.path.join(BASE_DIR, "db", "migrations")
+
+
+def _migracion_esquema_base(conn):
+    """
+    1: tablas de los modelos, columnas agregadas después (SCHEMA_COLUMNS) e índices únicos
+    de row_key (lo que hacía ensure_schema en cada arranque).
+
+    Al crear el índice único de row_key se vacían las huellas previas (se calculaban con
+    otra clave): la próxima importación de cada YM las reescribe.
+    """
+    db.metadata.create_all(conn)
+    agregar_columnas(conn, SCHEMA_COLUMNS)
+    for table, (name, col) in SCHEMA_UNIQUE_INDEXES.items():
+        existe = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :n"), {"n": name}).first()
+        if existe is None:
+            conn.execute(text(f"UPDATE {table} SET {col} = NULL, row_hash = NULL"))
+            conn.execute(text(f"CREATE UNIQUE INDEX {name} ON {table} ({col})"))
+
+
+def _migracion_indices_modelos(conn):
+    """2: índices de los modelos que falten en bases viejas (fecha, yyyymm y los (ym, columna) de LIST_INDEXES)."""
+    for table in db.metadata.sorted_tables:
+        for ix in table.indexes:
+            conn.execute(CreateIndex(ix, if_not_exists=True))
+
+
+def _migracion_montos_centavos(conn):
+    """
+    4: montos de compras / ventas en centavos enteros (INTEGER en vez de FLOAT). SQLite no
+    cambia tipos con ALTER TABLE: las tablas se recrean copiando las filas con el mismo
+    redondeo que la importación (importer.to_amounts). El rollup se vacía y ensure_rollup lo
+    vuelve a armar en centavos.
+    """
+    for Model in (Compra, Venta):
+        reconstruir_tabla(
+            conn,
+            Model.__table__,
+            {
+                col: f"CAST(ROUND(ROUND({col} * 100, 6)) AS INTEGER)"
+                for col in ("pesos_sin_iva", "iva_21", "iva_105", "total_con_iva")
+            },
+        )
+    ResumenMensual.__table__.drop(conn)
+    ResumenMensual.__table__.create(conn)
+
+
+MIGRACIONES = sorted(
+    [
+        Migracion(1, "esquema_base", _migracion_esquema_base),
+        Migracion(2, "indices_modelos", _migracion_indices_modelos),
+        Migracion(4, "montos_centavos", _migracion_montos_centavos),
+    ]
+    + migraciones_sql(MIGRATIONS_DIR),
+    key=lambda m: m.version,
+)
+
+
+def migrate_db() -> list:
+    """
+    Aplica las migraciones pendientes de MIGRACIONES (app.services.migraciones.migrar) y
+    devuelve las aplicadas; quedan registradas en la tabla schema_migrations.
+
+    Quién la consume:
+    - Arranque de la app (si AUTO_MIGRATE) y el comando `flask --app main db-migrate`.
+    """
+    return migrar(db.engine, MIGRACIONES)
+
+
+# no en los procesos 'spawn' del pool de importación (re-importan el script como __mp_main__)
+if app.config["AUTO_MIGRATE"] and __name__ != "__mp_main__":
+    with app.app_context():
+        migrate_db()
+        ensure_rollup()
+
+
+@app.route("/import/sync-runs")
+def sync_runs():
+    """
+    Últimas corridas de la sincronización periódica de Google Sheets en JSON
+    (sheet, inicio, duración en segundos, estado y detalle del error si lo hubo).
+
+    Quién la consume:
+    - Monitoreo / chequeo manual de que la sincronización está al día.
+    """
+    limit = min(int(request.args.get("limit", 50) or 50), 500)
+    runs = db.session.query(SyncRun).order_by(SyncRun.id.desc()).limit(limit).all()
+    return jsonify(
+        [
+            {
+                "sheet_id": r.sheet_id,
+                "inicio": r.inicio.strftime("%Y-%m-%d %H:%M:%S") if r.inicio else None,
+                "duracion": r.duracion,
+                "estado": r.estado,
+                "detalle": r.detalle,
+            }
+            for r in runs
+        ]
+    )
+
+
+@app.cli.command("db-migrate")
+@click.option("--status", is_flag=True, help="Sólo lista las migraciones aplicadas y pendientes.")
+def db_migrate_command(status):
+    """Aplica las migraciones pendientes del esquema: `flask --app main db-migrate [--status]`."""
+    if not status:
+        for m in migrate_db():
+            click.echo(f"Aplicada {m.version:04d} {m.nombre}")
+        ensure_rollup()
+    hechas = versiones_aplicadas(db.engine)
+    for m in MIGRACIONES:
+        estado = f"aplicada {hechas[m.version][1]}" if m.version in hechas else "pendiente"
+        click.echo(f"{m.version:04d} {m.nombre}: {estado}")
+
+
+@app.cli.command("import-dry-run")
+@click.argument("path", type=click.Path(exists=True))
+@click.option("--json", "as_json", is_flag=True, help="Reporte completo en JSON.")
+@click.option("--strict", is_flag=True, help="Sale con código 1 si hay rechazos o TIPO desconocidos.")
+def import_dry_run_command(path, as_json, strict):
+    """Valida un libro (XLSX, .zip o directorio) sin escribir: `flask --app main import-dry-run PATH`."""
+    res = dry_run_import(path)
+    if as_json:
+        click.echo(json.dumps(res, ensure_ascii=False, indent=1, default=str))
+    else:
+        if res["identico"]:
+            click.echo("El archivo es idéntico al último importado.")
+        for sheet, h in res["hojas"].items():
+            click.echo(
+                f"{sheet}: {h['filas']} filas, {h['rechazos']} rechazadas | YMs {', '.join(h['yms']) or '-'} "
+                f"({h['existentes']} filas existentes) | +{h['insertar']} ~{h['actualizar']} "
+                f"-{h['borrar']} ={h['sin_cambios']}"
+            )
+            for motivo, n in h["motivos"].items():
+                click.echo(f"  rechazo: {motivo} x{n}")
+            for tipo, n in h["tipos_desconocidos"].items():
+                click.echo(f"  advertencia: TIPO '{tipo}' desconocido x{n}")
+        if res["socios_nuevos"]:
+            click.echo(f"Socios nuevos: {', '.join(res['socios_nuevos'])}")
+    if strict and (res["rechazos"] or res["advertencias"]):
+        raise SystemExit(1)
+
+
+@app.cli.command("sync-gsheets")
+@click.option("--once", is_flag=True, help="Una sola pasada y salir (para cron).")
+@click.option("--minutes", type=float, default=None, help="Intervalo (default GSHEET_SYNC_MINUTES o 15).")
+@click.option("--force", is_flag=True, help="Descarga e importa aunque el Sheet no haya cambiado.")
+def sync_gsheets_command(once, minutes, force):
+    """Sincroniza GSHEET_SYNC_IDS: `flask --app main sync-gsheets [--once]`."""
+    ids = app.config["GSHEET_SYNC_IDS"]
+    if once:
+        for sid in ids:
+            o = sync_gsheet(sid, force=force)
+            click.echo(f"{sid}: {o.estado} en {o.duracion:.2f}s {o.detalle}".rstrip())
+        return
+    minutes = minutes or app.config["GSHEET_SYNC_MINUTES"] or 15
+
+    def _run_one(sid):
+        o = sync_gsheet(sid, force=force)
+        click.echo(f"[{time.strftime('%H:%M:%S')}] {sid}: {o.estado} en {o.duracion:.2f}s {o.detalle}".rstrip())
+        return o
+
+    click.echo(f"Sincronizando {len(ids)} Sheet(s) cada {minutes:g} min (Ctrl+C para salir)")
+    SyncScheduler(ids, minutes * 60, _run_one).run_forever()
+
+
+# Hilo de sincronización dentro del proceso web (GSHEET_SYNC_MINUTES > 0); con varios
+# workers cada uno tiene su hilo, pero el candado por Sheet evita corridas simultáneas
+# (no en los procesos 'spawn' del pool de importación, que re-importan el script como __mp_main__)
+gsheet_scheduler = (
+    start_gsheet_scheduler()
+    if app.config["GSHEET_SYNC_MINUTES"] > 0 and __name__ != "__mp_main__"
+    else None
+)
+
+
 # ------------------- MAIN -------------------
 if __name__ == '__main__':
     # Ejecutar la app en desarrollo, accesible desde host (útil en contenedor)
@@ -1,65 +1,61 @@
 # reset_db.py
 import os
-import shutil
-from datetime import datetime
 import sys
 
 # Añadir el directorio actual al path para permitir la importación de 'main'
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "app.db")
-BACKUPS_FOLDER = os.path.join(BASE_DIR, "backups")
+# Sin migrar al importar main: la base se migra recién después de borrarla
+os.environ["AUTO_MIGRATE"] = "0"
+from main import DB_PATH, app, backup_db, db, migrate_db  # respeta la variable DB_PATH
 
 def reset_database():
     """
-    1. Crea un backup del archivo app.db existente.
-    2. Elimina el archivo app.db.
+    1. Crea un backup de la base existente (DB_PATH de main: app.db o la variable DB_PATH).
+    2. Elimina el archivo.
     3. Recrea la base de datos con el esquema correcto a partir de los modelos.
     """
     print("--- Iniciando reseteo de la base de datos ---")
 
-    # 1. Backup
+    # 1. Backup (API de backup de SQLite: incluye lo que todavía esté en el -wal)
     if os.path.exists(DB_PATH):
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"manual_reset_backup_{ts}.db"
-        backup_path = os.path.join(BACKUPS_FOLDER, backup_filename)
-        try:
-            os.makedirs(BACKUPS_FOLDER, exist_ok=True)
-            shutil.copy2(DB_PATH, backup_path)
-            print(f"[OK] Backup creado en: {backup_path}")
-        except Exception as e:
-            print(f"[ERROR] No se pudo crear el backup: {e}")
+        backup_path = backup_db("manual_reset_backup")
+        if not backup_path:
+            print("[ERROR] No se pudo crear el backup.")
             # Detener el proceso si el backup falla
             return
+        print(f"[OK] Backup creado en: {backup_path}")
     else:
-        print("[INFO] No se encontró 'app.db'. No se necesita hacer backup.")
+        print(f"[INFO] No se encontró '{DB_PATH}'. No se necesita hacer backup.")
 
     # 2. Eliminar
     if os.path.exists(DB_PATH):
         try:
-            os.remove(DB_PATH)
-            print("[OK] 'app.db' eliminado correctamente.")
+            with app.app_context():
+                db.engine.dispose()  # sin conexiones abiertas al archivo que se borra
+            for ruta in (DB_PATH, DB_PATH + "-wal", DB_PATH + "-shm"):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            print(f"[OK] '{DB_PATH}' eliminado correctamente.")
         except Exception as e:
-            print(f"[ERROR] No se pudo eliminar 'app.db': {e}")
+            print(f"[ERROR] No se pudo eliminar '{DB_PATH}': {e}")
             # Detener si la eliminación falla
             return
 
     # 3. Recrear
     try:
-        print("[INFO] Recreando la base de datos desde los modelos de 'main.py'...")
-        from main import app, db
+        print("[INFO] Recreando la base de datos con las migraciones de 'main.py'...")
         with app.app_context():
-            db.create_all()
+            migrate_db()
         print("[OK] Base de datos recreada con éxito.")
-        print("[IMPORTANTE] La nueva 'app.db' está vacía. Deberás re-importar tus datos desde un Excel o Google Sheet.")
+        print("[IMPORTANTE] La nueva base está vacía. Deberás re-importar tus datos desde un Excel o Google Sheet.")
     except Exception as e:
         print(f"[ERROR] Falló la recreación de la base de datos: {e}")
 
     print("\n--- Proceso de reseteo finalizado ---")
 
 if __name__ == "__main__":
-    confirm = input("¿Estás seguro de que quieres hacer backup, borrar y recrear 'app.db'? Esta acción no se puede deshacer. (escribe 'si' para confirmar): ")
+    confirm = input(f"¿Estás seguro de que quieres hacer backup, borrar y recrear '{DB_PATH}'? Esta acción no se puede deshacer. (escribe 'si' para confirmar): ")
     if confirm.lower() == 'si':
         reset_database()
     else:
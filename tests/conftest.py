@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""
+Fixture `main`: importa main.py una sola vez contra una base temporal (DB_PATH sólo
+durante el import; el arranque aplica las migraciones sobre esa base).
+"""
+import pytest
+
+
+@pytest.fixture(scope="session")
+def main(tmp_path_factory):
+    pytest.importorskip("flask_sqlalchemy")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DB_PATH", str(tmp_path_factory.mktemp("db") / "app.db"))
+        import main as modulo
+    return modulo
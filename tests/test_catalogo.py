@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from app.services.catalogo import Catalogo
+
+
+def test_catalogo_recarga_solo_si_cambia_la_version():
+    estado = {"version": 1, "cargas": 0}
+
+    def cargar():
+        estado["cargas"] += 1
+        return ("2025-01", "2025-02")
+
+    cat = Catalogo(lambda: estado["version"])
+    cat.registrar("yms", cargar)
+    assert cat.obtener("yms") == ("2025-01", "2025-02")
+    cat.obtener("yms")
+    assert estado["cargas"] == 1
+    estado["version"] = 2  # una importación o un alta de socio
+    cat.obtener("yms")
+    assert estado["cargas"] == 2
+
+
+def test_catalogo_sin_version_no_cachea():
+    cargas = []
+    cat = Catalogo(lambda: None)
+    cat.registrar("socios", lambda: cargas.append(1) or ((1, "Abel"),))
+    cat.obtener("socios")
+    cat.obtener("socios")
+    assert len(cargas) == 2
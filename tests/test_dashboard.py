@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from app.services.dashboard import credito_iva, fold_dashboard
+
+
+def test_credito_iva_default_acotado():
+    # filas con pct propio ya ponderadas + default personal/normal acotado a 0..1
+    assert credito_iva(1000.0, 10000, True, 1.0, 0.5) == 6000.0
+    assert credito_iva(0.0, 10000, False, 1.5, 0.5) == 10000.0
+
+
+def test_fold_dashboard_una_pasada():
+    # montos en centavos
+    rows = [
+        ("VENTA", 1, False, "PAGADO", 2, 100000, 21000, 0.0, 0),
+        ("VENTA", 2, False, "ADEUDADO", 1, 50000, 10500, 0.0, 0),
+        ("COMPRA", 1, False, "PAGADO", 3, 40000, 8400, 0.0, 8400),
+        ("COMPRA", 1, True, "ADEUDADO", 1, 10000, 2100, 0.0, 2100),
+        ("COMPRA", None, False, "PAGADO", 1, 5000, None, None, None),
+    ]
+    m = fold_dashboard(rows, p_norm=1.0, p_pers_def=0.5)
+    assert (m.ventas_sin_iva, m.iva_venta) == (150000, 31500)
+    assert (m.compras_sin_iva, m.iva_compra_total) == (55000, 10500)
+    assert m.iva_compra_creditable == 8400 + 1050
+    assert (m.iva_personal_total, m.iva_personal_credito_empresa, m.iva_personal_credito_socios) == (2100, 1050, 1050)
+    assert (m.adeudado_compras, m.adeudado_ventas) == (1, 1)
+    assert m.margen_sin_iva == 95000 and m.iva_a_pagar == 31500 - 9450
+    assert m.por_socio[1] == {"ventas_sin_iva": 100000, "compras_sin_iva": 50000}
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+
+@pytest.mark.parametrize(
+    "centavos, html, export",
+    [(5263.5, "$52,64", 52.64), (-1234.5, "$-12,35", -12.35), (123456, "$1.234,56", 1234.56), (None, "$0,00", 0.0)],
+)
+def test_ars_y_exports_redondean_igual(main, centavos, html, export):
+    # mitades lejos de cero, como la importación: la página y el export muestran el mismo centavo
+    assert main.format_ars(centavos) == html
+    assert main.pesos(centavos) == export
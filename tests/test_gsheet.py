@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from app.services.gsheet import DownloadTooLarge, build_session, download_to_file
+
+CONTENIDO = b"PK" + b"x" * 200_000
+ETAG = '"v1"'
+
+
+class _Sheet(BaseHTTPRequestHandler):
+    """Stand-in del export de Google Sheets: ETag fijo y un 503 inicial en /flaky."""
+
+    pedidos = []
+    fallas = 0
+
+    def do_GET(self):
+        _Sheet.pedidos.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/flaky" and _Sheet.fallas:
+            _Sheet.fallas -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", "Wed, 01 Oct 2025 10:00:00 GMT")
+        self.send_header("Content-Length", str(len(CONTENIDO)))
+        self.end_headers()
+        self.wfile.write(CONTENIDO)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Sheet)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    _Sheet.pedidos, _Sheet.fallas = [], 0
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_descarga_streaming_y_condicional(servidor, tmp_path):
+    s = build_session(backoff=0)
+    dest = str(tmp_path / "sheet.xlsx")
+    dl = download_to_file(servidor + "/export", dest, session=s, chunk_size=4096)
+    assert not dl.not_modified and dl.size == len(CONTENIDO)
+    assert open(dest, "rb").read() == CONTENIDO
+    # con el ETag previo el servidor responde 304 y no se escribe nada
+    dest2 = str(tmp_path / "sheet2.xlsx")
+    dl2 = download_to_file(servidor + "/export", dest2, etag=dl.etag, last_modified=dl.last_modified, session=s)
+    assert dl2.not_modified and dl2.path is None
+    assert not (tmp_path / "sheet2.xlsx").exists()
+    assert _Sheet.pedidos[-1] == ("/export", ETAG)
+
+
+def test_descarga_reintenta_y_respeta_tope(servidor, tmp_path):
+    s = build_session(backoff=0)
+    _Sheet.fallas = 2
+    dl = download_to_file(servidor + "/flaky", str(tmp_path / "a.xlsx"), session=s)
+    assert dl.size == len(CONTENIDO)
+    assert [p for p, _ in _Sheet.pedidos].count("/flaky") == 3
+    with pytest.raises(DownloadTooLarge):
+        download_to_file(servidor + "/export", str(tmp_path / "b.xlsx"), max_bytes=1000, session=s)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.xlsx"]
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Importación de punta a punta sobre la base temporal de conftest.py (fixture `main`):
+feed .zip con un CSV por hoja, do_import_excel_from_path y lo que queda en la BD.
+"""
+import threading
+import zipfile
+
+import pytest
+from sqlalchemy import text
+
+from app.services.gsheet import DownloadResult
+
+COMPRAS = "FECHA,nombre_socio,TIPO,NRO_FACTURA,CUIT,PROVEEDOR,PESOS_SIN_IVA,IVA_21,ORIGEN,ESTADO\n"
+VENTAS = "FECHA,nombre_socio,TIPO,NRO_FACTURA,CUIT_VENTA,CLIENTE,PESOS_SIN_IVA,IVA_21,DESTINO,ESTADO\n"
+
+
+def _feed(path, compras=(), ventas=(), tipo="A", cuit="20111111112"):
+    """compras / ventas: (fecha, nro_factura, neto) del socio S1; las compras con `tipo` y `cuit`."""
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("FactCompras.csv", COMPRAS + "".join(
+            f"{f},S1,{tipo},{n},{cuit},Prov,{neto},{neto * 0.21:.2f},Banco,PAGADO\n" for f, n, neto in compras
+        ))
+        zf.writestr("FactVentas.csv", VENTAS + "".join(
+            f"{f},S1,A,{n},30222222223,Cli,{neto},{neto * 0.21:.2f},Banco,PAGADO\n" for f, n, neto in ventas
+        ))
+        zf.writestr("Socios.csv", "nombre_socio,tipo_socio\nS1,Socio\n")
+    return str(path)
+
+
+@pytest.fixture
+def base(main, monkeypatch):
+    """Base vacía por test; la lectura de las hojas en el mismo proceso."""
+    monkeypatch.setitem(main.app.config, "IMPORT_PARSE_WORKERS", 1)
+    with main.app.app_context():
+        for tabla in ("compras", "ventas", "resumen_mensual", "importaciones"):
+            main.db.session.execute(text(f"DELETE FROM {tabla}"))
+        main.db.session.commit()
+    return main
+
+
+def _importar(main, path):
+    with main.app.app_context():
+        return main.do_import_excel_from_path(path, force=True)
+
+
+def test_lector_abierto_no_bloquea_el_commit(base, tmp_path):
+    feed = _feed(tmp_path / "feed.zip", compras=[("01/07/2025", "0001-00000001", 100)])
+    with base.app.app_context():
+        engine = base.db.engine
+    # como un request: BEGIN explícito + SELECT, transacción abierta hasta el teardown
+    lector = engine.connect()
+    resultado = {}
+    hilo = threading.Thread(target=lambda: resultado.update(_importar(base, feed)))
+    try:
+        lector.execute(text("SELECT count(*) FROM compras")).all()
+        hilo.start()
+        hilo.join(10)
+        assert not hilo.is_alive(), "el COMMIT de la importación esperó al lector"
+    finally:
+        lector.close()
+        hilo.join()
+    assert resultado["inserted_c"] == 1
+
+
+def test_escritura_de_otro_entre_lectura_y_escritura(base, tmp_path, monkeypatch):
+    # otra conexión confirma después de que la importación leyó (last_import_for) y
+    # antes de que escriba: con BEGIN diferido la lectura queda vieja y el primer
+    # INSERT falla enseguida con "database is locked"
+    feed = _feed(tmp_path / "feed.zip", compras=[("01/07/2025", "0001-00000001", 100)])
+    leer = base.read_import_book
+
+    def _leer_y_otro_escribe(*a, **k):
+        with base.db.engine.begin() as otra:
+            otra.execute(text("INSERT INTO parametros (clave, valor) VALUES ('otro_proceso', 1)"))
+        return leer(*a, **k)
+
+    monkeypatch.setattr(base, "read_import_book", _leer_y_otro_escribe)
+    try:
+        with base.app.app_context():
+            # sin force: antes de leer el libro consulta la última importación
+            assert base.do_import_excel_from_path(feed)["inserted_c"] == 1
+    finally:
+        with base.app.app_context():
+            base.db.session.execute(text("DELETE FROM parametros WHERE clave = 'otro_proceso'"))
+            base.db.session.commit()
+
+
+def test_304_con_otra_importacion_en_el_medio_baja_de_nuevo(base, tmp_path, monkeypatch):
+    # el 304 respondió a los validadores de una importación que ya no es la última
+    # (un upload entró en el medio): last_import_from no encuentra nada
+    url = "https://docs.google.com/spreadsheets/d/x/export?format=xlsx"
+    feed = _feed(tmp_path / "feed.zip", compras=[("01/07/2025", "0001-00000001", 100)])
+    pedidos = []
+
+    def _descargar(export_url, dest, force=False):
+        pedidos.append(force)
+        if not force:
+            return DownloadResult(export_url, None, not_modified=True, etag='"v1"')
+        with open(feed, "rb") as src, open(dest, "wb") as out:
+            out.write(src.read())
+        return DownloadResult(export_url, dest, etag='"v2"')
+
+    monkeypatch.setattr(base, "download_gsheet_xlsx", _descargar)
+    monkeypatch.setitem(base.app.config, "UPLOAD_FOLDER", str(tmp_path))  # candado del Sheet
+    with base.app.app_context():
+        res = base.import_from_gsheet(url, str(tmp_path / "sheet.zip"))
+    assert pedidos == [False, True]
+    assert res["inserted_c"] == 1 and not res["sin_cambios"]
+
+
+def test_filas_sin_clave_se_reemplazan_sin_prune(base, tmp_path, monkeypatch):
+    # base previa a las huellas: la migración 1 deja row_key / row_hash en NULL
+    monkeypatch.setitem(base.app.config, "IMPORT_PRUNE_MISSING", False)
+    feed = _feed(tmp_path / "feed.zip", compras=[("01/07/2025", "0001-00000001", 100)])
+    _importar(base, feed)
+    with base.app.app_context():
+        base.db.session.execute(text("UPDATE compras SET row_key = NULL, row_hash = NULL"))
+        base.db.session.commit()
+    res = _importar(base, feed)
+    with base.app.app_context():
+        filas = base.db.session.execute(text("SELECT row_key FROM compras")).all()
+    assert (res["deleted_c"], res["inserted_c"]) == (1, 1)
+    assert len(filas) == 1 and filas[0][0] is not None
+
+
+def test_comprobante_sin_cuit_no_pisa_otro_mes(base, tmp_path):
+    # misma numeración N sin CUIT en julio y en agosto, cada mes en su propio archivo
+    julio = _feed(tmp_path / "julio.zip", compras=[("01/07/2025", "0001-00000001", 100)], tipo="N", cuit="")
+    agosto = _feed(tmp_path / "agosto.zip", compras=[("01/08/2025", "0001-00000001", 200)], tipo="N", cuit="")
+    _importar(base, julio)
+    res = _importar(base, agosto)
+    with base.app.app_context():
+        filas = base.db.session.execute(text("SELECT ym, pesos_sin_iva FROM compras ORDER BY ym")).all()
+    assert (res["inserted_c"], res["updated_c"]) == (1, 0)
+    assert [tuple(f) for f in filas] == [("2025-07", 10000), ("2025-08", 20000)]
+
+
+def _rollup_y_directo(main):
+    """(ym, operación, filas, neto, iva, total) del rollup y de compras/ventas sumadas directo."""
+    directo = """
+        SELECT ym, op, COUNT(*), SUM(pesos_sin_iva), SUM(iva_21 + iva_105),
+               SUM(COALESCE(NULLIF(total_con_iva, 0), pesos_sin_iva + iva_21 + iva_105))
+        FROM (SELECT ym, 'COMPRA' AS op, pesos_sin_iva, iva_21, iva_105, total_con_iva FROM compras
+              UNION ALL
+              SELECT ym, 'VENTA', pesos_sin_iva, iva_21, iva_105, total_con_iva FROM ventas)
+        GROUP BY ym, op ORDER BY ym, op
+    """
+    rollup = """
+        SELECT ym, operacion, SUM(filas), SUM(pesos_sin_iva), SUM(iva_21 + iva_105), SUM(total_con_iva)
+        FROM resumen_mensual GROUP BY ym, operacion ORDER BY ym, operacion
+    """
+    with main.app.app_context():
+        s = main.db.session
+        return [tuple(r) for r in s.execute(text(rollup))], [tuple(r) for r in s.execute(text(directo))]
+
+
+def test_rollup_igual_a_sumas_directas(base, tmp_path):
+    primero = _feed(
+        tmp_path / "a.zip",
+        compras=[
+            ("01/07/2025", "0001-00000001", 100),
+            ("02/07/2025", "0001-00000002", 200),
+            ("03/08/2025", "0001-00000003", 300),
+            ("04/08/2025", "0001-00000004", 50),
+        ],
+        ventas=[("05/07/2025", "0001-00000010", 1000)],
+    )
+    _importar(base, primero)
+    rollup, directo = _rollup_y_directo(base)
+    assert rollup == directo and [r[:3] for r in rollup] == [
+        ("2025-07", "COMPRA", 2), ("2025-07", "VENTA", 1), ("2025-08", "COMPRA", 2),
+    ]
+
+    # sólo agosto: la 1 se mudó de julio, la 3 cambió, la 4 ya no viene, la 5 es nueva
+    segundo = _feed(
+        tmp_path / "b.zip",
+        compras=[
+            ("10/08/2025", "0001-00000001", 100),
+            ("03/08/2025", "0001-00000003", 350),
+            ("11/08/2025", "0001-00000005", 70),
+        ],
+        ventas=[("12/08/2025", "0001-00000011", 500)],
+    )
+    res = _importar(base, segundo)
+    assert (res["inserted_c"], res["updated_c"], res["deleted_c"]) == (1, 2, 1)
+    rollup, directo = _rollup_y_directo(base)
+    assert rollup == directo
+    assert [r[:4] for r in rollup] == [
+        ("2025-07", "COMPRA", 1, 20000),
+        ("2025-07", "VENTA", 1, 100000),
+        ("2025-08", "COMPRA", 3, 52000),
+        ("2025-08", "VENTA", 1, 50000),
+    ]
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+import datetime as dt
+import zipfile
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from app.services import importer
+from app.services.importer import (
+    DATA_SHEETS,
+    ImportContext,
+    diff_rows,
+    natural_keys,
+    normalize_compras,
+    normalize_ventas,
+    overlay_context,
+    prepare_sheets,
+    read_import_book,
+    read_import_sheets,
+    rejected_mask,
+    sheet_names,
+    split_invoice_number,
+    summarize_dry_run,
+    to_amounts,
+)
+
+
+def _libro(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "FactCompras"
+    ws.append(["FECHA", "nombre_socio", "PESOS_SIN_IVA", None])
+    ws.append([dt.datetime(2025, 7, 1), "Guille", 100.0, None])
+    ws.append([None, None, None, None])
+    ws.append(["02/07/2025", "Abel", 50.0, None])
+    wv = wb.create_sheet("FactVentas")
+    wv.append(["FECHA", "nombre_socio", "CLIENTE", "TOTAL_CON_IVA"])
+    wv.append(["2025-08-01", "Guille", "ACME", 121])
+    wv.append(["2025-08-02", "Nadie", "ACME", "x"])
+    wb.create_sheet("Socios").append(["nombre_socio", "tipo_socio"])
+    wb.create_sheet("Cuentas").append(["cuenta"])
+    path = tmp_path / "libro.xlsx"
+    wb.save(path)
+    return str(path)
+
+
+def test_read_import_sheets_una_pasada(tmp_path):
+    sheets = read_import_sheets(_libro(tmp_path))
+    # solo hojas de importación, sin filas vacías ni columnas sin encabezado al final
+    assert set(sheets) == {"FactCompras", "FactVentas", "Socios"}
+    df = sheets["FactCompras"]
+    assert list(df.columns) == ["FECHA", "nombre_socio", "PESOS_SIN_IVA"]
+    assert len(df) == 2
+    assert df["nombre_socio"].tolist() == ["Guille", "Abel"]
+    assert sheets["Socios"].empty
+
+
+def test_normalize_compras_vectorizado():
+    df = pd.DataFrame(
+        {
+            "FECHA": [dt.datetime(2025, 7, 1), "02/07/2025", None, "xx"],
+            "nombre_socio": ["Guille", " Abel ", None, "Abel"],
+            "PESOS_SIN_IVA": [100, "abc", None, 5],
+            "NRO_FACTURA": [165.0, None, None, None],
+            "personal": ["Si", "no", None, "no"],
+            "iva_deducible_pct": [None, "50%", None, 70],
+        }
+    )
+    ctx = ImportContext(socios={"Guille": 1, "Abel": 2}, p_norm=1.0, p_pers_def=0.5)
+    out = normalize_compras(df, ctx)
+    # la fila sin FECHA se ignora; las inválidas quedan en la máscara de rechazo
+    assert list(out.index) == [0, 1, 3]
+    assert rejected_mask(out).tolist() == [False, True, True]
+    assert out.loc[0, "ym"] == "2025-07" and out.loc[1, "ym"] == "2025-07"
+    assert out.loc[0, "nro_factura"] == "165"
+    assert out.loc[0, "personal"] and not out.loc[1, "personal"]
+    # default personal (0.5), '50%' -> 0.5, 70 -> 0.7
+    assert out["iva_deducible_pct"].tolist() == [0.5, 0.5, 0.7]
+    assert out.loc[0, "socio_id"] == 1
+
+
+def test_montos_en_centavos():
+    # centavos enteros, mitades lejos de cero, sin el error binario del float (0.285 * 100)
+    valores, invalido = to_amounts(pd.Series([100.5, "0.285", -0.285, " 7 ", None, "abc", 1234.565]))
+    assert valores.tolist() == [10050, 29, -29, 700, 0, 0, 123457]
+    assert invalido.tolist() == [False, False, False, False, False, True, False]
+
+
+def test_normalize_ventas_rechaza_socio_desconocido():
+    df = pd.DataFrame({"FECHA": ["2025-07-01", "2025-07-02"], "nombre_socio": ["Guille", "Nadie"]})
+    out = normalize_ventas(df, ImportContext(socios={"Guille": 1}))
+    assert rejected_mask(out).tolist() == [False, True]
+    assert out.loc[1, "motivo"] == "nombre_socio inválido/ausente"
+
+
+def test_diff_rows_clave_natural():
+    existentes = [
+        (1, "k1", "h1", "2025-07"),
+        (2, "k2", "h2", "2025-07"),
+        (3, "k3", "h3", "2025-07"),
+        (4, None, None, "2025-07"),
+        (5, "k5", "h5", "2025-06"),
+    ]
+    nuevas = [
+        {"row_key": "k1", "row_hash": "h1"},  # sin cambios
+        {"row_key": "k2", "row_hash": "h2b"},  # misma factura, otro contenido
+        {"row_key": "k5", "row_hash": "h5b"},  # misma factura, fecha corregida a otro YM
+        {"row_key": "k9", "row_hash": "h9"},  # nueva
+    ]
+    diff = diff_rows(existentes, nuevas, ["2025-07"])
+    assert diff.unchanged == 1
+    assert [u["row_key"] for u in diff.updates] == ["k2", "k5"]
+    assert diff.updated_yms == ["2025-06", "2025-07"]
+    assert diff.inserts == [{"row_key": "k9", "row_hash": "h9"}]
+    # fila 3 ya no está en el archivo; fila 4 es previa a las huellas
+    assert diff.deletes == [3, 4]
+    # sin prune sólo se van las filas sin clave de los YMs del archivo (si no, se duplicarían)
+    assert diff_rows(existentes, nuevas, ["2025-07"], prune=False).deletes == [4]
+    # sin YMs del archivo no borra nada
+    assert diff_rows(existentes, nuevas).deletes == []
+
+
+def test_clave_natural_de_factura():
+    assert split_invoice_number("0003-00000204") == ("0003", "00000204")
+    assert split_invoice_number(204.0) == split_invoice_number("204") == ("0001", "00000204")
+    assert split_invoice_number(None) == ("", "")
+    df = pd.DataFrame(
+        {
+            "tipo": ["A", "A", "A", "X", "X"],
+            "cuit": ["20-22371127-9", "20223711279", "20223711279", "", ""],
+            "nro_factura": ["0003-00000204", "300000204", "300000204", "", ""],
+            "fecha": ["2025-07-01", "2025-07-09", "2025-07-09", "2025-07-01", "2025-07-01"],
+            "proveedor": ["ACME", "Acme SA", "Acme SA", "Caja", "Caja"],
+            "transaccion_id": ["", "", "", "t1", "t1"],
+        }
+    )
+    keys = natural_keys(df, ("tipo", "cuit", "nro_factura"), ("fecha", "tipo", "cuit", "proveedor", "transaccion_id"))
+    # misma factura con otro formato de número/CUIT u otros datos -> misma clave; las
+    # repeticiones dentro del archivo quedan distintas y estables (#n)
+    f = "F|A|20223711279|0003|00000204"
+    assert keys.tolist()[:3] == [f, f + "#1", f + "#2"]
+    assert keys[3].startswith("S|") and keys[4] == keys[3] + "#1"
+
+    # sin CUIT el número no alcanza: N/X repiten numeración entre meses y archivos
+    df = pd.DataFrame(
+        {
+            "tipo": ["N", "N"],
+            "cuit": ["", ""],
+            "nro_factura": ["0001-00000001", "0001-00000001"],
+            "fecha": ["2025-07-01", "2025-08-01"],
+            "proveedor": ["Caja", "Caja"],
+            "transaccion_id": ["", ""],
+        }
+    )
+    keys = natural_keys(df, ("tipo", "cuit", "nro_factura"), ("fecha", "tipo", "cuit", "proveedor", "transaccion_id"))
+    assert keys[0].startswith("S|") and keys[0].endswith("0001|00000001") and keys[0] != keys[1]
+
+
+def test_prepare_sheets_en_paralelo_igual_que_secuencial(tmp_path):
+    path = _libro(tmp_path)
+    ctx = ImportContext(socios={"Guille": 1})
+    seq = prepare_sheets(path, ctx, workers=1)
+    par = prepare_sheets(path, ctx, workers=2)
+    assert seq == par
+    assert seq["FactCompras"].yms == ["2025-07"] and seq["FactVentas"].yms == ["2025-08"]
+    assert [(r["socio_id"], r["cliente"]) for r in seq["FactVentas"].records] == [(1, "ACME")]
+    assert [r["motivo"] for r in seq["FactVentas"].rechazos] == ["nombre_socio inválido/ausente"]
+    assert [r["motivo"] for r in seq["FactCompras"].rechazos] == ["nombre_socio inválido/ausente"]
+
+
+def test_lectura_secuencial_abre_el_libro_una_vez(tmp_path, monkeypatch):
+    path = _libro(tmp_path)
+    ctx = ImportContext(socios={"Guille": 1})
+    esperado = prepare_sheets(path, ctx)
+    abiertos = []
+    real = importer.load_workbook
+    monkeypatch.setattr(importer, "load_workbook", lambda *a, **k: abiertos.append(a) or real(*a, **k))
+    sheets, presentes = read_import_book(path, workers=1)
+    prep = prepare_sheets(path, ctx, workers=1, frames=sheets)
+    assert len(abiertos) == 1
+    assert set(DATA_SHEETS) <= set(presentes) and prep == esperado
+
+
+def test_zip_de_csv_misma_normalizacion(tmp_path):
+    path = tmp_path / "feed.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("feed/FactCompras.csv", "FECHA,nombre_socio,NRO_FACTURA,PESOS_SIN_IVA,\n01/07/2025,Guille,0012,100.5,\n,,,,\n")
+        zf.writestr("feed/FactVentas.csv", "\ufeffFECHA;nombre_socio;TOTAL_CON_IVA\n2025-08-01;Guille;abc\n")
+        zf.writestr("feed/Socios.csv", "nombre_socio,tipo_socio\nGuille,Socio\n")
+    assert set(sheet_names(str(path))) == {"FactCompras", "FactVentas", "Socios"}
+    sheets = read_import_sheets(str(path))
+    assert list(sheets["FactCompras"].columns) == ["FECHA", "nombre_socio", "NRO_FACTURA", "PESOS_SIN_IVA"]
+    prep = prepare_sheets(str(path), ImportContext(socios={"Guille": 1}))
+    (compra,) = prep["FactCompras"].records
+    assert (compra["fecha"], compra["nro_factura"], compra["pesos_sin_iva"]) == (dt.date(2025, 7, 1), "0012", 10050)
+    assert [r["motivo"] for r in prep["FactVentas"].rechazos] == ["TOTAL_CON_IVA no numérico: abc"]
+
+
+def test_directorio_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    d = tmp_path / "feed"
+    d.mkdir()
+    pd.DataFrame({"FECHA": [dt.datetime(2025, 7, 1)], "nombre_socio": ["Guille"], "PESOS_SIN_IVA": [10.0]}).to_parquet(d / "FactCompras.parquet")
+    pd.DataFrame({"FECHA": ["2025-08-01"], "nombre_socio": ["Guille"]}).to_parquet(d / "FactVentas.parquet")
+    prep = prepare_sheets(str(d), ImportContext(socios={"Guille": 1}))
+    assert prep["FactCompras"].records[0]["pesos_sin_iva"] == 1000
+    assert prep["FactVentas"].yms == ["2025-08"]
+
+
+def test_dry_run_contexto_en_memoria_y_resumen(tmp_path):
+    base = ImportContext(socios={"Guille": 1}, p_norm=1.0)
+    ctx = overlay_context(
+        base,
+        pd.DataFrame({"Parametro": ["iva_deducible_normal_pct", "otro"], "Valor": [0.8, "x"]}),
+        pd.DataFrame({"nombre_socio": ["Abel", None, "Guille"], "tipo_socio": ["Socio", None, "Socio"]}),
+    )
+    # el socio nuevo del libro se reconoce (id provisorio) y el contexto base no cambia
+    assert ctx.p_norm == 0.8 and ctx.socios["Abel"] < 0 and "Abel" not in base.socios
+    prep = prepare_sheets(_libro(tmp_path), ctx)
+    existentes = [(7, "k-vieja", "h-vieja", "2025-07")]
+    diffs = {s: diff_rows(existentes if s == "FactCompras" else [], p.records, p.yms) for s, p in prep.items()}
+    res = summarize_dry_run(prep, diffs, {"FactCompras": 1, "FactVentas": 0})
+    compras = res["hojas"]["FactCompras"]
+    assert (compras["insertar"], compras["borrar"], compras["rechazos"]) == (2, 1, 0)
+    assert compras["tipos_desconocidos"] == {"": 2}  # sin columna TIPO
+    assert res["hojas"]["FactVentas"]["motivos"] == {"nombre_socio inválido/ausente": 1}
+    assert res["rechazos"] == 1 and res["advertencias"] == 3
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import time
+from app.services.jobs import JobRegistry
+
+
+def _esperar(job, timeout=5.0):
+    fin = time.time() + timeout
+    while not job.terminado and time.time() < fin:
+        time.sleep(0.01)
+    return job
+
+
+def test_job_registry_progreso_y_error():
+    reg = JobRegistry(max_workers=1)
+
+    def ok(job):
+        job.progress("parse", rows=10, rechazos=2)
+        job.progress("insert", rows=8)
+        return {"inserted": 8}
+
+    def falla(job):
+        raise ValueError("hoja rota")
+
+    j1 = _esperar(reg.submit("Excel", ok))
+    j2 = _esperar(reg.submit("Excel", falla))
+    assert reg.get(j1.id) is j1
+    d = j1.to_dict()
+    assert (d["phase"], d["rows"], d["rechazos"], d["done"]) == ("done", 8, 2, True)
+    assert d["result"] == {"inserted": 8}
+    assert j2.phase == "error" and j2.error == "hoja rota"
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import random
+from app.services.margenes import calcular_margenes
+
+
+def _por_pares(socios, p_emp, p_soc):
+    # cálculo original O(n²) de Margen_Otros_Socios (centavos)
+    out = []
+    for s in socios:
+        otros = 0
+        for o in socios:
+            if o is s:
+                continue
+            if s["tipo"] == "Socio" and o["tipo"] == "Socio":
+                otros += round(o["gn"] * p_soc)
+            elif s["tipo"] == "Empresa" and o["tipo"] == "Socio":
+                otros += round(o["gn"] * p_emp)
+        out.append(otros)
+    return out
+
+
+def test_margenes_lineal_igual_que_por_pares():
+    rnd = random.Random(7)
+    socios = [
+        {"tipo": rnd.choice(["Socio", "Socio", "Empresa", None]), "gn": rnd.randint(-10**8, 10**9)}
+        for _ in range(60)
+    ]
+    res = calcular_margenes(socios, 0.53, 0.20, 0.09)
+    # centavos enteros: la resta del aporte propio es exacta, sin redondeos intermedios
+    assert [m["Margen_Otros_Socios"] for m in res] == _por_pares(socios, 0.53, 0.09)
+    s0, m0 = socios[0], res[0]
+    assert m0["Margen_Vendedor"] == round(s0["gn"] * 0.20)
+    assert m0["Total_Margenes"] == m0["Margen_Vendedor"] + m0["Margen_Socios"] + m0["Margen_Otros_Socios"]
+    assert all(isinstance(v, int) for m in res for v in m.values())
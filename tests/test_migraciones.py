@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import pytest
+from sqlalchemy import create_engine
+
+from app.services.migraciones import Migracion, migracion_sql, migrar, sentencias_sql, versiones_aplicadas
+
+
+def test_sentencias_sql():
+    script = "-- comentario\nCREATE TABLE t (x TEXT);\nINSERT INTO t VALUES ('a;b');\n-- fin\nUPDATE t SET x = 'c'"
+    assert sentencias_sql(script) == [
+        "-- comentario\nCREATE TABLE t (x TEXT);",
+        "INSERT INTO t VALUES ('a;b');",
+        "UPDATE t SET x = 'c'",
+    ]
+
+
+def test_migrar_en_orden_una_sola_vez():
+    engine = create_engine("sqlite://")
+    m1 = migracion_sql(1, "tabla", "CREATE TABLE t (x INTEGER);")
+    m2 = migracion_sql(2, "fila", "INSERT INTO t VALUES (1);")
+    assert [m.version for m in migrar(engine, [m2, m1])] == [1, 2]
+    assert migrar(engine, [m1, m2]) == []  # ya registradas: no se repiten
+    assert sorted(versiones_aplicadas(engine)) == [1, 2]
+
+    # una migración que falla no queda aplicada a medias ni registrada
+    def rota(conn):
+        conn.exec_driver_sql("INSERT INTO t VALUES (2)")
+        conn.exec_driver_sql("INSERT INTO no_existe VALUES (1)")
+
+    with pytest.raises(Exception):
+        migrar(engine, [m1, m2, Migracion(3, "rota", rota)])
+    assert 3 not in versiones_aplicadas(engine)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM t").scalar() == 1
+    with pytest.raises(ValueError):
+        migrar(engine, [m1, migracion_sql(1, "repetida", "")])
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import datetime as dt
+
+import pytest
+from app.services.paginacion import armar_pagina, decode_cursor, encode_cursor
+
+
+def test_cursor_ida_y_vuelta():
+    for valor in (dt.date(2025, 7, 1), 1234.56, "ACME", None):
+        assert decode_cursor(encode_cursor(valor, 42, "fecha:desc"), "fecha:desc") == (valor, 42)
+    # otro orden, token vacío o corrupto -> primera página
+    assert decode_cursor(encode_cursor("x", 1, "fecha:desc"), "fecha:asc") is None
+    assert decode_cursor("", "fecha:desc") is None
+    assert decode_cursor("no-es-un-cursor", "fecha:desc") is None
+
+
+def test_armar_pagina_adelante_y_atras():
+    clave = lambda fila: fila  # (valor, id)
+    filas = [(30, 3), (20, 2), (10, 1)]
+    # primera página: se leyó size + 1 -> hay siguiente, no anterior
+    p = armar_pagina(filas, 2, clave, "o")
+    assert p.items == [(30, 3), (20, 2)] and p.anterior is None
+    assert decode_cursor(p.siguiente, "o") == (20, 2)
+    # ?before= recorre al revés: la página se invierte y hay siguiente (el cursor)
+    p = armar_pagina([(20, 2), (30, 3)], 2, clave, "o", con_cursor=True, hacia_atras=True)
+    assert p.items == [(30, 3), (20, 2)] and p.anterior is None
+    assert decode_cursor(p.siguiente, "o") == (20, 2)
+    assert armar_pagina([], 2, clave, "o", con_cursor=True).items == []
+
+
+@pytest.mark.parametrize("desc", [False, True])
+def test_keyset_page_con_nulos_ida_y_vuelta(main, desc):
+    # columna con NULL (SQLite los ordena primero): las páginas cruzan el límite NULL / no NULL
+    C = main.Compra
+    with main.app.app_context():
+        s = main.db.session
+        s.query(C).delete()
+        for p in ["B", None, "A", None, "C", "A", None, "B", "D", None, "A"]:
+            s.add(C(fecha=dt.date(2025, 7, 1), ym="2025-07", proveedor=p))
+        s.commit()
+        orden = (C.proveedor.desc(), C.id.desc()) if desc else (C.proveedor.asc(), C.id.asc())
+        esperado = [c.id for c in s.query(C).order_by(*orden)]
+
+        def pagina(**cursor):
+            return main.keyset_page(s.query(C), C.proveedor, C.id, desc, "proveedor", size=3, **cursor)
+
+        paginas = [pagina()]
+        while paginas[-1].siguiente:
+            paginas.append(pagina(after=paginas[-1].siguiente))
+        assert [c.id for p in paginas for c in p.items] == esperado
+
+        # desde la última página hacia atrás con ?before=
+        atras = [paginas[-1]]
+        while atras[0].anterior:
+            atras.insert(0, pagina(before=atras[0].anterior))
+        assert [[c.id for c in p.items] for p in atras] == [[c.id for c in p.items] for p in paginas]
+        s.query(C).delete()
+        s.commit()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import datetime as dt
+from app.services.periodo import Periodo, periodo_desde_args, periodo_desde_ym, sumar_meses
+
+
+def test_selector_year_month_con_valores_magicos():
+    assert periodo_desde_args({"year": "1313", "month": "13"}, 2025) == Periodo.todos()
+    assert periodo_desde_args({"year": "1313", "month": "3"}, 2025).vacio
+    anio = periodo_desde_args({"year": "2025"}, 2025)
+    assert (anio.desde, anio.hasta, anio.clave) == (202501, 202601, "2025")
+    assert (anio.fecha_desde, anio.fecha_hasta) == (dt.date(2025, 1, 1), dt.date(2026, 1, 1))
+    mes = periodo_desde_args({"year": "2025", "month": "12"}, 2025)
+    assert (mes.desde, mes.hasta, mes.un_mes) == (202512, 202601, "2025-12")
+    # default del export del dashboard: mes actual
+    assert periodo_desde_args({}, 2025, default_month=7).clave == "2025-07"
+    assert periodo_desde_args({"year": "2025", "month": "14"}, 2025).vacio
+
+
+def test_trimestres_y_rangos():
+    t = periodo_desde_args({"year": "2025", "month": "t4"}, 2025)
+    assert (t.desde, t.hasta, t.clave, t.un_mes) == (202510, 202601, "2025-T4", None)
+    r = periodo_desde_args({"desde": "2025-11", "hasta": "2025-02", "year": "1313"}, 2025)
+    assert (r.desde, r.hasta, r.clave) == (202502, 202512, "2025-02_2025-11")
+    assert r.contiene(202511) and not r.contiene(202512)
+    assert sumar_meses(202512, 1) == 202601 and sumar_meses(202501, -1) == 202412
+
+
+def test_clave_ida_y_vuelta():
+    for p in (Periodo.todos(), Periodo.ninguno(), Periodo.anio(2025), Periodo.mes(2025, 3),
+              Periodo.trimestre(2025, 2), Periodo.rango(202502, 202605)):
+        assert periodo_desde_ym(p.clave) == p
+    # claves legacy del selector viejo
+    assert periodo_desde_ym("2025-*") == Periodo.anio(2025)
+    assert periodo_desde_ym("") is None and periodo_desde_ym("2025-13") is None
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+EXPLAIN QUERY PLAN de las consultas de los reportes: con las migraciones aplicadas, ninguna
+recorre compras / ventas / resumen_mensual sin índice.
+
+Usa main.py sobre una base temporal (fixture `main` de conftest.py).
+"""
+import pytest
+from sqlalchemy import event
+
+TABLAS = ("compras", "ventas", "resumen_mensual")
+REPORTES = [
+    "/?year=2025&month=7",
+    "/compras?year=2025&month=7&socio=S1",
+    "/compras?year=2025&month=T3&estado=ADEUDADO",
+    "/ventas?year=2025&month=13&socio=S1",
+    "/resumen-arca?ym=2025-07&tipo=A",
+    "/resumen-arca?ym=2025-07",
+    "/totales-arca?ym=2025",
+    "/resumen-caja?year=2025&month=7&caja=Banco",
+    "/resumen-caja?year=1313&month=13&caja=Banco",
+    "/resumen-caja?year=1313&month=13&transaccion_id=T1",
+    "/resumen-socio?year=2025&month=7",
+]
+
+
+@pytest.mark.parametrize("url", REPORTES)
+def test_reportes_usan_indices(main, url):
+    consultas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            consultas.append((statement, parameters))
+
+    with main.app.app_context():
+        engine = main.db.engine
+    event.listen(engine, "before_cursor_execute", capturar)
+    try:
+        assert main.app.test_client().get(url).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", capturar)
+
+    planes = []
+    with engine.connect() as conn:
+        for sql, params in consultas:
+            planes += [fila[-1] for fila in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params)]
+    sobre_tablas = [p for p in planes if p.split(" ")[1:2] and p.split(" ")[1] in TABLAS]
+    assert sobre_tablas, planes
+    sin_indice = [p for p in sobre_tablas if "USING" not in p]
+    assert not sin_indice, sin_indice
+
+
+def test_migraciones_registradas(main):
+    with main.app.app_context():
+        hechas = main.versiones_aplicadas(main.db.engine)
+    assert sorted(hechas) == sorted(m.version for m in main.MIGRACIONES)
+    assert {"esquema_base", "indices_modelos", "indices_reportes"} <= {n for n, _ in hechas.values()}
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from app.services.scheduler import SheetBusy, SheetLock, run_sync
+
+
+def test_run_sync_estados_y_candado(tmp_path):
+    corridas = []
+
+    def intento(sid):
+        with SheetLock(str(tmp_path), sid):
+            return {}
+
+    def sync(sid):
+        # mientras corre, otro intento sobre el mismo Sheet queda 'ocupado'
+        with SheetLock(str(tmp_path), sid):
+            assert run_sync(sid, intento).estado == "ocupado"
+            return {"sin_cambios": sid == "igual"}
+
+    assert run_sync("nuevo", sync, record=corridas.append).estado == "ok"
+    assert run_sync("igual", sync, record=corridas.append).estado == "sin_cambios"
+    assert run_sync("roto", lambda s: 1 / 0, record=corridas.append).estado == "error"
+    assert [c.estado for c in corridas] == ["ok", "sin_cambios", "error"]
+    assert all(c.duracion >= 0 for c in corridas)
+    # liberado al salir: se puede volver a tomar
+    assert run_sync("nuevo", intento).estado == "ok"
+
+
+def test_sheet_lock_entre_procesos(tmp_path):
+    import multiprocessing as mp
+
+    with SheetLock(str(tmp_path), "sheet"):
+        ctx = mp.get_context("spawn")
+        q = ctx.Queue()
+        p = ctx.Process(target=_tomar, args=(str(tmp_path), q))
+        p.start()
+        p.join(30)
+        assert q.get(timeout=5) == "ocupado"
+
+
+def _tomar(lock_dir, q):
+    try:
+        with SheetLock(lock_dir, "sheet"):
+            q.put("libre")
+    except SheetBusy:
+        q.put("ocupado")